@@ -1,20 +1,63 @@
+import os
+from typing import Optional
 from google.adk.agents import Agent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
 import pytz
 
 # Import all tools from the tools package
 from .tools import (
     get_current_datetime,
     get_all_rooms,
+    resolve_room,
     get_room_info,
     get_room_availability,
     list_available_rooms,
+    find_free_rooms,
+    get_room_utilization,
+    find_meeting_time,
     book_room,
+    book_first_available_room,
     cancel_meeting,
+    find_meetings,
     check_auth_status,
     get_authorization_url,
     exchange_code_for_token,
     set_token_from_form_data,
+    start_warmup,
+    start_room_events,
+    start_refresher,
+    profiled,
+    logged_tool,
+    with_deadline,
 )
+from .tools.intent_router import FAST_PATH, route_message
+
+
+def answer_without_model(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """Answer common questions straight from the tools, skipping the model.
+
+    Handles "which rooms are free now", "is X available" and "list rooms"
+    (see tools/intent_router.py). Returns None to let the model handle
+    everything else, including the model calls that follow tool calls.
+    """
+    if not llm_request.contents:
+        return None
+    last = llm_request.contents[-1]
+    if last.role != "user" or not last.parts:
+        return None
+    # Tool results come back as user content without text
+    text = "".join(part.text or "" for part in last.parts)
+    answer = route_message(text) if text else None
+    if answer is None:
+        return None
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=answer)])
+    )
+
 
 # Create the Exchange agent
 root_agent = Agent(
@@ -31,28 +74,66 @@ root_agent = Agent(
 
     Important: NEVER ask the user for roomIds or any technical information about rooms. Just use the tools to get the information you need.
     Important: When booking a room, assume it is for 30 minutes, unless the user specifies otherwise.
+    Availability answers may come from data cached up to a minute ago (see data_age_seconds). If the user needs the very latest state, check again with max_age set to 0.
+    If a tool result has timed_out set, the Exchange service was slow: tell the user the answer may be incomplete or out of date (see data_age_seconds and unchecked_rooms). If a booking or cancellation timed out, check the room's availability before trying again.
     
     You have the following tools:
     - List all available rooms
+    - Look up a room by the name, email or location the user mentions (use this to find a room's ID instead of listing all rooms)
     - Get information about a specific room
     - Check which rooms are available right now
+    - Find rooms that are free for a given length of time or for a whole time window today (e.g. "free for 45 minutes this afternoon")
+    - Report how busy rooms are over a period of time today
+    - Find times when a group of attendees and a suitable room are all free, in a single call (use this instead of checking rooms one by one when scheduling with attendees)
     - Book a room for a meeting (You should understand phrases like "today at 2pm" or "tomorrow at 3pm")
+    - Book the best available room matching a capacity, building and time in one step (use this when the user wants "any room" rather than a specific one)
+    - Find meetings by subject, organizer, room and time, with the IDs needed to cancel them (use this to find the meeting the user means, e.g. "my 3pm in Conference Room A", instead of looking through room calendars)
     - Cancel a meeting
     - Check authentication status
     - Accept authentication tokens directly through chat
 
     """,
+    # Optionally answer the most common questions without the model
+    # (EXCHANGE_FAST_PATH)
+    before_model_callback=answer_without_model if FAST_PATH else None,
+    # Every tool logs with its name as context, can be profiled on demand
+    # (EXCHANGE_PROFILE) and has a deadline for all of its requests
+    # (EXCHANGE_TOOL_DEADLINE)
     tools=[
-        get_current_datetime,
-        get_all_rooms,
-        get_room_info,
-        get_room_availability,
-        list_available_rooms,
-        book_room,
-        cancel_meeting,
-        check_auth_status,
-        get_authorization_url,
-        exchange_code_for_token,
-        set_token_from_form_data,
+        profiled(logged_tool(with_deadline(tool)))
+        for tool in (
+            get_current_datetime,
+            get_all_rooms,
+            resolve_room,
+            get_room_info,
+            get_room_availability,
+            list_available_rooms,
+            find_free_rooms,
+            get_room_utilization,
+            find_meeting_time,
+            book_room,
+            book_first_available_room,
+            find_meetings,
+            cancel_meeting,
+            check_auth_status,
+            get_authorization_url,
+            exchange_code_for_token,
+            set_token_from_form_data,
+        )
     ],
 )
+
+# Optionally start filling the room caches in the background, so the first
+# questions don't have to wait for the room directory and calendars
+if os.environ.get("EXCHANGE_WARMUP", "").lower() in ("1", "true", "yes"):
+    start_warmup()
+
+# Optionally keep the cached calendars current with room changes pushed by
+# the local Exchange API server, instead of refetching them every minute
+if os.environ.get("EXCHANGE_ROOM_EVENTS", "").lower() in ("1", "true", "yes"):
+    start_room_events()
+
+# Optionally keep the most frequently queried rooms' availability fresh in
+# the background, so they are answered from the cache
+if os.environ.get("EXCHANGE_REFRESHER", "").lower() in ("1", "true", "yes"):
+    start_refresher()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Summarize the tool profiles captured with EXCHANGE_PROFILE"""
+
+import argparse
+
+from tools.profiling import PROFILE_DIR, summarize_profiles
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Show the top functions and allocation sites of captured tool profiles"
+    )
+    parser.add_argument(
+        "directory",
+        nargs="?",
+        default=str(PROFILE_DIR),
+        help=f"Directory with the captures (default: {PROFILE_DIR})",
+    )
+    parser.add_argument("--tool", default="", help="Only include this tool")
+    parser.add_argument(
+        "--top", type=int, default=20, help="Number of entries listed (default: 20)"
+    )
+    parser.add_argument(
+        "--latest",
+        type=int,
+        default=0,
+        help="Only include the most recent captures (default: all)",
+    )
+    args = parser.parse_args()
+
+    print(
+        summarize_profiles(
+            args.directory, tool_name=args.tool, top=args.top, latest=args.latest
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 #!/usr/bin/env python3
-"""Test script for Microsoft Graph API integration"""
+"""Test script for Microsoft Graph API integration
 
+Run without arguments to check connectivity, or with --latency to measure
+where time goes: DNS, connect, TLS and time to first byte for the local
+Exchange API, Graph v1.0 and Graph beta, and end-to-end latency percentiles
+of the tools.
+"""
+
+import argparse
+import json
 import os
 import sys
 import webbrowser
@@ -8,6 +16,8 @@ import dotenv
 from tools.room_tools import (
     get_all_rooms,
     get_room_info,
+    get_room_availability,
+    list_available_rooms,
     _make_request,
     _make_beta_request,
     test_graph_connection,
@@ -18,6 +28,10 @@ from tools.auth_tools import (
     get_authorization_url,
     exchange_code_for_token,
 )
+from tools.room_index import resolve_room
+from tools.occupancy import find_free_rooms
+from tools.deadlines import with_deadline
+from tools.diagnostics import default_hops, format_report, run_diagnostics
 
 # Load environment variables
 dotenv.load_dotenv()
@@ -183,8 +197,81 @@ def test_get_room_info(room_id):
         return False
 
 
+def latency_tools():
+    """The tools to time, with arguments, as the agent calls them"""
+    tools = {
+        "check_auth_status": (check_auth_status, ()),
+        "get_all_rooms": (get_all_rooms, ()),
+        "list_available_rooms": (list_available_rooms, ()),
+        "find_free_rooms": (find_free_rooms, (30,)),
+    }
+
+    rooms = get_all_rooms()
+    if rooms["status"] == "success" and rooms["rooms"]:
+        room = rooms["rooms"][0]
+        tools["resolve_room"] = (resolve_room, (room["name"],))
+        # Forced refreshes, so every sample includes the round trip
+        tools["get_room_info"] = (get_room_info, (room["id"], True))
+        tools["get_room_availability"] = (get_room_availability, (room["id"], 0))
+
+    # With the deadlines the agent's tools run under
+    return {name: (with_deadline(func), args) for name, (func, args) in tools.items()}
+
+
+def run_latency_diagnostics(args):
+    """Measure per-hop and per-tool latency and print it as a table or JSON"""
+    hops = default_hops()
+    if args.hops:
+        wanted = [name.strip() for name in args.hops.split(",")]
+        hops = {name: url for name, url in hops.items() if name in wanted}
+
+    tools = {}
+    if args.tools != "none":
+        tools = latency_tools()
+        if args.tools:
+            wanted = [name.strip() for name in args.tools.split(",")]
+            tools = {name: tool for name, tool in tools.items() if name in wanted}
+
+    report = run_diagnostics(hops, tools, args.samples)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+
+
 def main():
     """Main function to run tests"""
+    parser = argparse.ArgumentParser(
+        description="Check the connection to Microsoft Graph, or measure its latency"
+    )
+    parser.add_argument(
+        "--latency",
+        action="store_true",
+        help="Measure per-hop and per-tool latency instead of checking connectivity",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=5,
+        help="Samples per hop and per tool (default: 5)",
+    )
+    parser.add_argument(
+        "--hops",
+        default="",
+        help="Comma-separated hops to probe: local, graph, graph_beta (default: all)",
+    )
+    parser.add_argument(
+        "--tools",
+        default="",
+        help='Comma-separated tools to time (default: all, "none" to skip)',
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.latency:
+        run_latency_diagnostics(args)
+        return
+
     print("Microsoft Graph API Test Script")
     print("==============================")
 
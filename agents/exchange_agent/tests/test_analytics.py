@@ -0,0 +1,98 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from exchange_agent.tools import analytics, request_scheduler
+from exchange_agent.tools.analytics import BookingStore, _hour_pieces, _room_percentile
+from exchange_agent.tools.records import Room
+
+START = datetime.datetime(2026, 10, 19, tzinfo=datetime.timezone.utc)
+
+
+def test_hour_pieces_split_bookings_at_hour_boundaries():
+    starts = np.array([0, 1800, 3600, 5400], dtype=np.int32)
+    ends = np.array([3600, 9000, 3660, 12600], dtype=np.int32)
+    bookings, hours, seconds = _hour_pieces(starts, ends)
+
+    assert bookings.tolist() == [0, 1, 1, 1, 2, 3, 3, 3]
+    assert hours.tolist() == [0, 0, 1, 2, 1, 1, 2, 3]
+    assert seconds.tolist() == [3600, 1800, 3600, 1800, 60, 1800, 3600, 1800]
+    # Every second of every booking lands in exactly one piece
+    assert np.bincount(bookings, weights=seconds).tolist() == (ends - starts).tolist()
+
+
+def test_hour_pieces_of_no_bookings():
+    bookings, hours, seconds = _hour_pieces(np.array([]), np.array([]))
+    assert len(bookings) == len(hours) == len(seconds) == 0
+
+
+def test_room_percentile():
+    rooms = np.array([1, 0, 1, 1, 0, 1, 1])
+    values = np.array([5, 2, 1, 4, 8, 3, 2])
+    median = _room_percentile(rooms, values, 3, 0.5)
+    # Room 0 has [2, 8], room 1 [1, 2, 3, 4, 5], room 2 nothing
+    assert median[:2].tolist() == [2, 3]
+    assert np.isnan(median[2])
+    assert _room_percentile(rooms, values, 3, 1.0)[:2].tolist() == [8, 5]
+    assert _room_percentile(rooms, values, 3, 0.0)[:2].tolist() == [2, 1]
+
+
+def _event(hour: int) -> dict:
+    return {
+        "start": {"dateTime": f"2026-10-19T{hour:02}:00:00", "timeZone": "UTC"},
+        "end": {"dateTime": f"2026-10-19T{hour:02}:30:00", "timeZone": "UTC"},
+        "attendees": [],
+    }
+
+
+def _store() -> BookingStore:
+    rooms = [Room("r1", "Room 1", "r1@example.com", 4, "", "", "", (), None)]
+    return BookingStore(rooms, START, START + datetime.timedelta(days=1))
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(analytics, "SHED_BACKOFF", 0)
+
+
+def test_a_room_failing_halfway_leaves_no_bookings(monkeypatch):
+    def pages(*args, **kwargs):
+        yield {"value": [_event(9), _event(10)]}
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(analytics, "iter_graph_pages", pages)
+    store = _store()
+    analytics._load_room(store, 0, 10)
+    assert len(store) == 0
+    assert store.rooms_failed == ["r1"]
+
+
+def test_shed_rooms_are_read_again(monkeypatch):
+    attempts = []
+
+    def pages(*args, **kwargs):
+        attempts.append(1)
+        yield {"value": [_event(9)]}
+        if len(attempts) < 3:
+            raise request_scheduler.RequestShedError("busy")
+        yield {"value": [_event(10)]}
+
+    monkeypatch.setattr(analytics, "iter_graph_pages", pages)
+    store = _store()
+    analytics._load_room(store, 0, 10)
+    assert len(attempts) == 3
+    assert store.column("start").tolist() == [9 * 3600, 10 * 3600]
+    assert store.rooms_failed == []
+
+
+def test_rooms_shed_too_often_fail(monkeypatch):
+    def pages(*args, **kwargs):
+        raise request_scheduler.RequestShedError("busy")
+        yield
+
+    monkeypatch.setattr(analytics, "iter_graph_pages", pages)
+    store = _store()
+    analytics._load_room(store, 0, 10)
+    assert len(store) == 0
+    assert store.rooms_failed == ["r1"]
@@ -0,0 +1,73 @@
+import pytest
+
+from exchange_agent.tools import booking_tools
+from exchange_agent.tools.records import Room
+
+
+def _room(number: int) -> Room:
+    return Room(f"r{number}", f"Room {number}", "", 4 + number, "", "", "", (), ())
+
+
+ROOMS = [_room(number) for number in range(10)]
+
+
+class _Calendar:
+    def __init__(self, free: bool):
+        self.free = free
+
+    def is_free(self, start, end) -> bool:
+        return self.free
+
+
+@pytest.fixture
+def booking(monkeypatch):
+    """Rooms r0-r5 are busy; records the bookings sent and answers with `results`."""
+    sent = []
+    results = {}
+
+    def post_booking(room_id, *args):
+        sent.append(room_id)
+        return results.get(room_id, {"status": "success", "meeting": {"id": "m"}})
+
+    monkeypatch.setattr(booking_tools, "_get_rooms", lambda: ROOMS)
+    monkeypatch.setattr(
+        booking_tools,
+        "_get_room",
+        lambda room_id, force_refresh=False: _Calendar(int(room_id[1:]) > 5),
+    )
+    monkeypatch.setattr(booking_tools, "_post_booking", post_booking)
+    return sent, results
+
+
+def test_busy_rooms_dont_count_as_booking_attempts(booking):
+    sent, _ = booking
+    result = booking_tools.book_first_available_room("Sync")
+    assert result["status"] == "success"
+    assert sent == ["r6"]
+    assert [attempt["result"] for attempt in result["attempts"]] == ["busy"] * 6
+
+
+def test_failed_bookings_move_on_to_the_next_room(booking):
+    sent, results = booking
+    results["r6"] = {"status": "error", "error_message": "Conflict"}
+    result = booking_tools.book_first_available_room("Sync")
+    assert result["status"] == "success"
+    assert sent == ["r6", "r7"]
+
+
+def test_a_timed_out_booking_is_not_retried_in_another_room(booking):
+    sent, results = booking
+    results["r6"] = {"status": "error", "timed_out": True, "error_message": "..."}
+    result = booking_tools.book_first_available_room("Sync")
+    assert result["timed_out"]
+    assert sent == ["r6"]
+
+
+def test_gives_up_after_max_booking_attempts(booking, monkeypatch):
+    sent, results = booking
+    monkeypatch.setattr(booking_tools, "MAX_BOOKING_ATTEMPTS", 2)
+    for number in range(6, 10):
+        results[f"r{number}"] = {"status": "error", "error_message": "Conflict"}
+    result = booking_tools.book_first_available_room("Sync")
+    assert result["status"] == "error"
+    assert sent == ["r6", "r7"]
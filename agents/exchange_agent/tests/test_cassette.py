@@ -0,0 +1,45 @@
+import json
+
+from requests.structures import CaseInsensitiveDict
+
+from exchange_agent.tools import cassette
+
+
+def test_masks_the_oauth_code_in_the_url():
+    _, url, _ = cassette._request_key(
+        "get", "http://localhost/callback", params={"code": "abc", "state": "s"}
+    )
+    assert url == "http://localhost/callback?code=REDACTED&state=s"
+
+
+def test_masks_tokens_in_form_and_json_bodies():
+    _, _, body = cassette._request_key(
+        "post", "http://localhost/callback", data="access_token=abc&id_token=def&x=1"
+    )
+    assert body == "access_token=REDACTED&id_token=REDACTED&x=1"
+
+    _, _, body = cassette._request_key(
+        "post", "http://localhost/token", json={"refresh_token": "abc", "x": 1}
+    )
+    assert json.loads(body) == {"refresh_token": "REDACTED", "x": 1}
+
+
+def test_leaves_requests_without_secrets_alone():
+    key = cassette._request_key(
+        "get", "http://localhost/rooms", params={"building": "A & B"}
+    )
+    assert key == ("GET", "http://localhost/rooms?building=A+%26+B", "")
+
+
+def test_masks_recorded_response_headers():
+    headers = CaseInsensitiveDict(
+        {
+            "Content-Type": "application/json",
+            "Location": "http://localhost/done?code=abc",
+            "Set-Cookie": "session=abc",
+        }
+    )
+    assert cassette._redact_headers(headers) == {
+        "content-type": "application/json",
+        "location": "http://localhost/done?code=REDACTED",
+    }
@@ -0,0 +1,26 @@
+import time
+
+import pytest
+
+from exchange_agent.tools import deadlines
+
+
+def _trickle(chunks: int, delay: float):
+    for number in range(chunks):
+        time.sleep(delay)
+        yield number
+
+
+def test_bounded_stops_a_body_that_outlasts_the_deadline():
+    with deadlines.deadline(0.05):
+        with pytest.raises(deadlines.DeadlineExceeded):
+            list(deadlines.bounded(_trickle(100, 0.01)))
+        assert deadlines.timed_out()
+
+
+def test_bounded_passes_chunks_through_in_time():
+    with deadlines.deadline(5):
+        assert list(deadlines.bounded(_trickle(3, 0))) == [0, 1, 2]
+        assert not deadlines.timed_out()
+    # No deadline outside a tool call
+    assert list(deadlines.bounded(_trickle(3, 0))) == [0, 1, 2]
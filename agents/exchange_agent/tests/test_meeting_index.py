@@ -0,0 +1,88 @@
+import datetime
+
+import pytest
+
+from exchange_agent.tools.meeting_index import MeetingIndex
+from exchange_agent.tools.records import Event, Room
+
+DAY = datetime.datetime(2026, 10, 19, tzinfo=datetime.timezone.utc)
+
+
+def _at(hour: float) -> datetime.datetime:
+    return DAY + datetime.timedelta(hours=hour)
+
+
+def _room(room_id: str, name: str, *events) -> Room:
+    return Room(room_id, name, "", 8, "", "", "", (), tuple(events))
+
+
+def _event(event_id: str, subject: str, organizer: str, hour: float) -> Event:
+    return Event(event_id, subject, organizer, _at(hour), _at(hour + 1))
+
+
+ROOM_A = _room(
+    "a",
+    "Conference Room A",
+    _event("1", "Weekly standup", "Ada Lovelace", 9),
+    _event("2", "Budget review", "Grace Hopper", 15),
+)
+ROOM_B = _room("b", "Board Room", _event("3", "Standards", "Alan Turing", 10))
+
+
+@pytest.fixture
+def index():
+    index = MeetingIndex()
+    index.sync([("a", ROOM_A), ("b", ROOM_B)])
+    return index
+
+
+def _ids(matches):
+    return [event.id for _, event, _ in matches]
+
+
+def test_lists_every_meeting_in_the_window(index):
+    assert _ids(index.search("", _at(0), _at(24))) == ["1", "3", "2"]
+    assert _ids(index.search("", _at(9.5), _at(15))) == ["3"]
+
+
+def test_matches_words_of_the_subject_organizer_and_room(index):
+    assert _ids(index.search("budget", _at(0), _at(24))) == ["2"]
+    assert _ids(index.search("turing", _at(0), _at(24))) == ["3"]
+    matches = index.search("conference room a", _at(0), _at(24))
+    assert set(_ids(matches)) == {"1", "2"}
+
+
+def test_ranks_exact_words_above_prefixes(index):
+    matches = index.search("stand", _at(0), _at(24))
+    assert set(_ids(matches)) == {"1", "3"}
+    assert all(score < 1 for _, _, score in matches)
+
+    matches = index.search("standup", _at(0), _at(24))
+    assert _ids(matches) == ["1"]
+    assert matches[0][2] == 1.0
+
+
+def test_short_words_only_match_whole_tokens(index):
+    assert _ids(index.search("bu", _at(0), _at(24))) == []
+
+
+def test_ignores_meeting_stopwords_and_times(index):
+    matches = index.search("cancel my 3pm meeting budget", _at(0), _at(24))
+    assert _ids(matches) == ["2"]
+
+
+def test_ranks_ties_by_distance_to_the_time_asked_about(index):
+    matches = index.search("", _at(8), _at(16), around=_at(15))
+    assert _ids(matches) == ["2", "3", "1"]
+
+
+def test_sync_reindexes_changed_calendars_and_drops_uncached_ones(index):
+    renamed = _room("a", "Conference Room A", _event("4", "Retro", "Ada", 11))
+    index.sync([("a", renamed)])
+
+    assert index.room_count == 1
+    assert _ids(index.search("standup", _at(0), _at(24))) == []
+    assert _ids(index.search("standards", _at(0), _at(24))) == []
+    assert _ids(index.search("retro", _at(0), _at(24))) == ["4"]
+    # Tokens of dropped meetings no longer turn up as prefixes
+    assert index._sorted_tokens == sorted(index._postings)
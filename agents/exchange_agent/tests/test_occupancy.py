@@ -0,0 +1,105 @@
+import datetime
+
+import numpy as np
+
+from exchange_agent.tools import occupancy
+from exchange_agent.tools.occupancy import OccupancyMatrix
+from exchange_agent.tools.records import Event, Room
+
+DAY = datetime.datetime(2026, 10, 19, tzinfo=datetime.timezone.utc)
+
+
+def _at(hour: float) -> datetime.datetime:
+    return DAY + datetime.timedelta(hours=hour)
+
+
+def _room(room_id: str, *busy, capacity: int = 8) -> Room:
+    events = tuple(
+        Event(f"{room_id}-{i}", "Meeting", "Ada", _at(start), _at(end))
+        for i, (start, end) in enumerate(busy)
+    )
+    return Room(room_id, room_id.upper(), "", capacity, "", "", "", (), events)
+
+
+def _matrix(*rooms) -> OccupancyMatrix:
+    matrix = OccupancyMatrix(DAY, DAY + datetime.timedelta(days=1), 15)
+    matrix.sync((room.id, room) for room in rooms)
+    return matrix
+
+
+def _free(matrix, start, end):
+    mask = matrix.rooms_free_between(_at(start), _at(end))
+    return {room_id for room_id, free in zip(matrix.room_ids, mask) if free}
+
+
+def test_marks_the_slots_each_event_overlaps():
+    matrix = _matrix(_room("a", (9, 10)), _room("b", (9.1, 9.2)))
+    assert matrix.busy.shape == (2, 96)
+    assert matrix.busy[0].sum() == 4
+    # An event inside a slot still makes the whole slot busy
+    assert list(np.flatnonzero(matrix.busy[1])) == [36]
+
+
+def test_rooms_free_between():
+    matrix = _matrix(_room("a", (9, 10)), _room("b", (10, 11)), _room("c"))
+    assert _free(matrix, 9, 10) == {"b", "c"}
+    assert _free(matrix, 9.5, 10.5) == {"c"}
+    assert _free(matrix, 11, 12) == {"a", "b", "c"}
+
+
+def test_free_window_starts_finds_runs_of_free_slots():
+    matrix = _matrix(_room("a", (9, 9.5), (10, 11)))
+    free, candidates = matrix.free_window_starts(30, _at(9), _at(11))
+    starts = [candidates[i] for i in np.flatnonzero(free[0])]
+    assert starts == [_at(9.5)]
+
+
+def test_free_window_starts_checks_an_unaligned_start():
+    matrix = _matrix(_room("a", (9.5, 10)))
+    free, candidates = matrix.free_window_starts(15, _at(9.1), _at(9.5))
+    assert candidates[0] == _at(9.1)
+    assert free[0].tolist() == [True, True]
+
+
+def test_utilization():
+    matrix = _matrix(_room("a", (9, 10)), _room("b"))
+    assert matrix.utilization(_at(9), _at(11)).tolist() == [0.5, 0.0]
+    assert matrix.utilization(_at(9), _at(9)).tolist() == [0.0, 0.0]
+
+
+def test_sync_rebuilds_changed_calendars():
+    matrix = _matrix(_room("a", (9, 10)))
+    matrix.sync([("a", _room("a", (14, 15)))])
+    assert _free(matrix, 9, 10) == {"a"}
+    assert _free(matrix, 14, 15) == set()
+
+
+def test_sync_drops_calendars_no_longer_cached():
+    a, b, c = _room("a", (9, 10)), _room("b", (9, 10)), _room("c", (12, 13))
+    matrix = _matrix(a, b, c)
+
+    # "a" was evicted or invalidated; its old events must not linger
+    matrix.sync([("b", b), ("c", c)])
+    assert sorted(matrix.room_ids) == ["b", "c"]
+    assert _free(matrix, 9, 10) == {"c"}
+    assert _free(matrix, 12, 13) == {"b"}
+    for row, room_id in enumerate(matrix.room_ids):
+        assert matrix.room_at(row).id == room_id
+
+    # A room without a calendar counts as not cached
+    matrix.sync([("b", b), ("c", Room("c", "C", "", 8, "", "", "", (), None))])
+    assert matrix.room_ids == ["b"]
+
+
+def test_load_calendars_bounds_the_age_of_every_calendar(monkeypatch):
+    rooms = [_room("a"), _room("b")]
+    calls = []
+    monkeypatch.setattr(occupancy, "_get_rooms", lambda: rooms)
+    monkeypatch.setattr(
+        occupancy,
+        "_get_room",
+        lambda room_id, max_age=None: calls.append((room_id, max_age)),
+    )
+    # Cached rooms are checked too, so stale calendars get refetched
+    assert occupancy._load_calendars(30) is None
+    assert calls == [("a", 30), ("b", 30)]
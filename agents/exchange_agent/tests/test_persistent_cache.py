@@ -0,0 +1,75 @@
+import datetime
+
+import pytest
+
+from exchange_agent.tools import persistent_cache
+from exchange_agent.tools.records import Event, Room, normalize_room
+from exchange_agent.tools.tenants import register_tenant, use_tenant
+
+NOON = datetime.datetime(2026, 10, 19, 12, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture
+def tenant(tmp_path):
+    tenant = register_tenant(
+        "test-persistent-cache",
+        cache_db_path=str(tmp_path / "cache.db"),
+        token_cache_file=str(tmp_path / "token.json"),
+    )
+    with use_tenant(tenant):
+        yield tenant
+
+
+DIRECTORY = [
+    Room("r1", "Board Room", "board@example.com", 12, "HQ", "3", "Amsterdam", ()),
+    Room("r2", "Aquarium", "aquarium@example.com", 4, "HQ", "1", "Amsterdam", ()),
+]
+
+
+def test_saving_a_calendar_keeps_the_directory_fields(tenant):
+    persistent_cache.save_rooms(DIRECTORY)
+
+    # Shaped like the server's RoomInfo: no displayName or capacity
+    detail = normalize_room(
+        {
+            "roomName": "Board Room",
+            "location": "",
+            "equipment": ["screen"],
+            "availability": [
+                {
+                    "id": "m1",
+                    "title": "Standup",
+                    "startTime": NOON.isoformat(),
+                    "endTime": (NOON + datetime.timedelta(hours=1)).isoformat(),
+                }
+            ],
+        },
+        "r1",
+        with_details=True,
+    )
+    persistent_cache.save_room(detail)
+
+    rooms, _ = persistent_cache.load_rooms()
+    assert rooms[0].name == "Board Room"
+    assert rooms[0].capacity == 12
+    assert (rooms[0].building, rooms[0].floor, rooms[0].location) == (
+        "HQ",
+        "3",
+        "Amsterdam",
+    )
+    assert rooms[0].equipment == ("screen",)
+    assert rooms[1].to_dict() == DIRECTORY[1].to_dict()
+
+    room, _ = persistent_cache.load_room("r1")
+    assert (room.name, room.capacity) == ("Board Room", 12)
+    assert [event.id for event in room.availability] == ["m1"]
+
+
+def test_saving_a_room_missing_from_the_directory(tenant):
+    room = Room("r3", "Loft", "loft@example.com", 6, "", "", "", ("tv",), ())
+    persistent_cache.save_room(room)
+    loaded, _ = persistent_cache.load_room("r3")
+    assert (loaded.name, loaded.capacity, loaded.equipment) == ("Loft", 6, ("tv",))
+    assert loaded.availability == ()
+    # Not part of the saved directory
+    assert persistent_cache.load_rooms() is None
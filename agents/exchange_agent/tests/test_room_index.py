@@ -0,0 +1,84 @@
+import pytest
+
+from exchange_agent.tools.records import Room
+from exchange_agent.tools.room_index import RoomIndex
+
+
+def _room(room_id: str, name: str, email: str = "", building: str = "") -> Room:
+    return Room(room_id, name, email, 8, building, "", "", (), None)
+
+
+ROOMS = [
+    _room("a", "Conference Room A", "conf.a@example.com", "HQ"),
+    _room("b", "Conference Room B", "conf.b@example.com", "HQ"),
+    _room("board", "The Board Room", "boardroom@example.com", "Annex"),
+    _room("cafe", "Café Lounge", "lounge@example.com", "Annex"),
+]
+
+
+@pytest.fixture
+def index():
+    index = RoomIndex()
+    index.sync(ROOMS)
+    return index
+
+
+def _ids(matches):
+    return [room.id for room, _ in matches]
+
+
+def test_exact_name_scores_one(index):
+    matches = index.search("conference room a")
+    assert matches[0] == (ROOMS[0], 1.0)
+    assert all(score < 1 for _, score in matches[1:])
+
+
+def test_ignores_case_accents_and_stopwords(index):
+    assert index.search("board room")[0] == (ROOMS[2], 1.0)
+    assert index.search("CAFE LOUNGE")[0] == (ROOMS[3], 1.0)
+
+
+def test_prefixes_match_below_whole_words(index):
+    matches = index.search("conf a")
+    assert _ids(matches)[0] == "a"
+    assert 0 < matches[0][1] < 1
+
+    whole = dict(index.search("conference"))
+    prefix = dict(index.search("confer"))
+    assert prefix[ROOMS[0]] < whole[ROOMS[0]]
+
+
+def test_name_matches_outrank_other_fields(index):
+    # "annex" is the building of two rooms, "lounge" the name of one
+    matches = index.search("annex lounge")
+    assert _ids(matches)[0] == "cafe"
+
+
+def test_misspellings_match_by_ngrams(index):
+    assert _ids(index.search("bord room"))[0] == "board"
+
+
+def test_scores_are_between_zero_and_one(index):
+    for query in ("room", "hq", "b", "conference room"):
+        for _, score in index.search(query):
+            assert 0 < score <= 1
+
+
+def test_empty_query_matches_nothing(index):
+    assert index.search("") == []
+    assert index.search("the") == []
+
+
+def test_sync_follows_renames_and_removals(index):
+    renamed = _room("a", "Aquarium", "conf.a@example.com", "HQ")
+    index.sync([renamed, ROOMS[1]])
+    assert len(index) == 2
+    assert "a" not in _ids(index.search("conference room a")[:1])
+    assert index.search("aquarium")[0] == (renamed, 1.0)
+    assert "board" not in _ids(index.search("board room"))
+
+
+def test_named_in_needs_the_whole_name(index):
+    named = index.named_in("cancel standup in conference room a")
+    assert [room.id for room in named] == ["a"]
+    assert index.named_in("conference room") == []
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from exchange_agent.tools.room_tools import _iter_json_array
+
+
+def _chunked(text: str, size: int):
+    data = text.encode("utf-8")
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+ARRAYS = [
+    "[]",
+    "[1.5]",
+    "[1.5e-3, -2E+10, 0]",
+    "[12345, 678]",
+    '["a]b", "[c]", "\\"]"]',
+    '[{"name": "Room ]A[", "capacity": 8}, {"tags": ["x", "]"]}]',
+    "[true, false, null]",
+    " [ 1 ,\n 2 ] ",
+    '["Konferenzraum Zürich", "会议室"]',
+]
+
+
+@pytest.mark.parametrize("text", ARRAYS)
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1024])
+def test_decodes_array_split_at_any_chunk_boundary(text, size):
+    assert list(_iter_json_array(_chunked(text, size))) == json.loads(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "[,1]",
+        "[1,,2]",
+        "[1,]",
+        "[1 2]",
+        "[1.]",
+        "[1.5x]",
+        "[1",
+        "[1,",
+        '["abc',
+        "{}",
+        "",
+    ],
+)
+@pytest.mark.parametrize("size", [1, 3, 1024])
+def test_rejects_malformed_arrays(text, size):
+    with pytest.raises(ValueError):
+        list(_iter_json_array(_chunked(text, size)))
+
+
+def test_yields_elements_before_the_rest_arrives():
+    def chunks():
+        yield b'[{"id": 1}, '
+        yield b'{"id": 2}'
+        raise AssertionError("read past the second element")
+
+    elements = _iter_json_array(chunks())
+    assert next(elements) == {"id": 1}
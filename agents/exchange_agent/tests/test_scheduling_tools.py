@@ -0,0 +1,89 @@
+import datetime
+
+from exchange_agent.tools import scheduling_tools
+from exchange_agent.tools.records import Room
+from exchange_agent.tools.scheduling_tools import (
+    _free_intervals,
+    _intersect_intervals,
+    _merge_intervals,
+    _parse_window,
+)
+
+DAY = datetime.datetime(2026, 10, 19, tzinfo=datetime.timezone.utc)
+
+
+def _at(hour: float) -> datetime.datetime:
+    return DAY + datetime.timedelta(hours=hour)
+
+
+def _intervals(*hours):
+    return [(_at(start), _at(end)) for start, end in hours]
+
+
+def test_merge_sorts_and_joins_overlapping_and_touching_intervals():
+    merged = _merge_intervals(_intervals((13, 14), (9, 10), (9.5, 11), (11, 12)))
+    assert merged == _intervals((9, 12), (13, 14))
+    # A contained interval doesn't shorten the one around it
+    assert _merge_intervals(_intervals((9, 12), (10, 11))) == _intervals((9, 12))
+    assert _merge_intervals([]) == []
+
+
+def test_free_intervals_subtract_busy_from_the_window():
+    window = (_at(9), _at(18))
+    busy = _intervals((8, 10), (12, 13), (17, 19))
+    assert _free_intervals(window, busy) == _intervals((10, 12), (13, 17))
+    assert _free_intervals(window, []) == [window]
+    assert _free_intervals(window, _intervals((8, 19))) == []
+    assert _free_intervals(window, _intervals((6, 7), (19, 20))) == [window]
+
+
+def test_intersect_keeps_the_overlaps():
+    left = _intervals((9, 11), (12, 15))
+    right = _intervals((10, 13), (14, 16))
+    assert _intersect_intervals(left, right) == _intervals((10, 11), (12, 13), (14, 15))
+    # Touching intervals don't overlap
+    assert _intersect_intervals(_intervals((9, 10)), _intervals((10, 11))) == []
+    assert _intersect_intervals(left, []) == []
+
+
+def test_parse_window():
+    start, end = _parse_window("2030-01-02")
+    assert (start.hour, end.hour) == (9, 18)
+    assert start.date() == end.date() == datetime.date(2030, 1, 2)
+
+    start, end = _parse_window("2030-01-02 13:00 to 2030-01-02 15:00")
+    assert (start.hour, end.hour) == (13, 15)
+
+
+def test_parse_window_rejects_unparseable_times():
+    assert _parse_window("next blursday") is None
+    assert _parse_window("2030-01-02 13:00 to whenever") is None
+    assert _parse_window("today at noonish to 2030-01-02") is None
+
+
+def test_attendees_without_free_busy_are_reported_unchecked(monkeypatch):
+    room = Room("r1", "Room 1", "r1@example.com", 4, "", "", "", (), None)
+    monkeypatch.setattr(scheduling_tools, "_get_rooms", lambda: [room])
+    # getSchedule had an error for bob, so his mailbox is missing
+    monkeypatch.setattr(
+        scheduling_tools,
+        "_fetch_schedules",
+        lambda emails, window: {"alice@example.com": []},
+    )
+    monkeypatch.setattr(
+        scheduling_tools,
+        "_room_busy_intervals",
+        lambda rooms, window, max_age: {"r1": []},
+    )
+
+    result = scheduling_tools.find_meeting_time(
+        ["Alice@example.com", "bob@example.com"], window="2030-01-02"
+    )
+    assert result["status"] == "success"
+    assert result["attendees_checked"] == 1
+    assert result["unchecked_attendees"] == ["bob@example.com"]
+
+
+def test_unparseable_window_is_an_error():
+    result = scheduling_tools.find_meeting_time(["a@example.com"], window="someday")
+    assert result["status"] == "error"
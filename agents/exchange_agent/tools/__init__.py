@@ -5,13 +5,29 @@ from .room_tools import (
     get_room_availability,
     list_available_rooms,
 )
-from .booking_tools import book_room, cancel_meeting, parse_datetime
+from .booking_tools import (
+    book_room,
+    book_first_available_room,
+    cancel_meeting,
+    parse_datetime,
+)
 from .auth_tools import (
     check_auth_status,
     get_authorization_url,
     exchange_code_for_token,
     set_token_from_form_data,
 )
+from .occupancy import find_free_rooms, get_room_utilization
+from .scheduling_tools import find_meeting_time
+from .warmup import start_warmup, get_warmup_status
+from .room_events import start_room_events, stop_room_events
+from .refresher import start_refresher, stop_refresher, get_refresher_status
+from .room_index import resolve_room
+from .meeting_index import find_meetings
+from .profiling import profiled, enable_profiling, disable_profiling
+from .log import logged_tool, configure_logging
+from .deadlines import with_deadline, deadline
+from .tenants import register_tenant, load_tenants, use_tenant, current_tenant
 
 # Export all tools for easy importing
 __all__ = [
@@ -21,10 +37,34 @@ __all__ = [
     "get_room_availability",
     "list_available_rooms",
     "book_room",
+    "book_first_available_room",
     "cancel_meeting",
     "parse_datetime",
     "check_auth_status",
     "get_authorization_url",
     "exchange_code_for_token",
     "set_token_from_form_data",
+    "find_free_rooms",
+    "get_room_utilization",
+    "find_meeting_time",
+    "start_warmup",
+    "get_warmup_status",
+    "start_room_events",
+    "stop_room_events",
+    "start_refresher",
+    "stop_refresher",
+    "get_refresher_status",
+    "resolve_room",
+    "find_meetings",
+    "profiled",
+    "enable_profiling",
+    "disable_profiling",
+    "logged_tool",
+    "configure_logging",
+    "with_deadline",
+    "deadline",
+    "register_tenant",
+    "load_tenants",
+    "use_tenant",
+    "current_tenant",
 ]
@@ -0,0 +1,615 @@
+import contextvars
+import csv
+import datetime
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from . import request_scheduler
+from .records import Room, parse_timestamp
+from .room_tools import _get_rooms, _room_matches, iter_graph_pages
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Only the event properties the aggregates need are requested from Graph
+ANALYTICS_EVENT_FIELDS = ["start", "end", "isCancelled", "attendees"]
+
+# Events per calendarView page, and room calendars streamed at once; only
+# this many pages are held as JSON at a time
+ANALYTICS_PAGE_SIZE = int(os.environ.get("EXCHANGE_ANALYTICS_PAGE_SIZE", "250"))
+ANALYTICS_CONCURRENCY = int(os.environ.get("EXCHANGE_ANALYTICS_CONCURRENCY", "4"))
+
+# A room whose requests were shed by the busy scheduler is read again this
+# many times, after SHED_BACKOFF seconds, doubling each time
+SHED_RETRIES = 3
+SHED_BACKOFF = 1.0
+
+# Local hours (start-end, weekdays) room utilization is measured against
+BUSINESS_HOURS = tuple(
+    int(hour)
+    for hour in os.environ.get("EXCHANGE_ANALYTICS_BUSINESS_HOURS", "8-18").split("-")
+)
+
+# A room and hour of the week are no-show-prone when at least
+# NO_SHOW_MIN_BOOKINGS of its bookings were seen and at least NO_SHOW_SHARE
+# of them were unconfirmed (invitees, none of whom accepted)
+NO_SHOW_MIN_BOOKINGS = 4
+NO_SHOW_SHARE = 0.5
+
+# Rooms need this many bookings before they're right-sized; a room is
+# oversized when 90% of its meetings fill at most OVERSIZED_SHARE of it,
+# and undersized when its median meeting doesn't fit
+SIZING_MIN_BOOKINGS = 10
+OVERSIZED_SHARE = 0.5
+
+HOURS_PER_WEEK = 7 * 24
+DAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+# Bookings processed at a time when computing aggregates, and rows converted
+# at a time when exporting a table
+CHUNK_ROWS = 100_000
+
+_INITIAL_CAPACITY = 1024
+
+
+class BookingStore:
+    """Columnar store of the bookings of many rooms over a period.
+
+    Each booking takes 16 bytes: the room's row in ``rooms``, start and end
+    in seconds since ``start`` (clipped to the period), the number of
+    invitees and how many of them accepted. Columns grow by doubling, like
+    the occupancy matrix, so appending a page of bookings is amortized O(n).
+    """
+
+    COLUMNS = {
+        "room": np.int32,
+        "start": np.int32,
+        "end": np.int32,
+        "invitees": np.int16,
+        "accepted": np.int16,
+    }
+
+    def __init__(
+        self, rooms: List[Room], start: datetime.datetime, end: datetime.datetime
+    ):
+        self.rooms = rooms
+        self.start = start
+        self.end = end
+        self.span = int((end - start).total_seconds())
+        self.rooms_failed: List[str] = []
+        self._size = 0
+        self._columns = {
+            name: np.empty(_INITIAL_CAPACITY, dtype)
+            for name, dtype in self.COLUMNS.items()
+        }
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns.values())
+
+    def column(self, name: str) -> np.ndarray:
+        """The filled part of a column (a view, not a copy)."""
+        return self._columns[name][: self._size]
+
+    def append(
+        self,
+        room_row: int,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        invitees: np.ndarray,
+        accepted: np.ndarray,
+    ):
+        """Add bookings of one room, given as epoch seconds; parts outside the period are cut off."""
+        origin = self.start.timestamp()
+        starts = np.clip(starts - origin, 0, self.span)
+        ends = np.clip(ends - origin, 0, self.span)
+        keep = ends > starts
+        count = int(keep.sum())
+        if not count:
+            return
+
+        with self._lock:
+            needed = self._size + count
+            capacity = len(self._columns["room"])
+            if needed > capacity:
+                capacity = max(needed, capacity * 2)
+                for name, column in self._columns.items():
+                    grown = np.empty(capacity, column.dtype)
+                    grown[: self._size] = column[: self._size]
+                    self._columns[name] = grown
+
+            filled = slice(self._size, needed)
+            self._columns["room"][filled] = room_row
+            self._columns["start"][filled] = starts[keep]
+            self._columns["end"][filled] = ends[keep]
+            self._columns["invitees"][filled] = invitees[keep]
+            self._columns["accepted"][filled] = accepted[keep]
+            self._size = needed
+
+
+def _page_columns(
+    raw_events: Iterable[Dict[str, Any]],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Start and end epoch seconds, invitees and acceptances of a page of Graph events."""
+    starts, ends, invitees, accepted = [], [], [], []
+    for raw in raw_events:
+        if raw.get("isCancelled"):
+            continue
+        start = parse_timestamp(raw.get("start"))
+        end = parse_timestamp(raw.get("end"))
+        if start is None or end is None:
+            continue
+        # The room itself and other resources are attendees too
+        people = [
+            attendee
+            for attendee in raw.get("attendees") or ()
+            if attendee.get("type") != "resource"
+        ]
+        starts.append(start.timestamp())
+        ends.append(end.timestamp())
+        invitees.append(len(people))
+        accepted.append(
+            sum(
+                (attendee.get("status") or {}).get("response") == "accepted"
+                for attendee in people
+            )
+        )
+    return (
+        np.array(starts, dtype=np.float64),
+        np.array(ends, dtype=np.float64),
+        np.array(invitees, dtype=np.int16),
+        np.array(accepted, dtype=np.int16),
+    )
+
+
+def _read_room(
+    store: BookingStore, room: Room, page_size: int
+) -> Optional[Tuple[np.ndarray, ...]]:
+    """The columns of a room's bookings in the period, None if it has none."""
+    params = {
+        "startDateTime": store.start.astimezone(datetime.timezone.utc).isoformat(),
+        "endDateTime": store.end.astimezone(datetime.timezone.utc).isoformat(),
+    }
+    pages = [
+        _page_columns(page.get("value", ()))
+        for page in iter_graph_pages(
+            f"/users/{room.email}/calendarView",
+            params,
+            page_size=page_size,
+            select=ANALYTICS_EVENT_FIELDS,
+        )
+    ]
+    if not pages:
+        return None
+    return tuple(np.concatenate(parts) for parts in zip(*pages))
+
+
+def _room_failed(store: BookingStore, room: Room, error: Exception):
+    logger.warning(
+        "Error loading calendar history: %s", error, extra={"room_id": room.id}
+    )
+    with store._lock:
+        store.rooms_failed.append(room.id)
+
+
+def _load_room(store: BookingStore, row: int, page_size: int):
+    # A room's bookings are only added once its whole history was read, so a
+    # room failing halfway leaves no partial rows in the aggregates
+    room = store.rooms[row]
+    for attempt in range(SHED_RETRIES + 1):
+        try:
+            columns = _read_room(store, room, page_size)
+        except request_scheduler.RequestShedError as e:
+            # The scheduler is busy with interactive calls; try again later
+            if attempt < SHED_RETRIES:
+                time.sleep(SHED_BACKOFF * 2**attempt)
+                continue
+            _room_failed(store, room, e)
+        except Exception as e:
+            _room_failed(store, room, e)
+        else:
+            if columns is not None:
+                store.append(row, *columns)
+        return
+
+
+def load_bookings(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    building: str = "",
+    min_capacity: int = 0,
+    concurrency: int = ANALYTICS_CONCURRENCY,
+    page_size: int = ANALYTICS_PAGE_SIZE,
+) -> Optional[BookingStore]:
+    """Stream the calendar history of every room from Graph into a BookingStore.
+
+    Each room's calendarView is read page by page and every page is
+    converted to columns before the next one is parsed, so memory holds the
+    columns plus a few pages of JSON. A room's bookings are added once its
+    whole history was read, so rooms that fail are left out of the
+    aggregates entirely. The period is widened to whole hours. Requests run
+    at background priority, behind the agent's tool calls; rooms whose
+    requests were shed are retried with backoff.
+
+    Args:
+        start: Start of the period (timezone-aware)
+        end: End of the period (timezone-aware)
+        building: Only rooms in this building
+        min_capacity: Only rooms with at least this capacity
+        concurrency: Room calendars streamed at once, at most the Graph
+            backend's background slots (more would only queue and be shed)
+        page_size: Events requested per page
+
+    Returns:
+        BookingStore: The bookings, or None if the room directory couldn't be
+        loaded. Rooms whose history couldn't be read are in rooms_failed.
+    """
+    rooms = _get_rooms()
+    if rooms is None:
+        return None
+    rooms = [
+        room
+        for room in rooms
+        if room.email and _room_matches(room, building, min_capacity)
+    ]
+
+    hour = datetime.timedelta(hours=1)
+    start = start.astimezone(datetime.timezone.utc).replace(
+        minute=0, second=0, microsecond=0
+    )
+    end = end.astimezone(datetime.timezone.utc)
+    if end.replace(minute=0, second=0, microsecond=0) != end:
+        end = end.replace(minute=0, second=0, microsecond=0) + hour
+    store = BookingStore(rooms, start, end)
+
+    workers = max(1, min(concurrency, request_scheduler.background_limit("graph")))
+    with request_scheduler.priority(request_scheduler.BACKGROUND), ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="exchange-analytics"
+    ) as executor:
+        for future in [
+            executor.submit(
+                contextvars.copy_context().run, _load_room, store, row, page_size
+            )
+            for row in range(len(rooms))
+        ]:
+            future.result()
+
+    logger.info(
+        "Loaded %s bookings of %s rooms (%s failed) into %.1f MB",
+        len(store),
+        len(rooms),
+        len(store.rooms_failed),
+        store.nbytes / 1e6,
+    )
+    return store
+
+
+def _hours_of_week(store: BookingStore) -> np.ndarray:
+    """The local hour of the week (Monday 00:00 = 0) of every hour in the period."""
+    hours = math.ceil(store.span / 3600)
+    hour_of_week = np.empty(hours, dtype=np.int16)
+    for index in range(hours):
+        local = (store.start + datetime.timedelta(hours=index)).astimezone()
+        hour_of_week[index] = local.weekday() * 24 + local.hour
+    return hour_of_week
+
+
+def _hour_pieces(
+    starts: np.ndarray, ends: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split bookings at the hour boundaries of the period.
+
+    Returns:
+        tuple: For each piece, the booking it belongs to, the hour of the
+        period it falls in and its length in seconds.
+    """
+    starts = starts.astype(np.int64)
+    ends = ends.astype(np.int64)
+    first = starts // 3600
+    counts = (ends - 1) // 3600 - first + 1
+
+    bookings = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.arange(len(bookings)) - np.repeat(np.cumsum(counts) - counts, counts)
+    hours = first[bookings] + offsets
+    seconds = np.minimum(ends[bookings], (hours + 1) * 3600) - np.maximum(
+        starts[bookings], hours * 3600
+    )
+    return bookings, hours, seconds
+
+
+def _booked_seconds(
+    store: BookingStore, hour_of_week: np.ndarray, business: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Booked seconds per room, per room in business hours and per hour of the week.
+
+    Bookings are split into hour pieces CHUNK_ROWS at a time, so the
+    temporary arrays don't grow with the number of bookings.
+    """
+    room_count = len(store.rooms)
+    room_booked = np.zeros(room_count)
+    room_business = np.zeros(room_count)
+    week_booked = np.zeros(HOURS_PER_WEEK)
+    for first in range(0, len(store), CHUNK_ROWS):
+        chunk = slice(first, first + CHUNK_ROWS)
+        bookings, hours, seconds = _hour_pieces(
+            store.column("start")[chunk], store.column("end")[chunk]
+        )
+        rooms = store.column("room")[chunk][bookings]
+        in_business = business[hours]
+        room_booked += np.bincount(rooms, weights=seconds, minlength=room_count)
+        room_business += np.bincount(
+            rooms[in_business], weights=seconds[in_business], minlength=room_count
+        )
+        week_booked += np.bincount(
+            hour_of_week[hours], weights=seconds, minlength=HOURS_PER_WEEK
+        )
+    return room_booked, room_business, week_booked
+
+
+def _room_percentile(
+    rooms: np.ndarray, values: np.ndarray, room_count: int, fraction: float
+) -> np.ndarray:
+    """A percentile of the values of each room (NaN for rooms without any)."""
+    order = np.lexsort((values, rooms))
+    sorted_values = values[order]
+    counts = np.bincount(rooms, minlength=room_count)
+    firsts = np.cumsum(counts) - counts
+    result = np.full(room_count, np.nan)
+    has = counts > 0
+    picks = firsts[has] + np.floor((counts[has] - 1) * fraction).astype(np.int64)
+    result[has] = sorted_values[picks]
+    return result
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, 0.0)
+
+
+def utilization_report(store: BookingStore) -> Dict[str, Dict[str, np.ndarray]]:
+    """Compute the utilization aggregates of a BookingStore.
+
+    Utilization is the booked share of the rooms' business hours
+    (BUSINESS_HOURS on weekdays, local time); overlapping bookings of a room
+    count twice. An unconfirmed booking has invitees, none of whom accepted.
+
+    Returns:
+        dict: Tables by name, each a dict of equally long columns:
+        "rooms", "buildings", "hour_of_week", "no_show_slots" and
+        "right_sizing".
+    """
+    room_count = len(store.rooms)
+    rooms = store.column("room")
+    invitees = store.column("invitees").astype(np.int64)
+    unconfirmed = (invitees > 0) & (store.column("accepted") == 0)
+
+    hour_of_week = _hours_of_week(store)
+    weekday, hour = np.divmod(hour_of_week, 24)
+    business = (weekday < 5) & (hour >= BUSINESS_HOURS[0]) & (hour < BUSINESS_HOURS[1])
+    business_seconds = float(business.sum()) * 3600
+
+    room_booked, room_business, week_booked = _booked_seconds(
+        store, hour_of_week, business
+    )
+
+    # Per room
+    room_bookings = np.bincount(rooms, minlength=room_count)
+    room_unconfirmed = np.bincount(rooms, weights=unconfirmed, minlength=room_count)
+    room_ids = np.array([room.id for room in store.rooms], dtype=object)
+    room_names = np.array([room.name for room in store.rooms], dtype=object)
+    capacities = np.array([room.capacity for room in store.rooms], dtype=np.int64)
+
+    # Per building
+    building_names, building_of_room = np.unique(
+        np.array([room.building or "" for room in store.rooms], dtype=str),
+        return_inverse=True,
+    )
+    building_count = len(building_names)
+    building_rooms = np.bincount(building_of_room, minlength=building_count)
+    building_business = np.bincount(
+        building_of_room, weights=room_business, minlength=building_count
+    )
+
+    # Per hour of the week, across all rooms
+    week_hours = np.bincount(hour_of_week, minlength=HOURS_PER_WEEK)
+    booking_hours = hour_of_week[store.column("start") // 3600]
+    week_bookings = np.bincount(booking_hours, minlength=HOURS_PER_WEEK)
+
+    # No-show-prone rooms and hours of the week
+    slots = rooms.astype(np.int64) * HOURS_PER_WEEK + booking_hours
+    slot_bookings = np.bincount(slots, minlength=room_count * HOURS_PER_WEEK)
+    slot_unconfirmed = np.bincount(
+        slots, weights=unconfirmed, minlength=room_count * HOURS_PER_WEEK
+    )
+    slot_share = _ratio(slot_unconfirmed, slot_bookings)
+    prone = np.flatnonzero(
+        (slot_bookings >= NO_SHOW_MIN_BOOKINGS) & (slot_share >= NO_SHOW_SHARE)
+    )
+    prone = prone[np.lexsort((-slot_bookings[prone], -slot_share[prone]))]
+    prone_rooms, prone_hours = np.divmod(prone, HOURS_PER_WEEK)
+
+    # Right-sizing: invitees plus the organizer against capacity
+    headcount = invitees + 1
+    median = _room_percentile(rooms, headcount, room_count, 0.5)
+    p90 = _room_percentile(rooms, headcount, room_count, 0.9)
+    sized = np.flatnonzero((room_bookings >= SIZING_MIN_BOOKINGS) & (capacities > 0))
+    recommendation = np.where(
+        median[sized] > capacities[sized],
+        "larger",
+        np.where(p90[sized] <= capacities[sized] * OVERSIZED_SHARE, "smaller", "ok"),
+    )
+
+    return {
+        "rooms": {
+            "room_id": room_ids,
+            "room_name": room_names,
+            "building": building_names[building_of_room],
+            "capacity": capacities,
+            "bookings": room_bookings,
+            "booked_hours": np.round(room_booked / 3600, 2),
+            "utilization": np.round(_ratio(room_business, business_seconds), 4),
+            "unconfirmed_share": np.round(_ratio(room_unconfirmed, room_bookings), 4),
+        },
+        "buildings": {
+            "building": building_names,
+            "rooms": building_rooms,
+            "bookings": np.bincount(
+                building_of_room, weights=room_bookings, minlength=building_count
+            ).astype(np.int64),
+            "booked_hours": np.round(
+                np.bincount(
+                    building_of_room, weights=room_booked, minlength=building_count
+                )
+                / 3600,
+                2,
+            ),
+            "utilization": np.round(
+                _ratio(building_business, building_rooms * business_seconds), 4
+            ),
+        },
+        "hour_of_week": {
+            "day": np.array(DAY_NAMES, dtype=object).repeat(24),
+            "hour": np.tile(np.arange(24), 7),
+            "bookings": week_bookings,
+            "utilization": np.round(
+                _ratio(week_booked, week_hours * 3600.0 * room_count), 4
+            ),
+        },
+        "no_show_slots": {
+            "room_id": room_ids[prone_rooms],
+            "room_name": room_names[prone_rooms],
+            "day": np.array(DAY_NAMES, dtype=object)[prone_hours // 24],
+            "hour": prone_hours % 24,
+            "bookings": slot_bookings[prone],
+            "unconfirmed": slot_unconfirmed[prone].astype(np.int64),
+            "unconfirmed_share": np.round(slot_share[prone], 4),
+        },
+        "right_sizing": {
+            "room_id": room_ids[sized],
+            "room_name": room_names[sized],
+            "capacity": capacities[sized],
+            "bookings": room_bookings[sized],
+            "median_headcount": median[sized],
+            "p90_headcount": p90[sized],
+            "recommendation": recommendation,
+        },
+    }
+
+
+def _chunks(
+    columns: Dict[str, np.ndarray], chunk_rows: int
+) -> Iterator[Dict[str, np.ndarray]]:
+    rows = len(next(iter(columns.values()))) if columns else 0
+    for first in range(0, max(rows, 1), chunk_rows):
+        yield {
+            name: column[first : first + chunk_rows] for name, column in columns.items()
+        }
+
+
+def _csv_values(column: np.ndarray) -> List[Any]:
+    if np.issubdtype(column.dtype, np.datetime64):
+        return np.datetime_as_string(column).tolist()
+    return column.tolist()
+
+
+def _write_csv(path: str, chunks: Iterable[Dict[str, np.ndarray]]):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        for number, chunk in enumerate(chunks):
+            if number == 0:
+                writer.writerow(list(chunk))
+            writer.writerows(zip(*(_csv_values(column) for column in chunk.values())))
+
+
+def _write_parquet(path: str, chunks: Iterable[Dict[str, np.ndarray]]):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export needs the pyarrow package")
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.table(chunk, schema=writer.schema if writer else None)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+_WRITERS = {"csv": _write_csv, "parquet": _write_parquet}
+
+
+def export_table(path: str, chunks: Iterable[Dict[str, np.ndarray]], fmt: str = "csv"):
+    """Write a table given as chunks of columns to a CSV or Parquet file.
+
+    Only one chunk is converted at a time, so a table can be exported
+    without holding all of its rows as Python objects or Arrow arrays.
+    """
+    writer = _WRITERS.get(fmt)
+    if writer is None:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    writer(path, chunks)
+
+
+def _booking_chunks(
+    store: BookingStore, chunk_rows: int = CHUNK_ROWS
+) -> Iterator[Dict[str, np.ndarray]]:
+    """Every booking with its room ID and UTC times, chunk_rows at a time."""
+    room_ids = np.array([room.id for room in store.rooms], dtype=object)
+    origin = np.datetime64(int(store.start.timestamp()), "s")
+    for chunk in _chunks(
+        {name: store.column(name) for name in BookingStore.COLUMNS}, chunk_rows
+    ):
+        yield {
+            "room_id": room_ids[chunk["room"]],
+            "start_utc": origin + chunk["start"].astype("timedelta64[s]"),
+            "end_utc": origin + chunk["end"].astype("timedelta64[s]"),
+            "invitees": chunk["invitees"],
+            "accepted": chunk["accepted"],
+        }
+
+
+def export_report(
+    store: BookingStore,
+    directory: str,
+    fmt: str = "csv",
+    include_bookings: bool = False,
+) -> Dict[str, str]:
+    """Compute the utilization report and write one file per table.
+
+    Args:
+        store: The bookings, from load_bookings
+        directory: Directory the files are written to (created if missing)
+        fmt: "csv" or "parquet" (needs pyarrow)
+        include_bookings: Also export every booking, in chunks
+
+    Returns:
+        dict: Path of each written file by table name.
+    """
+    os.makedirs(directory, exist_ok=True)
+    tables = {
+        name: _chunks(columns, CHUNK_ROWS)
+        for name, columns in utilization_report(store).items()
+    }
+    if include_bookings:
+        tables["bookings"] = _booking_chunks(store)
+
+    paths = {}
+    for name, chunks in tables.items():
+        paths[name] = os.path.join(directory, f"{name}.{fmt}")
+        export_table(paths[name], chunks, fmt)
+    return paths
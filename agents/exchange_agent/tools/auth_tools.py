@@ -1,46 +1,44 @@
-import os
 from typing import Dict, Any
 import json
-import requests
-from pathlib import Path
 import datetime
 
-# Configuration settings
-LOCAL_EXCHANGE_API_URL = "http://localhost:8080/exchange"
+from . import deadlines, request_scheduler
+from .tenants import current_tenant
+from .log import get_logger
 
-# Cache tokens in memory
-_token_cache_file = Path(os.path.expanduser("~/.exchange_token_cache.json"))
-_token_cache = None
+logger = get_logger(__name__)
+
+# Tokens are cached in memory and on disk per tenant (see tenants.py)
 
 
 def _load_token_cache():
-    """Load token cache from disk"""
-    global _token_cache
-    if _token_cache is not None:
-        return _token_cache
+    """Load the current tenant's token cache from disk"""
+    tenant = current_tenant()
+    if tenant.token_cache is not None:
+        return tenant.token_cache
 
     try:
-        if _token_cache_file.exists():
-            with open(_token_cache_file, "r") as f:
-                _token_cache = json.load(f)
-                return _token_cache
+        if tenant.token_cache_file.exists():
+            with open(tenant.token_cache_file, "r") as f:
+                tenant.token_cache = json.load(f)
+                return tenant.token_cache
     except Exception as e:
-        print(f"Error loading token cache: {e}")
+        logger.error("Error loading token cache: %s", e)
 
-    _token_cache = {"access_token": "", "refresh_token": "", "expires_at": 0}
-    return _token_cache
+    tenant.token_cache = {"access_token": "", "refresh_token": "", "expires_at": 0}
+    return tenant.token_cache
 
 
 def _save_token_cache(token_data):
-    """Save token cache to disk"""
-    global _token_cache
-    _token_cache = token_data
+    """Save the current tenant's token cache to disk"""
+    tenant = current_tenant()
+    tenant.token_cache = token_data
 
     try:
-        with open(_token_cache_file, "w") as f:
+        with open(tenant.token_cache_file, "w") as f:
             json.dump(token_data, f)
     except Exception as e:
-        print(f"Error saving token cache: {e}")
+        logger.error("Error saving token cache: %s", e)
 
 
 def set_token_from_form_data(form_data: str) -> Dict[str, Any]:
@@ -54,8 +52,10 @@ def set_token_from_form_data(form_data: str) -> Dict[str, Any]:
     """
     try:
         # Forward the form data to the local server endpoint
-        response = requests.post(
-            f"{LOCAL_EXCHANGE_API_URL}/callback",
+        response = request_scheduler.request(
+            "local",
+            "POST",
+            f"{current_tenant().api_url}/callback",
             data=form_data,
             headers={"Content-Type": "application/x-www-form-urlencoded"},
         )
@@ -90,7 +90,7 @@ def set_token_from_form_data(form_data: str) -> Dict[str, Any]:
             }
 
     except Exception as e:
-        print(f"Error setting token from form data: {e}")
+        logger.error("Error setting token from form data: %s", e)
         return {
             "status": "error",
             "error_message": f"Failed to set token from form data: {str(e)}",
@@ -104,8 +104,14 @@ def check_auth_status() -> Dict[str, Any]:
         dict: Authentication status.
     """
     try:
-        # Call the status endpoint on the local server
-        response = requests.get(f"{LOCAL_EXCHANGE_API_URL}/status")
+        # Call the status endpoint on the local server; the probe runs before
+        # every request, so it only gets a small share of the tool's budget
+        response = request_scheduler.request(
+            "local",
+            "GET",
+            f"{current_tenant().api_url}/status",
+            share=deadlines.AUTH_SHARE,
+        )
 
         if response.status_code == 200:
             status_data = response.json()
@@ -116,7 +122,7 @@ def check_auth_status() -> Dict[str, Any]:
         else:
             return {"status": "success", "authenticated": False}
     except Exception as e:
-        print(f"Error checking auth status: {e}")
+        logger.warning("Error checking auth status: %s", e, extra={"sample_rate": 0.1})
         return {"status": "success", "authenticated": False}
 
 
@@ -128,7 +134,9 @@ def get_authorization_url() -> Dict[str, Any]:
     """
     try:
         # Get the authorization URL from the local API
-        response = requests.get(f"{LOCAL_EXCHANGE_API_URL}/authorize")
+        response = request_scheduler.request(
+            "local", "GET", f"{current_tenant().api_url}/authorize"
+        )
 
         # If the response is a redirect, extract the Location header
         if response.status_code in (301, 302, 303, 307, 308):
@@ -144,7 +152,7 @@ def get_authorization_url() -> Dict[str, Any]:
                 "error_message": f"Failed to get authorization URL: {response.text}",
             }
     except Exception as e:
-        print(f"Error getting authorization URL: {e}")
+        logger.error("Error getting authorization URL: %s", e)
         return {
             "status": "error",
             "error_message": f"Failed to generate authorization URL: {str(e)}",
@@ -162,8 +170,11 @@ def exchange_code_for_token(code: str) -> Dict[str, Any]:
     """
     try:
         # Forward the code to the local API
-        response = requests.post(
-            f"{LOCAL_EXCHANGE_API_URL}/callback", params={"code": code}
+        response = request_scheduler.request(
+            "local",
+            "POST",
+            f"{current_tenant().api_url}/callback",
+            params={"code": code},
         )
 
         if response.status_code == 200:
@@ -201,7 +212,7 @@ def exchange_code_for_token(code: str) -> Dict[str, Any]:
                 "error_message": f"Failed to exchange code for token: {response.text}",
             }
     except Exception as e:
-        print(f"Error exchanging code for token: {e}")
+        logger.error("Error exchanging code for token: %s", e)
         return {
             "status": "error",
             "error_message": f"Failed to exchange code for token: {str(e)}",
@@ -1,11 +1,25 @@
 import datetime
 from typing import Dict, Any, List, Optional
+
 import requests
 
-from .room_tools import get_room_info, _make_request
+from . import request_scheduler
+from .room_tools import (
+    _get_room,
+    _get_rooms,
+    _invalidate_room,
+    _make_request,
+    _room_metadata,
+)
+from .tenants import current_tenant
+from .log import get_logger
+
+logger = get_logger(__name__)
 
-# Configuration setting
-LOCAL_EXCHANGE_API_URL = "http://localhost:8080/exchange"
+# Bookings book_first_available_room sends before giving up, and the rooms
+# whose calendar it re-checks (busy rooms only cost a check)
+MAX_BOOKING_ATTEMPTS = 5
+MAX_AVAILABILITY_CHECKS = 20
 
 
 def parse_datetime(datetime_str: str) -> datetime.datetime:
@@ -15,8 +29,15 @@ def parse_datetime(datetime_str: str) -> datetime.datetime:
         datetime_str (str): Datetime string which can be absolute or relative
 
     Returns:
-        datetime.datetime: Parsed datetime object
+        datetime.datetime: Parsed datetime object, or the current time if the
+        string couldn't be parsed
     """
+    parsed = _parse_datetime(datetime_str)
+    return parsed if parsed is not None else datetime.datetime.now()
+
+
+def _parse_datetime(datetime_str: str) -> Optional[datetime.datetime]:
+    """Like parse_datetime, but None for a string that couldn't be parsed."""
     now = datetime.datetime.now()
 
     # Handle relative time references
@@ -44,8 +65,7 @@ def parse_datetime(datetime_str: str) -> datetime.datetime:
                     time_obj = datetime.datetime.strptime(time_part, "%I:%M%p").time()
                     return datetime.datetime.combine(now.date(), time_obj)
                 except ValueError:
-                    # If we can't parse the time, return now
-                    return now
+                    return None
 
     if "tomorrow" in datetime_str.lower():
         tomorrow = now + datetime.timedelta(days=1)
@@ -87,8 +107,7 @@ def parse_datetime(datetime_str: str) -> datetime.datetime:
         except ValueError:
             continue
 
-    # If all parsing fails, return current time
-    return now
+    return None
 
 
 def book_room(
@@ -110,51 +129,73 @@ def book_room(
     Returns:
         dict: Status and booking details or error message.
     """
-    # Check if room exists
-    room_info_result = get_room_info(room_id)
-    if room_info_result["status"] == "error":
-        return room_info_result
+    # Check if room exists, from the directory without fetching its calendar
+    room, error = _room_metadata(room_id)
+    if error:
+        return error
 
-    room = room_info_result["room"]
-    print(f"Booking room {room_id} ({room['name']})")
+    logger.info("Booking room %s (%s)", room_id, room.name, extra={"room_id": room_id})
 
     # Use current time if start_time is not specified
     now = datetime.datetime.now()
     if not start_time or start_time.lower() == "now":
         start_datetime = now
-        print(
-            f"Using current time ({start_datetime.isoformat()}) as booking start time"
+        logger.debug(
+            "Using current time (%s) as booking start time", start_datetime.isoformat()
         )
     else:
         # Parse the specified start time
         start_datetime = parse_datetime(start_time)
-        print(f"Using specified start time: {start_datetime.isoformat()}")
+        logger.debug("Using specified start time: %s", start_datetime.isoformat())
 
     # Calculate end time based on duration or specified end time
     if end_time and end_time.isdigit():
         # If end_time is a number, treat it as duration in minutes
         duration_minutes = int(end_time)
         end_datetime = start_datetime + datetime.timedelta(minutes=duration_minutes)
-        print(f"Using duration: {duration_minutes} minutes")
+        logger.debug("Using duration: %s minutes", duration_minutes)
     elif end_time:
         # If end_time is a time string, parse it
         end_datetime = parse_datetime(end_time)
-        print(f"Using specified end time: {end_datetime.isoformat()}")
+        logger.debug("Using specified end time: %s", end_datetime.isoformat())
     else:
         # Default to 1 hour meeting
         end_datetime = start_datetime + datetime.timedelta(hours=1)
-        print(f"Using default duration: 60 minutes")
+        logger.debug("Using default duration: 60 minutes")
 
     # Ensure end time is after start time
     if end_datetime <= start_datetime:
         end_datetime = start_datetime + datetime.timedelta(hours=1)
-        print(f"End time was before start time, adjusted to 1 hour duration")
+        logger.debug("End time was before start time, adjusted to 1 hour duration")
+
+    return _post_booking(
+        room_id, room.name, subject, start_datetime, end_datetime, attendees
+    )
+
 
+def _post_booking(
+    room_id: str,
+    room_name: str,
+    subject: str,
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+    attendees: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Sends a booking request for a room to the local API.
+
+    Returns:
+        dict: Status and booking details or error message.
+    """
     try:
         # Format times in local format for display
         start_time_formatted = start_datetime.strftime("%H:%M")
         end_time_formatted = end_datetime.strftime("%H:%M")
-        print(f"Booking from {start_time_formatted} to {end_time_formatted}")
+        logger.info(
+            "Booking from %s to %s",
+            start_time_formatted,
+            end_time_formatted,
+            extra={"room_id": room_id},
+        )
 
         # Format attendees
         formatted_attendees = []
@@ -176,18 +217,25 @@ def book_room(
         }
 
         # Make the booking request to the local API
-        response = requests.post(
-            f"{LOCAL_EXCHANGE_API_URL}/rooms/{room_id}/book", json=booking_data
+        response = request_scheduler.request(
+            "local",
+            "POST",
+            f"{current_tenant().api_url}/rooms/{room_id}/book",
+            json=booking_data,
         )
 
         if response.status_code in (200, 201):
             booking_result = response.json()
+
+            # The room's cached calendar no longer includes all its meetings
+            _invalidate_room(room_id)
+
             return {
                 "status": "success",
                 "meeting": {
                     "id": booking_result.get("id", ""),
                     "subject": subject,
-                    "room": room["name"],
+                    "room": room_name,
                     "start_time": start_datetime.isoformat(),
                     "end_time": end_datetime.isoformat(),
                     "online_meeting": booking_result.get("onlineMeeting", {}),
@@ -195,12 +243,23 @@ def book_room(
             }
         else:
             error_message = f"Booking failed: {response.status_code} {response.text}"
-            print(error_message)
+            logger.error(error_message)
             return {"status": "error", "error_message": error_message}
 
+    except requests.Timeout as e:
+        # The server may still have made the booking
+        _invalidate_room(room_id)
+        logger.error("Booking request timed out: %s", e, extra={"room_id": room_id})
+        return {
+            "status": "error",
+            "timed_out": True,
+            "error_message": "The booking request timed out; the room may or may "
+            "not have been booked. Check the room's availability before trying again.",
+        }
+
     except Exception as e:
         error_message = f"Error booking room: {str(e)}"
-        print(error_message)
+        logger.error(error_message)
         return {"status": "error", "error_message": error_message}
 
 
@@ -215,17 +274,21 @@ def cancel_meeting(room_id: str, meeting_id: str) -> Dict[str, Any]:
         dict: Status and result of cancellation.
     """
     try:
-        # Check if room exists
-        room_info_result = get_room_info(room_id)
-        if room_info_result["status"] == "error":
-            return room_info_result
+        # Check if room exists, from the directory without fetching its calendar
+        _, error = _room_metadata(room_id)
+        if error:
+            return error
 
         # Make the cancellation request to the local API
-        response = requests.delete(
-            f"{LOCAL_EXCHANGE_API_URL}/rooms/{room_id}/meetings/{meeting_id}"
+        response = request_scheduler.request(
+            "local",
+            "DELETE",
+            f"{current_tenant().api_url}/rooms/{room_id}/meetings/{meeting_id}",
         )
 
         if response.status_code in (200, 204):
+            # The room's cached calendar still shows the meeting
+            _invalidate_room(room_id)
             return {"status": "success", "message": "Meeting canceled successfully"}
         else:
             try:
@@ -236,10 +299,123 @@ def cancel_meeting(room_id: str, meeting_id: str) -> Dict[str, Any]:
                     f"Cancellation failed: {response.status_code} {response.text}"
                 )
 
-            print(error_message)
+            logger.error(error_message)
             return {"status": "error", "error_message": error_message}
 
+    except requests.Timeout as e:
+        # The server may still have cancelled the meeting
+        _invalidate_room(room_id)
+        logger.error("Cancellation timed out: %s", e, extra={"room_id": room_id})
+        return {
+            "status": "error",
+            "timed_out": True,
+            "error_message": "The cancellation timed out; the meeting may or may "
+            "not have been cancelled. Check the room's availability before trying again.",
+        }
+
     except Exception as e:
         error_message = f"Error canceling meeting: {str(e)}"
-        print(error_message)
+        logger.error(error_message)
+        return {"status": "error", "error_message": error_message}
+
+
+def book_first_available_room(
+    subject: str,
+    start_time: str = "now",
+    duration_minutes: int = 30,
+    min_capacity: int = 0,
+    building: str = "",
+    attendees: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Finds and books the best free room matching the criteria in a single step.
+
+    Rooms are tried from the smallest one that fits upwards. Each candidate's
+    calendar is re-checked right before booking, and if a booking fails the
+    next candidate is tried. A booking that timed out may still have gone
+    through, so no other room is booked after it.
+
+    Args:
+        subject (str): The subject/title of the meeting.
+        start_time (str, optional): Start time (ISO format or relative like "today at 2pm"). Defaults to "now".
+        duration_minutes (int, optional): Length of the meeting in minutes. Defaults to 30.
+        min_capacity (int, optional): Minimum number of people the room must hold. Defaults to 0.
+        building (str, optional): Only consider rooms in this building. Defaults to any building.
+        attendees (List[str], optional): List of email addresses of attendees. Defaults to None.
+
+    Returns:
+        dict: Status and booking details or error message.
+    """
+    try:
+        rooms = _get_rooms()
+        if rooms is None:
+            return {
+                "status": "error",
+                "error_message": "Failed to fetch rooms. Please check authentication and try again.",
+            }
+
+        if not start_time or start_time.lower() == "now":
+            start_datetime = datetime.datetime.now()
+        else:
+            start_datetime = parse_datetime(start_time)
+        end_datetime = start_datetime + datetime.timedelta(
+            minutes=duration_minutes or 30
+        )
+        period = (start_datetime.astimezone(), end_datetime.astimezone())
+
+        candidates = [
+            room
+            for room in rooms
+            if (room.capacity >= min_capacity or not room.capacity)
+            and (not building or room.building.lower() == building.lower())
+        ]
+
+        cache = current_tenant().room_info_cache
+
+        def rank(room):
+            # Rooms the cache already shows as busy go last, then the smallest
+            # sufficient room first, with rooms of unknown capacity (0) at the end
+            cached = cache.get(room.id)
+            known_busy = cached is not None and not cached.is_free(*period)
+            return (known_busy, not room.capacity, room.capacity)
+
+        candidates.sort(key=rank)
+
+        attempts = []
+        bookings_sent = 0
+        for room in candidates[:MAX_AVAILABILITY_CHECKS]:
+            if bookings_sent >= MAX_BOOKING_ATTEMPTS:
+                break
+
+            # Verify against the room's current calendar before booking
+            current = _get_room(room.id, force_refresh=True)
+            if current is None or not current.is_free(*period):
+                attempts.append({"room": room.name, "result": "busy"})
+                continue
+
+            bookings_sent += 1
+            result = _post_booking(
+                room.id, room.name, subject, start_datetime, end_datetime, attendees
+            )
+            # A timed out booking may have gone through; booking another room
+            # could leave the meeting with two
+            if result["status"] == "success" or result.get("timed_out"):
+                result["attempts"] = attempts
+                return result
+
+            # Someone else may have taken the room in the meantime
+            attempts.append({"room": room.name, "result": result["error_message"]})
+
+        return {
+            "status": "error",
+            "error_message": (
+                "No matching room could be booked for that time."
+                if candidates
+                else "No rooms match the requested capacity and building."
+            ),
+            "attempts": attempts,
+        }
+
+    except Exception as e:
+        error_message = f"Error booking first available room: {str(e)}"
+        logger.error(error_message)
         return {"status": "error", "error_message": error_message}
@@ -0,0 +1,269 @@
+import base64
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# "record" saves every HTTP exchange to the cassette, "replay" answers
+# requests from it without touching the network; empty sends requests as usual
+CASSETTE_MODE = os.environ.get("EXCHANGE_CASSETTE_MODE", "").lower()
+
+CASSETTE_PATH = os.path.expanduser(
+    os.environ.get("EXCHANGE_CASSETTE_PATH", "exchange_cassette.jsonl")
+)
+
+# Multiplier for the recorded response times during replay (0 replays instantly)
+CASSETTE_LATENCY = float(os.environ.get("EXCHANGE_CASSETTE_LATENCY", "0"))
+
+# Response headers worth keeping; the rest (cookies, request IDs) is noise
+RECORDED_HEADERS = ("content-type", "location")
+
+# Secrets masked in recorded JSON bodies, form bodies and query strings
+REDACTED_FIELDS = (
+    "access_token",
+    "refresh_token",
+    "id_token",
+    "code",
+    "client_secret",
+)
+
+# Headers whose names contain one of these are masked when recorded
+REDACTED_HEADER_PARTS = ("authorization", "cookie", "token", "secret", "api-key")
+
+REDACTED = "REDACTED"
+
+
+class CassetteMissError(requests.exceptions.ConnectionError):
+    """Raised during replay for a request that isn't on the cassette."""
+
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {
+    "mode": "",
+    "path": "",
+    "latency": 0.0,
+    # Replay: recorded responses by exact request, and by method and URL only
+    "by_request": {},
+    "by_url": {},
+    # Record: whether the cassette was already truncated by this process
+    "started": False,
+}
+
+
+def _request_key(method: str, url: str, **kwargs) -> Tuple[str, str, str]:
+    """Method, full URL with query string, and body of a request, secrets masked."""
+    prepared = requests.Request(
+        method.upper(),
+        url,
+        params=kwargs.get("params"),
+        data=kwargs.get("data"),
+        json=kwargs.get("json"),
+    ).prepare()
+    body = prepared.body or ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    return prepared.method, _redact_url(prepared.url), _redact(body)
+
+
+def _load(path: str):
+    by_request: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+    by_url: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            interaction = json.loads(line)
+            key = (interaction["method"], interaction["url"], interaction["body"])
+            by_request.setdefault(key, []).append(interaction)
+            by_url.setdefault(key[:2], []).append(interaction)
+    _state["by_request"] = by_request
+    _state["by_url"] = by_url
+    logger.info(
+        "Loaded %s recorded requests from %s",
+        sum(len(recordings) for recordings in by_url.values()),
+        path,
+    )
+
+
+def use_cassette(mode: str, path: str = CASSETTE_PATH, latency: float = 0.0):
+    """Switch the HTTP layer to recording or replaying a cassette.
+
+    Args:
+        mode: "record", "replay", or "" to send requests normally
+        path: The cassette file (JSON lines, one request per line)
+        latency: During replay, sleep for the recorded response time times this
+    """
+    with _lock:
+        if mode not in ("", "record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        _state.update(
+            mode=mode,
+            path=path,
+            latency=latency,
+            by_request={},
+            by_url={},
+            started=False,
+        )
+        if mode == "replay":
+            _load(path)
+
+
+def _next_recording(
+    recordings: Optional[List[Dict[str, Any]]],
+) -> Optional[Dict[str, Any]]:
+    # Identical requests replay their recordings in order, then the last one
+    if not recordings:
+        return None
+    return recordings.pop(0) if len(recordings) > 1 else recordings[0]
+
+
+def _replay(method: str, url: str, session=None, **kwargs) -> requests.Response:
+    key = _request_key(method, url, **kwargs)
+    with _lock:
+        # Fall back to ignoring the body, which often holds timestamps
+        interaction = _next_recording(_state["by_request"].get(key)) or _next_recording(
+            _state["by_url"].get(key[:2])
+        )
+        latency = _state["latency"]
+    if interaction is None:
+        raise CassetteMissError(f"No recorded response for {key[0]} {key[1]}")
+
+    if latency:
+        time.sleep(interaction["elapsed_ms"] / 1000 * latency)
+
+    response = requests.Response()
+    response.status_code = interaction["status"]
+    response.headers = CaseInsensitiveDict(interaction["headers"])
+    response.url = interaction["url"]
+    response.encoding = "utf-8"
+    if interaction.get("body_encoding") == "base64":
+        response._content = base64.b64decode(interaction["response_body"])
+    else:
+        response._content = interaction["response_body"].encode("utf-8")
+    # Lets iter_content() serve the body for streamed requests
+    response._content_consumed = True
+    return response
+
+
+def _redact_query(query: str) -> str:
+    """Mask secrets in a query string or form body, e.g. the OAuth code."""
+    pairs = parse_qsl(query, keep_blank_values=True)
+    if not any(name in REDACTED_FIELDS for name, _ in pairs):
+        return query
+    return urlencode(
+        [
+            (name, REDACTED if name in REDACTED_FIELDS else value)
+            for name, value in pairs
+        ]
+    )
+
+
+def _redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    return urlunsplit(parts._replace(query=_redact_query(parts.query)))
+
+
+def _redact(text: str) -> str:
+    """Mask secrets in a JSON object or form body, e.g. tokens from the OAuth callback."""
+    if not any(field in text for field in REDACTED_FIELDS):
+        return text
+    try:
+        data = json.loads(text)
+    except ValueError:
+        # Not JSON; a form body is masked like a query string
+        return _redact_query(text) if "=" in text else text
+    if not isinstance(data, dict):
+        return text
+    for field in REDACTED_FIELDS:
+        if field in data:
+            data[field] = REDACTED
+    return json.dumps(data)
+
+
+def _redact_headers(headers) -> Dict[str, str]:
+    """The recorded response headers, with credentials and redirect secrets masked."""
+    recorded = {}
+    for name in RECORDED_HEADERS:
+        if name not in headers:
+            continue
+        value = headers[name]
+        if any(part in name for part in REDACTED_HEADER_PARTS):
+            value = REDACTED
+        elif name == "location":
+            value = _redact_url(value)
+        recorded[name] = value
+    return recorded
+
+
+def _record(method: str, url: str, session=None, **kwargs) -> requests.Response:
+    start = time.perf_counter()
+    response = (session or requests).request(method.upper(), url, **kwargs)
+    # Reading the content buffers streamed responses; iter_content() still works
+    content = response.content
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    try:
+        response_body = _redact(content.decode("utf-8"))
+        body_encoding = "text"
+    except UnicodeDecodeError:
+        response_body = base64.b64encode(content).decode("ascii")
+        body_encoding = "base64"
+
+    method, full_url, body = _request_key(method, url, **kwargs)
+    interaction = {
+        "method": method,
+        "url": full_url,
+        "body": body,
+        "status": response.status_code,
+        "headers": _redact_headers(response.headers),
+        "response_body": response_body,
+        "body_encoding": body_encoding,
+        "elapsed_ms": round(elapsed_ms, 1),
+    }
+
+    with _lock:
+        # Start a fresh cassette on the first request recorded by this process
+        file_mode = "a" if _state["started"] else "w"
+        _state["started"] = True
+        try:
+            with open(_state["path"], file_mode) as f:
+                f.write(json.dumps(interaction) + "\n")
+        except OSError as e:
+            logger.warning("Error writing to cassette %s: %s", _state["path"], e)
+    return response
+
+
+def send(
+    method: str, url: str, session: Optional[requests.Session] = None, **kwargs
+) -> requests.Response:
+    """Send a request, or record or replay it when a cassette is in use.
+
+    Request headers (including Authorization) are never recorded, and
+    tokens and OAuth codes are masked in URLs, bodies and response headers;
+    replay masks them the same way to match requests.
+
+    Args:
+        method: HTTP method
+        url: Full URL
+        session: Session whose connection pool to use (None for a one-off connection)
+        **kwargs: Passed on to requests
+    """
+    mode = _state["mode"]
+    if mode == "replay":
+        return _replay(method, url, **kwargs)
+    if mode == "record":
+        return _record(method, url, session, **kwargs)
+    return (session or requests).request(method.upper(), url, **kwargs)
+
+
+if CASSETTE_MODE:
+    use_cassette(CASSETTE_MODE, CASSETTE_PATH, CASSETTE_LATENCY)
@@ -0,0 +1,178 @@
+import contextlib
+import contextvars
+import functools
+import os
+import time
+from typing import Dict, Callable, Iterable, Iterator, Optional, TypeVar
+
+import requests
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Seconds a tool call may take in total, across all of its requests
+TOOL_DEADLINE = float(os.environ.get("EXCHANGE_TOOL_DEADLINE", "15"))
+
+# Tools that walk every room or many calendars get longer; override any tool
+# with a comma-separated list, e.g. "find_meeting_time=30,book_room=10"
+TOOL_DEADLINES: Dict[str, float] = {
+    "find_meeting_time": 30.0,
+    "get_room_utilization": 30.0,
+}
+for _entry in os.environ.get("EXCHANGE_TOOL_DEADLINES", "").split(","):
+    if "=" in _entry:
+        _name, _seconds = _entry.split("=", 1)
+        TOOL_DEADLINES[_name.strip()] = float(_seconds)
+
+# Longest any single request may take, also outside a tool call, so a hung
+# connection never blocks a thread for good
+REQUEST_TIMEOUT = float(os.environ.get("EXCHANGE_REQUEST_TIMEOUT", "10"))
+
+# Share of a tool's remaining budget that one sub-call may use, so the calls
+# that come after it still get time: the auth probe before every request
+# and the lookups before a booking leave the rest to the write
+AUTH_SHARE = 0.25
+READ_SHARE = 0.5
+WRITE_SHARE = 1.0
+
+
+class DeadlineExceeded(requests.Timeout):
+    """Raised instead of sending a request once the tool's deadline has passed."""
+
+
+class _Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        # Set when a request of the call timed out, so tools can mark their
+        # result as partial
+        self.timed_out = False
+
+
+# Deadline of the current tool call, None outside one
+_deadline: contextvars.ContextVar[Optional[_Deadline]] = contextvars.ContextVar(
+    "exchange_deadline", default=None
+)
+
+
+@contextlib.contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Bound the requests made inside the block to the given number of seconds.
+
+    A deadline inside another one never extends it. Worker threads started
+    with ``contextvars.copy_context().run`` share the deadline.
+    """
+    outer = _deadline.get()
+    if outer is not None and outer.expires_at <= time.monotonic() + seconds:
+        yield
+        return
+    inner = _Deadline(seconds)
+    token = _deadline.set(inner)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+        if outer is not None and inner.timed_out:
+            outer.timed_out = True
+
+
+@contextlib.contextmanager
+def detached() -> Iterator[None]:
+    """Run the block without the caller's deadline, e.g. a background refresh."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, None without one."""
+    current = _deadline.get()
+    if current is None:
+        return None
+    return current.expires_at - time.monotonic()
+
+
+def expired() -> bool:
+    """Whether the current deadline has passed (marking the call as timed out)."""
+    left = remaining()
+    if left is None or left > 0:
+        return False
+    note_timeout()
+    return True
+
+
+def note_timeout():
+    """Record that a request of the current call timed out."""
+    current = _deadline.get()
+    if current is not None:
+        current.timed_out = True
+
+
+def timed_out() -> bool:
+    """Whether a request of the current call timed out or was skipped for lack of time."""
+    current = _deadline.get()
+    return current is not None and current.timed_out
+
+
+def bounded(chunks: Iterable[T]) -> Iterator[T]:
+    """Pass the chunks of a streamed body on until the deadline passes.
+
+    The requests timeout only bounds each socket read, so a body that keeps
+    trickling in would otherwise outlast the deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline passes before the body is read.
+    """
+    for chunk in chunks:
+        if expired():
+            raise DeadlineExceeded("The tool's time budget ran out reading a response")
+        yield chunk
+
+
+def request_timeout(share: float = READ_SHARE) -> float:
+    """Timeout for the next request: its share of the remaining budget.
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed.
+    """
+    left = remaining()
+    if left is None:
+        return REQUEST_TIMEOUT
+    if left <= 0:
+        note_timeout()
+        raise DeadlineExceeded("The tool's time budget is used up")
+    return min(REQUEST_TIMEOUT, left * share)
+
+
+def with_deadline(func: Callable) -> Callable:
+    """Wrap a tool so its requests share a deadline (TOOL_DEADLINES, else TOOL_DEADLINE).
+
+    Results of calls that ran out of time are marked with ``timed_out``;
+    the tools return what they have (cached or partial data) where they can.
+    The wrapper keeps the tool's name, signature and docstring.
+    """
+    tool_name = func.__name__
+    seconds = TOOL_DEADLINES.get(tool_name, TOOL_DEADLINE)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with deadline(seconds):
+            try:
+                result = func(*args, **kwargs)
+            except requests.Timeout as e:
+                logger.warning("Tool call timed out: %s", e)
+                return {
+                    "status": "error",
+                    "timed_out": True,
+                    "error_message": f"{tool_name} timed out after {seconds:g}s",
+                }
+            if isinstance(result, dict) and timed_out():
+                result.setdefault("timed_out", True)
+            return result
+
+    return wrapper
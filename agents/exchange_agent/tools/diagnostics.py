@@ -0,0 +1,251 @@
+import io
+import math
+import socket
+import ssl
+import time
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from .tenants import current_tenant
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+GRAPH_PROBE_URL = "https://graph.microsoft.com/v1.0/$metadata"
+GRAPH_BETA_PROBE_URL = "https://graph.microsoft.com/beta/$metadata"
+
+# Phases of one request, in the order they happen
+HOP_PHASES = ("dns", "connect", "tls", "ttfb", "total")
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Timeout of each probe step, in seconds
+PROBE_TIMEOUT = 10.0
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of the values."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * pct / 100))
+    return ordered[rank - 1]
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, Any]:
+    """Count, mean, percentiles and max of latency samples in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    summary = {"count": len(samples), "mean": round(sum(samples) / len(samples), 1)}
+    for pct in PERCENTILES:
+        summary[f"p{pct}"] = round(percentile(samples, pct), 1)
+    summary["max"] = round(max(samples), 1)
+    return summary
+
+
+def default_hops() -> Dict[str, str]:
+    """The URLs probed by default: the local Exchange API, Graph v1.0 and beta."""
+    return {
+        "local": f"{current_tenant().api_url}/status",
+        "graph": GRAPH_PROBE_URL,
+        "graph_beta": GRAPH_BETA_PROBE_URL,
+    }
+
+
+def probe_once(url: str, timeout: float = PROBE_TIMEOUT) -> Dict[str, float]:
+    """Time the phases of one GET on a fresh connection.
+
+    Returns:
+        dict: Milliseconds spent resolving the host (dns), opening the TCP
+        connection (connect), the TLS handshake (tls, 0 for plain HTTP),
+        from sending the request to the first response byte (ttfb), and in
+        total until the response was read, plus the HTTP status.
+    """
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    host = parts.hostname or ""
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+
+    start = time.perf_counter()
+    family, kind, proto, _, address = socket.getaddrinfo(
+        host, port, type=socket.SOCK_STREAM
+    )[0]
+    resolved = time.perf_counter()
+
+    sock = socket.socket(family, kind, proto)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+        connected = time.perf_counter()
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+        handshaken = time.perf_counter()
+
+        sock.sendall(
+            f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+            "User-Agent: exchange-agent-diagnostics\r\nConnection: close\r\n\r\n".encode()
+        )
+        sent = time.perf_counter()
+        first = sock.recv(1)
+        first_byte = time.perf_counter()
+        head = first
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            if len(head) < 64:
+                head += chunk
+        done = time.perf_counter()
+    finally:
+        sock.close()
+
+    status = head.split(b" ", 2)[1] if head.startswith(b"HTTP/") else b"0"
+    return {
+        "dns": (resolved - start) * 1000,
+        "connect": (connected - resolved) * 1000,
+        "tls": (handshaken - connected) * 1000,
+        "ttfb": (first_byte - sent) * 1000,
+        "total": (done - start) * 1000,
+        "status": int(status) if status.isdigit() else 0,
+    }
+
+
+def probe_hop(url: str, samples: int = 5) -> Dict[str, Any]:
+    """Probe a URL repeatedly and summarize each phase.
+
+    DNS answers are usually cached by the resolver after the first sample,
+    so the dns percentiles mostly reflect the cached lookup.
+    """
+    phases: Dict[str, List[float]] = {phase: [] for phase in HOP_PHASES}
+    statuses = set()
+    errors: List[str] = []
+    for _ in range(samples):
+        try:
+            result = probe_once(url)
+        except (OSError, ssl.SSLError) as e:
+            errors.append(str(e))
+            continue
+        statuses.add(result["status"])
+        for phase in HOP_PHASES:
+            phases[phase].append(result[phase])
+
+    report = {
+        "url": url,
+        "phases": {phase: summarize(values) for phase, values in phases.items()},
+        "statuses": sorted(statuses),
+        "errors": len(errors),
+    }
+    if errors:
+        report["last_error"] = errors[-1]
+    return report
+
+
+def time_tool(
+    func: Callable[..., Any], args: Tuple = (), samples: int = 5
+) -> Dict[str, Any]:
+    """Call a tool repeatedly and summarize its end-to-end latency.
+
+    Calls returning an error status or raising count as errors, but their
+    latency is included, since a slow failure is still slow for the user.
+    """
+    latencies: List[float] = []
+    errors = 0
+    for _ in range(samples):
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+            failed = isinstance(result, dict) and result.get("status") == "error"
+        except Exception as e:
+            logger.warning("Tool call failed: %s", e)
+            failed = True
+        latencies.append((time.perf_counter() - start) * 1000)
+        errors += failed
+    return {**summarize(latencies), "errors": errors}
+
+
+def _table(headers: List[str], rows: List[List[str]]) -> str:
+    widths = [
+        max([len(header)] + [len(row[i]) for row in rows])
+        for i, header in enumerate(headers)
+    ]
+    out = io.StringIO()
+    out.write("  ".join(h.ljust(w) for h, w in zip(headers, widths)).rstrip() + "\n")
+    out.write("  ".join("-" * w for w in widths) + "\n")
+    for row in rows:
+        out.write(
+            "  ".join(
+                cell.ljust(w) if i == 0 else cell.rjust(w)
+                for i, (cell, w) in enumerate(zip(row, widths))
+            )
+            + "\n"
+        )
+    return out.getvalue()
+
+
+def _ms(summary: Dict[str, Any], key: str) -> str:
+    return f"{summary[key]:.1f}" if key in summary else "-"
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a diagnostics report as plain-text tables (milliseconds)."""
+    out = io.StringIO()
+    hops = report.get("hops", {})
+    if hops:
+        out.write("Per-hop latency, p50 / p95 ms\n\n")
+        rows = []
+        for name, hop in hops.items():
+            phases = hop["phases"]
+            rows.append(
+                [name]
+                + [
+                    f"{_ms(phases[phase], 'p50')} / {_ms(phases[phase], 'p95')}"
+                    for phase in HOP_PHASES
+                ]
+                + [",".join(map(str, hop["statuses"])) or "-", str(hop["errors"])]
+            )
+        out.write(_table(["hop", *HOP_PHASES, "status", "errors"], rows))
+        for name, hop in hops.items():
+            if hop.get("last_error"):
+                out.write(f"  {name}: {hop['last_error']}\n")
+
+    tools = report.get("tools", {})
+    if tools:
+        if hops:
+            out.write("\n")
+        out.write("Tool latency, ms\n\n")
+        keys = ["mean"] + [f"p{pct}" for pct in PERCENTILES] + ["max"]
+        rows = [
+            [name, str(summary["count"])]
+            + [_ms(summary, key) for key in keys]
+            + [str(summary["errors"])]
+            for name, summary in tools.items()
+        ]
+        out.write(_table(["tool", "n", *keys, "errors"], rows))
+    return out.getvalue()
+
+
+def run_diagnostics(
+    hops: Optional[Dict[str, str]] = None,
+    tools: Optional[Dict[str, Tuple[Callable[..., Any], Tuple]]] = None,
+    samples: int = 5,
+) -> Dict[str, Any]:
+    """Probe each hop and time each tool.
+
+    Args:
+        hops: URLs to probe by name (defaults to default_hops())
+        tools: (tool, args) pairs to time by name (none by default)
+        samples: Samples per hop and per tool
+
+    Returns:
+        dict: "hops" with per-phase summaries and "tools" with latency summaries.
+    """
+    hops = default_hops() if hops is None else hops
+    return {
+        "samples": samples,
+        "hops": {name: probe_hop(url, samples) for name, url in hops.items()},
+        "tools": {
+            name: time_tool(func, args, samples)
+            for name, (func, args) in (tools or {}).items()
+        },
+    }
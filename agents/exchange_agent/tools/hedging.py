@@ -0,0 +1,204 @@
+import collections
+import contextvars
+import math
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Any, Deque, Optional
+
+import requests
+
+from . import request_scheduler
+from .tenants import current_tenant
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Send a second attempt for slow GETs to the local Exchange API (off by default)
+HEDGE_READS = os.environ.get("EXCHANGE_HEDGE_READS", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Percentile of recent latencies after which a read is hedged
+HEDGE_PERCENTILE = float(os.environ.get("EXCHANGE_HEDGE_PERCENTILE", "95"))
+
+# Largest fraction of reads that may be hedged. Each read earns this many
+# hedge tokens and each hedge spends one, so during an outage, when every
+# read is slow, hedging adds at most this much load.
+HEDGE_MAX_RATE = float(os.environ.get("EXCHANGE_HEDGE_MAX_RATE", "0.05"))
+
+# Hedge tokens that can be saved up for a burst of slow reads
+HEDGE_BURST = 10.0
+
+# Never hedge sooner than this many seconds, however fast reads usually are
+HEDGE_MIN_DELAY = 0.05
+
+# Latency samples kept per route, and how many are needed before hedging
+LATENCY_SAMPLES = 200
+MIN_LATENCY_SAMPLES = 20
+
+# Threads running the attempts, shared by all tenants
+HEDGE_WORKERS = int(os.environ.get("EXCHANGE_HEDGE_WORKERS", "16"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class _Hedger:
+    """Latency samples, hedge budget and counters of one tenant."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.tokens = HEDGE_BURST
+        self.stats = {
+            "reads": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "over_budget": 0,
+        }
+
+    def record(self, route: str, seconds: float):
+        with self.lock:
+            samples = self.latencies.get(route)
+            if samples is None:
+                samples = self.latencies[route] = collections.deque(
+                    maxlen=LATENCY_SAMPLES
+                )
+            samples.append(seconds)
+
+    def delay(self, route: str) -> Optional[float]:
+        """Seconds to wait before hedging a read of the route, None while there's too little data."""
+        with self.lock:
+            samples = self.latencies.get(route)
+            if samples is None or len(samples) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(samples)
+        index = min(
+            len(ordered) - 1, math.ceil(len(ordered) * HEDGE_PERCENTILE / 100) - 1
+        )
+        return max(HEDGE_MIN_DELAY, ordered[index])
+
+    def earn(self):
+        with self.lock:
+            self.stats["reads"] += 1
+            self.tokens = min(HEDGE_BURST, self.tokens + HEDGE_MAX_RATE)
+
+    def spend(self) -> bool:
+        with self.lock:
+            if self.tokens < 1:
+                self.stats["over_budget"] += 1
+                return False
+            self.tokens -= 1
+            self.stats["hedged"] += 1
+            return True
+
+
+def _hedger() -> _Hedger:
+    return current_tenant().state("hedging", _Hedger)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=HEDGE_WORKERS, thread_name_prefix="exchange-hedge"
+            )
+        return _executor
+
+
+def route_of(endpoint: str) -> str:
+    """The endpoint with its IDs masked, e.g. rooms/abc -> rooms/*.
+
+    The local API's paths alternate collections and IDs.
+    """
+    segments = endpoint.strip("/").split("/")
+    return "/".join("*" if i % 2 else segment for i, segment in enumerate(segments))
+
+
+def _attempt(hedger: _Hedger, route: str, backend: str, url: str, kwargs):
+    start = time.perf_counter()
+    response = request_scheduler.request(backend, "GET", url, **kwargs)
+    hedger.record(route, time.perf_counter() - start)
+    return response
+
+
+def _discard(future: Future):
+    # The losing attempt's connection goes back to the pool
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def get(backend: str, url: str, route: str, **kwargs) -> requests.Response:
+    """Send an idempotent GET, hedged with a second attempt when the first is slow.
+
+    Once the first attempt has taken longer than HEDGE_PERCENTILE of the
+    route's recent reads, a second one is sent (if the hedge budget allows)
+    and the first response wins. Without HEDGE_READS this is a plain
+    request_scheduler.request.
+
+    Args:
+        backend: The backend to send the request to
+        url: Full URL
+        route: The endpoint with its IDs masked (see route_of), whose
+            latencies decide when to hedge
+        **kwargs: Passed on to request_scheduler.request
+
+    Returns:
+        The first response to arrive.
+    """
+    if not HEDGE_READS:
+        return request_scheduler.request(backend, "GET", url, **kwargs)
+
+    hedger = _hedger()
+    hedger.earn()
+    delay = hedger.delay(route)
+    if delay is None:
+        return _attempt(hedger, route, backend, url, kwargs)
+
+    # Attempts run in a copy of the caller's context, with its tenant,
+    # priority and deadline
+    executor = _get_executor()
+    first = executor.submit(
+        contextvars.copy_context().run, _attempt, hedger, route, backend, url, kwargs
+    )
+    done, _ = wait([first], timeout=delay)
+    if done or not hedger.spend():
+        return first.result()
+
+    logger.debug("Hedging read of %s after %.0f ms", route, delay * 1000)
+    second = executor.submit(
+        contextvars.copy_context().run, _attempt, hedger, route, backend, url, kwargs
+    )
+    pending = {first, second}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    with hedger.lock:
+                        hedger.stats["hedge_wins"] += 1
+                for loser in pending:
+                    loser.add_done_callback(_discard)
+                return future.result()
+    # Both attempts failed
+    return first.result()
+
+
+def get_hedging_stats() -> Dict[str, Any]:
+    """Reads, hedges sent and won, and hedges skipped for budget, for the current tenant."""
+    hedger = _hedger()
+    with hedger.lock:
+        stats = dict(hedger.stats)
+        routes = list(hedger.latencies)
+    delays = {route: hedger.delay(route) for route in routes}
+    stats["hedge_delay_ms"] = {
+        route: round(delay * 1000, 1)
+        for route, delay in delays.items()
+        if delay is not None
+    }
+    return stats
@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .tenants import current_tenant
+
+# Seconds after which an access counts half as much towards a room's hotness
+HOTNESS_HALF_LIFE = float(os.environ.get("EXCHANGE_HOTNESS_HALF_LIFE", "900"))
+
+# Rooms whose hotness decays below this are forgotten
+MIN_TRACKED_HOTNESS = 0.05
+
+
+class RoomHotness:
+    """Exponentially decaying access counts of the rooms of one tenant.
+
+    Each room keeps its count as of its last access; the decay since then
+    is applied when the count is read, so recording an access is O(1).
+    """
+
+    def __init__(self, half_life: float = HOTNESS_HALF_LIFE):
+        self.half_life = half_life
+        self._counts: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, count: float, since: float, now: float) -> float:
+        return count * 0.5 ** ((now - since) / self.half_life)
+
+    def record(self, room_id: str, weight: float = 1.0, now: Optional[float] = None):
+        """Count an access to a room."""
+        now = time.time() if now is None else now
+        with self._lock:
+            count, since = self._counts.get(room_id, (0.0, now))
+            self._counts[room_id] = (self._decayed(count, since, now) + weight, now)
+
+    def score(self, room_id: str, now: Optional[float] = None) -> float:
+        """The room's access count with the decay applied."""
+        now = time.time() if now is None else now
+        with self._lock:
+            count, since = self._counts.get(room_id, (0.0, now))
+        return self._decayed(count, since, now)
+
+    def hottest(
+        self, limit: int, min_score: float = 0.0, now: Optional[float] = None
+    ) -> List[Tuple[str, float]]:
+        """The most accessed rooms, hottest first, forgetting rooms gone cold.
+
+        Returns:
+            list: Up to limit (room_id, score) pairs scoring at least min_score.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            scores = {
+                room_id: self._decayed(count, since, now)
+                for room_id, (count, since) in self._counts.items()
+            }
+            for room_id, score in scores.items():
+                if score < MIN_TRACKED_HOTNESS:
+                    del self._counts[room_id]
+
+        ranked = sorted(
+            (item for item in scores.items() if item[1] >= min_score),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        return ranked[:limit]
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+def room_hotness() -> RoomHotness:
+    """The current tenant's room access counts."""
+    return current_tenant().state("room_hotness", RoomHotness)
+
+
+def record_access(room_id: str):
+    """Count an access to a room by a tool, for the background refresher."""
+    room_hotness().record(room_id)
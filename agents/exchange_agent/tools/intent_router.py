@@ -0,0 +1,168 @@
+import datetime
+import os
+import re
+import threading
+from typing import Dict, Any, Callable, List, Optional, Pattern, Tuple
+
+from . import deadlines
+from .room_tools import (
+    AVAILABILITY_MAX_AGE,
+    _get_room,
+    get_all_rooms,
+    list_available_rooms,
+)
+from .room_index import resolve_room
+from .hotness import record_access
+from .log import get_logger, log_context
+
+logger = get_logger(__name__)
+
+# Answer the most common questions without a model round trip (off by default)
+FAST_PATH = os.environ.get("EXCHANGE_FAST_PATH", "").lower() in ("1", "true", "yes")
+
+# A room reference is only answered directly when its best match scores at
+# least this and clearly beats the runner-up; anything vaguer goes to the
+# model, which can ask which room was meant
+MIN_MATCH_SCORE = 0.8
+MIN_MATCH_MARGIN = 0.15
+
+# Rooms named in an answer before the rest are summarized as "and N more"
+MAX_LISTED_ROOMS = 15
+
+_NOW = r"(?:\s+(?:right\s+)?now|\s+at\s+the\s+moment)?"
+
+_FREE_ROOMS = re.compile(
+    r"(?:(?:which|what)\s+rooms?\s+(?:are|is)\s+(?:free|available)"
+    r"|(?:are\s+there\s+)?any\s+(?:free|available)\s+rooms?"
+    r"|(?:are|is)\s+(?:there\s+)?any\s+rooms?\s+(?:free|available)"
+    r"|(?:list|show)(?:\s+me)?(?:\s+(?:all|the))*\s+(?:free|available)\s+rooms?)" + _NOW
+)
+_ROOM_AVAILABLE = re.compile(
+    r"(?:is|are)\s+(?:the\s+)?(?P<room>.+?)(?:\s+room)?\s+(?:free|available|busy|taken)"
+    + _NOW
+)
+_LIST_ROOMS = re.compile(
+    r"(?:(?:list|show)(?:\s+me)?(?:\s+(?:all|the))*(?:\s+meeting)?\s+rooms"
+    r"|(?:which|what)\s+(?:meeting\s+)?rooms\s+(?:are\s+there|do\s+we\s+have))"
+)
+
+_PUNCTUATION = re.compile(r"[?.!\s]+$")
+_POLITENESS = re.compile(r"^(?:hi|hey|hello)?[,\s]*(?:please\s+|can\s+you\s+)?")
+
+_stats: Dict[str, int] = {"answered": 0, "fallbacks": 0}
+_stats_lock = threading.Lock()
+
+
+def _normalize(message: str) -> str:
+    text = " ".join(message.lower().split())
+    text = _PUNCTUATION.sub("", text)
+    text = _POLITENESS.sub("", text)
+    return re.sub(r"\s+please$", "", text)
+
+
+def _room_names(rooms: List[Dict[str, Any]]) -> str:
+    names = [room["name"] for room in rooms[:MAX_LISTED_ROOMS]]
+    if len(rooms) > MAX_LISTED_ROOMS:
+        names.append(f"and {len(rooms) - MAX_LISTED_ROOMS} more")
+    return ", ".join(names)
+
+
+def _answer_free_rooms(match: re.Match) -> Optional[str]:
+    result = list_available_rooms()
+    if result["status"] != "success" or result.get("unchecked_rooms"):
+        return None
+    rooms = result["available_rooms"]
+    if not rooms:
+        return "No rooms are free right now."
+    if len(rooms) == 1:
+        return f"{rooms[0]['name']} is free right now."
+    return f"{len(rooms)} rooms are free right now: {_room_names(rooms)}."
+
+
+def _answer_room_available(match: re.Match) -> Optional[str]:
+    result = resolve_room(match.group("room"))
+    if result["status"] != "success" or not result["matches"]:
+        return None
+    best = result["matches"][0]
+    runner_up = result["matches"][1]["score"] if len(result["matches"]) > 1 else 0.0
+    if best["score"] < MIN_MATCH_SCORE or best["score"] - runner_up < MIN_MATCH_MARGIN:
+        return None
+
+    room = _get_room(best["id"], max_age=AVAILABILITY_MAX_AGE)
+    if room is None or room.availability is None:
+        return None
+    record_access(room.id)
+
+    now = datetime.datetime.now().astimezone()
+    for event in room.availability:
+        if event.start <= now < event.end:
+            return f"{room.name} is busy until {event.end.astimezone():%H:%M} ({event.subject})."
+
+    upcoming = [event.start for event in room.availability if event.start > now]
+    if upcoming:
+        return (
+            f"{room.name} is free right now, until {min(upcoming).astimezone():%H:%M}."
+        )
+    return f"{room.name} is free right now, for the rest of the day."
+
+
+def _answer_list_rooms(match: re.Match) -> Optional[str]:
+    result = get_all_rooms()
+    if result["status"] != "success":
+        return None
+    rooms = result["rooms"]
+    if not rooms:
+        return "There are no meeting rooms in the directory."
+    return f"There are {len(rooms)} meeting rooms: {_room_names(rooms)}."
+
+
+# Checked in order; the first intent whose pattern matches the whole
+# message answers it
+INTENTS: List[Tuple[str, Pattern, Callable[[re.Match], Optional[str]]]] = [
+    ("free_rooms", _FREE_ROOMS, _answer_free_rooms),
+    ("list_rooms", _LIST_ROOMS, _answer_list_rooms),
+    ("room_available", _ROOM_AVAILABLE, _answer_room_available),
+]
+
+
+def route_message(message: str) -> Optional[str]:
+    """Answer a common question directly, without the model.
+
+    Args:
+        message: The user's message
+
+    Returns:
+        str: The answer, or None to send the message on to the model (for
+        anything that isn't a recognized intent, or when the tools fail,
+        time out or the room is ambiguous).
+    """
+    text = _normalize(message)
+    for intent, pattern, handler in INTENTS:
+        match = pattern.fullmatch(text)
+        if match is None:
+            continue
+
+        with log_context(tool=f"fast_path.{intent}"), deadlines.deadline(
+            deadlines.TOOL_DEADLINE
+        ):
+            try:
+                answer = handler(match)
+            except Exception as e:
+                logger.warning("Fast path failed: %s", e)
+                answer = None
+            # A partial answer would be wrong; the model can say what's missing
+            if deadlines.timed_out():
+                answer = None
+
+        with _stats_lock:
+            _stats["answered" if answer is not None else "fallbacks"] += 1
+        if answer is None:
+            logger.debug("Passing %s question on to the model", intent)
+        return answer
+    return None
+
+
+def get_fast_path_stats() -> Dict[str, int]:
+    """How many messages the fast path answered, and how many matched but went to the model."""
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,188 @@
+import atexit
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from typing import Dict, Any, Callable, Iterator, Optional
+
+# Minimum level written, e.g. DEBUG, INFO, WARNING
+LOG_LEVEL = os.environ.get("EXCHANGE_LOG_LEVEL", "INFO").upper()
+
+# "text" for human-readable lines, "json" for one JSON object per line
+LOG_FORMAT = os.environ.get("EXCHANGE_LOG_FORMAT", "text").lower()
+
+# Records waiting to be written; further records are dropped, not waited on
+LOG_QUEUE_SIZE = int(os.environ.get("EXCHANGE_LOG_QUEUE_SIZE", "10000"))
+
+# Every logger of the tools package is a child of this one
+PACKAGE_LOGGER_NAME = __name__.rsplit(".", 1)[0]
+
+# Fields describing what the code was doing, attached to every record
+CONTEXT_FIELDS = ("tenant", "tool", "room_id", "latency_ms")
+
+# Context fields set for the current tool call, see log_context()
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar(
+    "exchange_log_context", default={}
+)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+logger = logging.getLogger(__name__)
+
+
+class _ContextFilter(logging.Filter):
+    """Attach the current context fields to each record, in the caller's thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _context.get()
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+
+class _SamplingFilter(logging.Filter):
+    """Keep only a fraction of records logged with ``extra={"sample_rate": ...}``."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        return rate is None or random.random() < rate
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(
+            f"{field}={getattr(record, field)}"
+            for field in CONTEXT_FIELDS
+            if getattr(record, field, None) is not None
+        )
+        return f"{line} [{fields}]" if fields else line
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        return json.dumps(data, default=str)
+
+
+def configure_logging(
+    level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, stream=None
+):
+    """(Re)configure the tools' logging.
+
+    Records are formatted and written by a background thread, so logging
+    on the calling thread only costs a level check and a queue put.
+
+    Args:
+        level: Minimum level written
+        log_format: "text" or "json"
+        stream: Where records are written (defaults to stderr)
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if log_format == "json":
+        output.setFormatter(_JsonFormatter())
+    else:
+        output.setFormatter(
+            _TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+    handler = _DroppingQueueHandler(log_queue)
+    handler.addFilter(_SamplingFilter())
+    handler.addFilter(_ContextFilter())
+
+    package_logger = logging.getLogger(PACKAGE_LOGGER_NAME)
+    for existing in list(package_logger.handlers):
+        if isinstance(existing, _DroppingQueueHandler):
+            package_logger.removeHandler(existing)
+    package_logger.addHandler(handler)
+    package_logger.setLevel(level)
+    package_logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+
+
+def _stop_logging():
+    # Flush what's still queued when the process exits
+    if _listener is not None:
+        _listener.stop()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Get the logger of a tools module (pass ``__name__``)."""
+    return logging.getLogger(name)
+
+
+@contextlib.contextmanager
+def log_context(**fields) -> Iterator[None]:
+    """Attach context fields (tenant, tool, room_id, ...) to the records logged inside the block."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def logged_tool(func: Callable) -> Callable:
+    """Wrap a tool so its records carry the tool name and each call logs its latency.
+
+    The wrapper keeps the tool's name, signature and docstring.
+    """
+    tool_name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with log_context(tool=tool_name):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            if logger.isEnabledFor(logging.DEBUG):
+                status = result.get("status") if isinstance(result, dict) else None
+                logger.debug(
+                    "Tool call finished with status %s",
+                    status,
+                    extra={
+                        "latency_ms": round((time.perf_counter() - start) * 1000, 1)
+                    },
+                )
+            return result
+
+    return wrapper
+
+
+configure_logging()
+atexit.register(_stop_logging)
@@ -0,0 +1,336 @@
+import bisect
+import datetime
+import re
+import threading
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple
+
+from . import deadlines
+from .records import Event, Room
+from .room_index import get_room_index
+from .room_tools import AVAILABILITY_MAX_AGE, _get_room
+from .text import PREFIX_MATCH_WEIGHT, tokenize
+from .booking_tools import parse_datetime
+from .tenants import current_tenant
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# How much a query token matching each field counts towards a meeting's score
+FIELD_WEIGHTS = {"subject": 1.0, "organizer": 0.9, "room": 0.8}
+
+# Words in a meeting reference that don't identify it ("cancel my meeting")
+MEETING_STOPWORDS = {"my", "meeting", "meetings", "cancel", "with", "room", "today"}
+
+# Times in the query ("3pm", "15:00") are matched through the window instead
+_TIME_TOKEN = re.compile(r"^\d{1,2}(?:\d{2})?(?:am|pm)?$|^(?:am|pm)$")
+
+# A window given as a single time matches meetings starting this close to it
+TIME_SLACK = datetime.timedelta(minutes=30)
+
+# Shorter query tokens only match whole words ("a" in "Conference Room A")
+MIN_PREFIX_LENGTH = 3
+
+DEFAULT_FIND_LIMIT = 10
+
+_MeetingKey = Tuple[str, str]
+
+
+class _Meeting:
+    __slots__ = ("room", "event", "fields")
+
+    def __init__(self, room: Room, event: Event):
+        self.room = room
+        self.event = event
+        self.fields: Dict[str, Set[str]] = {
+            "subject": set(tokenize(event.subject)),
+            "organizer": set(tokenize(event.organizer)),
+            "room": set(tokenize(room.name)) | set(tokenize(room.location)),
+        }
+
+
+class MeetingIndex:
+    """Index over the events of the cached room calendars.
+
+    Subject, organizer and room tokens map to the meetings that have them,
+    and the meetings are kept sorted by start time, so a lookup only scores
+    the meetings in its time window that share a token with the query. The
+    tokens are also kept sorted, so the tokens a query word is a prefix of
+    are found by bisection.
+    """
+
+    def __init__(self):
+        self._meetings: Dict[_MeetingKey, _Meeting] = {}
+        self._postings: Dict[str, Set[_MeetingKey]] = {}
+        self._sorted_tokens: List[str] = []
+        self._starts: List[Tuple[datetime.datetime, _MeetingKey]] = []
+        # The room record each room's meetings were indexed from
+        self._sources: Dict[str, Room] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._meetings)
+
+    @property
+    def room_count(self) -> int:
+        """Number of rooms whose calendar is indexed."""
+        return len(self._sources)
+
+    def _add_room(self, room: Room):
+        self._sources[room.id] = room
+        for event in room.availability:
+            key = (room.id, event.id)
+            if key in self._meetings:
+                continue
+            meeting = _Meeting(room, event)
+            self._meetings[key] = meeting
+            for tokens in meeting.fields.values():
+                for token in tokens:
+                    if token not in self._postings:
+                        self._postings[token] = set()
+                        bisect.insort(self._sorted_tokens, token)
+                    self._postings[token].add(key)
+            bisect.insort(self._starts, (event.start, key))
+
+    def _remove_room(self, room_id: str):
+        room = self._sources.pop(room_id, None)
+        if room is None:
+            return
+        for event in room.availability:
+            key = (room_id, event.id)
+            meeting = self._meetings.pop(key, None)
+            if meeting is None:
+                continue
+            for tokens in meeting.fields.values():
+                for token in tokens:
+                    keys = self._postings.get(token)
+                    if keys is not None:
+                        keys.discard(key)
+                        if not keys:
+                            del self._postings[token]
+                            del self._sorted_tokens[
+                                bisect.bisect_left(self._sorted_tokens, token)
+                            ]
+            position = bisect.bisect_left(self._starts, (event.start, key))
+            if position < len(self._starts) and self._starts[position][1] == key:
+                del self._starts[position]
+
+    def _prefixed(self, prefix: str) -> Iterator[str]:
+        """The indexed tokens starting with a prefix, in order."""
+        position = bisect.bisect_left(self._sorted_tokens, prefix)
+        while position < len(self._sorted_tokens):
+            token = self._sorted_tokens[position]
+            if not token.startswith(prefix):
+                break
+            yield token
+            position += 1
+
+    def sync(self, rooms: Iterable[Tuple[str, Room]]):
+        """Re-index the rooms whose cached calendar changed and drop uncached ones.
+
+        Cached calendars are replaced rather than changed in place, so a room
+        only needs re-indexing when its record is a different object.
+        """
+        with self._lock:
+            seen = set()
+            for room_id, room in rooms:
+                if room.availability is None:
+                    continue
+                seen.add(room_id)
+                if self._sources.get(room_id) is room:
+                    continue
+                self._remove_room(room_id)
+                self._add_room(room)
+
+            for room_id in [
+                room_id for room_id in self._sources if room_id not in seen
+            ]:
+                self._remove_room(room_id)
+
+    def search(
+        self,
+        query: str,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        around: Optional[datetime.datetime] = None,
+        limit: int = DEFAULT_FIND_LIMIT,
+    ) -> List[Tuple[Room, Event, float]]:
+        """Find the meetings starting in a window that best match a free-text reference.
+
+        Args:
+            query: Words from the meeting's subject, organizer or room; empty
+                for every meeting in the window
+            start: Start of the window
+            end: End of the window
+            around: Rank meetings starting closer to this time first among
+                equally good matches
+            limit: Maximum number of meetings returned
+
+        Returns:
+            list: (room, event, score) triples, best first, with scores
+            between 0 and 1.
+        """
+        query_tokens = [
+            token
+            for token in tokenize(query)
+            if token not in MEETING_STOPWORDS and not _TIME_TOKEN.match(token)
+        ]
+
+        with self._lock:
+            low = bisect.bisect_left(self._starts, (start,))
+            high = bisect.bisect_left(self._starts, (end,))
+            in_window = [key for _, key in self._starts[low:high]]
+
+            if query_tokens:
+                matching: Set[_MeetingKey] = set()
+                for token in query_tokens:
+                    if len(token) < MIN_PREFIX_LENGTH:
+                        matching.update(self._postings.get(token, ()))
+                        continue
+                    for indexed in self._prefixed(token):
+                        matching.update(self._postings[indexed])
+                in_window = [key for key in in_window if key in matching]
+
+            scored = []
+            for key in in_window:
+                meeting = self._meetings[key]
+                score = 1.0
+                if query_tokens:
+                    score = sum(
+                        _token_match(token, meeting) for token in query_tokens
+                    ) / len(query_tokens)
+                scored.append((meeting.room, meeting.event, score))
+
+        def rank(match):
+            distance = abs((match[1].start - around).total_seconds()) if around else 0
+            return -match[2], distance, match[1].start
+
+        scored.sort(key=rank)
+        return scored[:limit]
+
+
+def _token_match(token: str, meeting: _Meeting) -> float:
+    """Best weighted match of one query token against the fields of a meeting."""
+    best = 0.0
+    for field, tokens in meeting.fields.items():
+        weight = FIELD_WEIGHTS[field]
+        if weight <= best:
+            continue
+        if token in tokens:
+            best = weight
+        elif len(token) >= MIN_PREFIX_LENGTH and any(
+            candidate.startswith(token) for candidate in tokens
+        ):
+            best = max(best, weight * PREFIX_MATCH_WEIGHT)
+    return best
+
+
+def _parse_meeting_window(
+    window: str,
+) -> Tuple[datetime.datetime, datetime.datetime, Optional[datetime.datetime]]:
+    """Parse a day, "<start> to <end>" or a single time into (start, end, around)."""
+    text = (window or "today").strip()
+    now = datetime.datetime.now().astimezone()
+
+    if " to " in text:
+        start_text, end_text = text.split(" to ", 1)
+        return (
+            parse_datetime(start_text.strip()).astimezone(),
+            parse_datetime(end_text.strip()).astimezone(),
+            None,
+        )
+
+    if text.lower() in ("today", "tomorrow"):
+        day = now.date()
+        if text.lower() == "tomorrow":
+            day += datetime.timedelta(days=1)
+    else:
+        when = parse_datetime(text).astimezone()
+        if when.time() != datetime.time():
+            return when - TIME_SLACK, when + TIME_SLACK, when
+        day = when.date()
+
+    start = datetime.datetime.combine(day, datetime.time()).astimezone()
+    return start, start + datetime.timedelta(days=1), None
+
+
+def get_meeting_index() -> MeetingIndex:
+    """Get the current tenant's meeting index, synced with its cached calendars.
+
+    Only calendars already cached (fetched by other tools or kept up to date
+    by pushed changes) are indexed; nothing is fetched, and later lookups
+    only re-index changed calendars.
+    """
+    tenant = current_tenant()
+    index = tenant.state("meeting_index", MeetingIndex)
+    index.sync(tenant.room_info_cache.items())
+    return index
+
+
+def _load_named_rooms(query: str):
+    """Cache fresh calendars of the rooms a meeting reference names, if it names any."""
+    room_index = get_room_index()
+    if room_index is None:
+        return
+    for room in room_index.named_in(query):
+        if deadlines.expired():
+            break
+        _get_room(room.id, max_age=AVAILABILITY_MAX_AGE)
+
+
+def find_meetings(
+    query: str = "", window: str = "today", limit: int = DEFAULT_FIND_LIMIT
+) -> Dict[str, Any]:
+    """Finds meetings by subject, organizer or room, with the IDs needed to cancel them.
+
+    Use this to turn "my 3pm in Conference Room A" into a meeting_id and
+    room_id for cancel_meeting, instead of fetching and scanning rooms. The
+    calendars of rooms named in the query are fetched if needed; other rooms
+    are only searched if their calendar is already cached.
+
+    Args:
+        query (str, optional): Words from the meeting's subject, organizer or
+            room, e.g. "standup conference room a". Leave empty to list all
+            meetings in the window.
+        window (str, optional): When the meeting starts: "today", "tomorrow",
+            a time such as "today at 3pm" (matches meetings starting within
+            30 minutes of it) or "<start> to <end>". Defaults to "today".
+        limit (int, optional): Maximum number of meetings to return. Defaults to 10.
+
+    Returns:
+        dict: Status, the best matching meetings with their room and a
+            score between 0 and 1, and how many rooms' calendars were
+            searched, or error message.
+    """
+    try:
+        start, end, around = _parse_meeting_window(window)
+        _load_named_rooms(query)
+        index = get_meeting_index()
+
+        matches = index.search(query, start, end, around, limit)
+        return {
+            "status": "success",
+            "query": query,
+            "window": {"start": start.isoformat(), "end": end.isoformat()},
+            "meetings": [
+                {
+                    "meeting_id": event.id,
+                    "subject": event.subject,
+                    "organizer": event.organizer,
+                    "start": event.start.isoformat(),
+                    "end": event.end.isoformat(),
+                    "room_id": room.id,
+                    "room_name": room.name,
+                    "score": round(score, 3),
+                }
+                for room, event, score in matches
+            ],
+            "count": len(matches),
+            "rooms_searched": index.room_count,
+        }
+
+    except Exception as e:
+        logger.error("Error finding meetings: %s", e)
+        return {
+            "status": "error",
+            "error_message": f"Failed to find meetings: {str(e)}",
+        }
@@ -0,0 +1,439 @@
+import datetime
+import math
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from . import deadlines
+from .records import Room
+from .room_tools import (
+    AVAILABILITY_MAX_AGE,
+    MEETING_GRANULARITY_MINUTES,
+    _data_age,
+    _get_room,
+    _get_rooms,
+)
+from .booking_tools import parse_datetime
+from .tenants import current_tenant
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Default width of a time slot in the occupancy matrix
+DEFAULT_SLOT_MINUTES = MEETING_GRANULARITY_MINUTES
+
+# Guards each tenant's dict of matrices
+_matrices_lock = threading.Lock()
+
+
+class OccupancyMatrix:
+    """Rooms × time-slots matrix of busy slots built from cached calendars.
+
+    Row ``i`` belongs to ``room_ids[i]`` and column ``j`` to the slot starting
+    at ``start + j * slot_minutes``. A slot is busy if any event overlaps it.
+
+    The matrix is shared by concurrent tool calls: hold ``lock`` while
+    reading rows, so a sync can't move them in between.
+    """
+
+    def __init__(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        slot_minutes: int = DEFAULT_SLOT_MINUTES,
+    ):
+        self.start = start
+        self.slot = datetime.timedelta(minutes=slot_minutes)
+        self.slot_minutes = slot_minutes
+        self.slot_count = math.ceil((end - start) / self.slot)
+        self.room_ids: List[str] = []
+        # Rows are allocated in growing blocks; only the first len(room_ids) are used
+        self._busy = np.zeros((16, self.slot_count), dtype=bool)
+        self._rows: Dict[str, int] = {}
+        # The Room record each row was built from, to spot calendar changes
+        self._sources: List[Optional[Room]] = []
+        self.lock = threading.RLock()
+
+    @property
+    def busy(self) -> np.ndarray:
+        return self._busy[: len(self.room_ids)]
+
+    def slot_at(self, when: datetime.datetime) -> int:
+        """Index of the slot containing ``when``, clipped to the matrix."""
+        index = (when - self.start) // self.slot
+        return min(max(index, 0), self.slot_count)
+
+    def slot_after(self, when: datetime.datetime) -> int:
+        """Index of the first slot starting at or after ``when``, clipped."""
+        index = -((self.start - when) // self.slot)
+        return min(max(index, 0), self.slot_count)
+
+    def slot_start(self, index: int) -> datetime.datetime:
+        return self.start + index * self.slot
+
+    def update_room(self, room: Room):
+        """Rebuild the row of one room from its events, adding it if needed."""
+        # Mark each event's slots with a difference array, then integrate it
+        events = room.availability or ()
+        delta = np.zeros(self.slot_count + 1, dtype=np.int32)
+        if events:
+            first = np.fromiter((self.slot_at(e.start) for e in events), np.int64)
+            last = np.fromiter((self.slot_after(e.end) for e in events), np.int64)
+            np.add.at(delta, first, 1)
+            np.add.at(delta, last, -1)
+        busy = np.cumsum(delta[:-1]) > 0
+
+        with self.lock:
+            row = self._rows.get(room.id)
+            if row is None:
+                row = len(self.room_ids)
+                self._rows[room.id] = row
+                self.room_ids.append(room.id)
+                self._sources.append(None)
+                if row == len(self._busy):
+                    self._busy = np.vstack([self._busy, np.zeros_like(self._busy)])
+            self._busy[row] = busy
+            self._sources[row] = room
+
+    def remove_room(self, room_id: str):
+        """Drop the row of a room, moving the last row into its place."""
+        with self.lock:
+            row = self._rows.pop(room_id, None)
+            if row is None:
+                return
+            last = len(self.room_ids) - 1
+            if row != last:
+                moved = self.room_ids[last]
+                self._busy[row] = self._busy[last]
+                self.room_ids[row] = moved
+                self._sources[row] = self._sources[last]
+                self._rows[moved] = row
+            self.room_ids.pop()
+            self._sources.pop()
+
+    def room_at(self, row: int) -> Room:
+        """The room record a row was last built from."""
+        return self._sources[row]
+
+    def sync(self, rooms: Iterable[Tuple[str, Room]]):
+        """Bring the rows in line with the cached calendars.
+
+        Rows are rebuilt for calendars that changed, and dropped for rooms
+        whose calendar is no longer cached (evicted or invalidated), so a
+        freed room isn't reported busy from an old calendar.
+        """
+        with self.lock:
+            seen = set()
+            for room_id, room in rooms:
+                if room.availability is None:
+                    continue
+                seen.add(room_id)
+                row = self._rows.get(room_id)
+                if row is None or self._sources[row] is not room:
+                    self.update_room(room)
+
+            for room_id in [room_id for room_id in self._rows if room_id not in seen]:
+                self.remove_room(room_id)
+
+    def _window(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> Tuple[int, int]:
+        return self.slot_at(start), self.slot_after(end)
+
+    def rooms_free_between(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> np.ndarray:
+        """Boolean mask of rooms with no busy slot in [start, end)."""
+        first, last = self._window(start, end)
+        with self.lock:
+            return ~self.busy[:, first:last].any(axis=1)
+
+    def free_window_starts(
+        self,
+        duration_minutes: int,
+        start: datetime.datetime,
+        end: datetime.datetime,
+    ) -> Tuple[np.ndarray, List[datetime.datetime]]:
+        """Find the times at which each room is free for ``duration_minutes``.
+
+        Candidates are ``start`` itself and every slot boundary after it whose
+        period still ends within the window.
+
+        Returns:
+            tuple: A rooms × candidates boolean matrix and the candidate start times.
+        """
+        duration = datetime.timedelta(minutes=duration_minutes)
+        needed = max(1, math.ceil(duration_minutes / self.slot_minutes))
+        first, last = self.slot_after(start), self.slot_at(end)
+
+        columns = []
+        candidates = []
+        if self.slot_start(first) != start and start + duration <= end:
+            columns.append(self.rooms_free_between(start, start + duration)[:, None])
+            candidates.append(start)
+
+        if last - first >= needed:
+            # Busy slots in every run of `needed` slots, via a running sum
+            with self.lock:
+                busy = self.busy[:, first:last].astype(np.int32)
+            running = np.zeros((busy.shape[0], busy.shape[1] + 1), dtype=np.int32)
+            np.cumsum(busy, axis=1, out=running[:, 1:])
+            windows = running[:, needed:] - running[:, :-needed] == 0
+            columns.append(windows)
+            candidates.extend(
+                self.slot_start(first + column) for column in range(windows.shape[1])
+            )
+
+        if not columns:
+            return np.zeros((len(self.room_ids), 0), dtype=bool), []
+        return np.hstack(columns), candidates
+
+    def utilization(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> np.ndarray:
+        """Fraction of busy slots per room in [start, end)."""
+        first, last = self._window(start, end)
+        with self.lock:
+            if last <= first:
+                return np.zeros(len(self.room_ids))
+            return self.busy[:, first:last].mean(axis=1)
+
+
+def get_occupancy_matrix(
+    day: Optional[datetime.date] = None,
+    slot_minutes: int = DEFAULT_SLOT_MINUTES,
+) -> OccupancyMatrix:
+    """Get the occupancy matrix of a day, synced with the room cache.
+
+    The cached calendars only hold today's events (see _cached_day), so a
+    matrix for any other day would show every room as free.
+
+    Args:
+        day (datetime.date, optional): The day covered. Defaults to today.
+        slot_minutes (int, optional): Slot width, typically 5 or 15 minutes.
+
+    Returns:
+        OccupancyMatrix: The matrix, with rows updated for changed calendars
+        and dropped for calendars no longer cached.
+    """
+    day = day or datetime.date.today()
+    start = datetime.datetime.combine(day, datetime.time()).astimezone()
+    key = (start, slot_minutes)
+
+    # Each tenant has its own matrices, built from its own calendars
+    tenant = current_tenant()
+    matrices: Dict[Tuple[datetime.datetime, int], OccupancyMatrix] = tenant.state(
+        "occupancy_matrices", dict
+    )
+    with _matrices_lock:
+        matrix = matrices.get(key)
+        if matrix is None:
+            # Matrices for past days are never queried again
+            for stale_key in [k for k in matrices if k[0] < start]:
+                del matrices[stale_key]
+            matrix = OccupancyMatrix(
+                start, start + datetime.timedelta(days=1), slot_minutes
+            )
+            matrices[key] = matrix
+
+    matrix.sync(tenant.room_info_cache.items())
+    return matrix
+
+
+def _cached_day() -> Tuple[datetime.datetime, datetime.datetime]:
+    """Start and end of the day the cached room calendars cover (today)."""
+    start = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    start = start.astimezone()
+    return start, start + datetime.timedelta(days=1)
+
+
+def _outside_cached_day(
+    start: datetime.datetime, end: datetime.datetime
+) -> Optional[Dict[str, Any]]:
+    """An error result if a window isn't within the day the cached calendars cover."""
+    day_start, day_end = _cached_day()
+    if start < day_start or end > day_end:
+        return {
+            "status": "error",
+            "error_message": "Room availability is only known for today. Please ask about a time window within today.",
+        }
+    return None
+
+
+def _load_calendars(max_age: int = AVAILABILITY_MAX_AGE) -> Optional[Dict[str, Any]]:
+    """Make sure every room in the directory has a cached calendar at most max_age old.
+
+    Returns:
+        dict: An error result if the room directory couldn't be loaded.
+    """
+    rooms = _get_rooms()
+    if rooms is None:
+        return {
+            "status": "error",
+            "error_message": "Failed to fetch rooms. Please check authentication and try again.",
+        }
+
+    # Once the deadline passes, rooms keep whatever calendar is cached (the
+    # result's data_age_seconds shows how old) and uncached ones are left out
+    for room in rooms:
+        if deadlines.expired():
+            break
+        _get_room(room.id, max_age=max_age)
+    return None
+
+
+def _parse_window(
+    start_time: str, end_time: str
+) -> Tuple[datetime.datetime, datetime.datetime]:
+    if start_time.strip().lower() == "today":
+        start = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    else:
+        start = parse_datetime(start_time or "now")
+    start = start.astimezone()
+    if end_time:
+        end = parse_datetime(end_time).astimezone()
+    else:
+        # Default to the rest of the day
+        end = datetime.datetime.combine(
+            start.date() + datetime.timedelta(days=1), datetime.time()
+        ).astimezone()
+    return start, end
+
+
+def find_free_rooms(
+    duration_minutes: int = 0,
+    start_time: str = "now",
+    end_time: str = "",
+    min_capacity: int = 0,
+    max_age: int = AVAILABILITY_MAX_AGE,
+) -> Dict[str, Any]:
+    """Finds rooms that are free for a length of time, or for a whole time window.
+
+    Args:
+        duration_minutes (int, optional): Length of the free period needed. Use 0 to
+            require the room to be free for the whole window. Defaults to 0.
+        start_time (str, optional): Start of the window (ISO format or relative like
+            "today at 1pm"). Defaults to "now".
+        end_time (str, optional): End of the window. Defaults to the end of the day.
+            The window must fall within today.
+        min_capacity (int, optional): Minimum room capacity. Defaults to 0.
+        max_age (int, optional): Maximum age in seconds of cached availability;
+            older data is refetched. Use 0 to always fetch. Defaults to 60.
+
+    Returns:
+        dict: Status and the free rooms with the first free times found, or error message.
+    """
+    try:
+        start, end = _parse_window(start_time, end_time)
+        if end <= start:
+            return {
+                "status": "error",
+                "error_message": "The end of the time window must be after its start.",
+            }
+
+        error = _outside_cached_day(start, end) or _load_calendars(max_age)
+        if error:
+            return error
+
+        matrix = get_occupancy_matrix(start.date())
+        # Rows stay put while they're read
+        with matrix.lock:
+            if duration_minutes:
+                free, candidates = matrix.free_window_starts(
+                    duration_minutes, start, end
+                )
+            else:
+                free = matrix.rooms_free_between(start, end)[:, None]
+                candidates = [start]
+
+            duration = datetime.timedelta(minutes=duration_minutes) or end - start
+            free_rooms = []
+            for row in np.flatnonzero(free.any(axis=1)):
+                room = matrix.room_at(row)
+                if room.capacity < min_capacity:
+                    continue
+
+                # Report the first few times the room could be used
+                slot_starts = [
+                    candidates[column] for column in np.flatnonzero(free[row])[:3]
+                ]
+
+                room_data = room.to_dict()
+                del room_data["availability"]
+                room_data["free_slots"] = [
+                    {
+                        "start": slot_start.isoformat(),
+                        "end": (slot_start + duration).isoformat(),
+                    }
+                    for slot_start in slot_starts
+                ]
+                free_rooms.append(room_data)
+
+            return {
+                "status": "success",
+                "free_rooms": free_rooms,
+                "count": len(free_rooms),
+                "window": {"start": start.isoformat(), "end": end.isoformat()},
+                "data_age_seconds": _data_age(matrix.room_ids),
+            }
+
+    except Exception as e:
+        logger.error("Error finding free rooms: %s", e)
+        return {
+            "status": "error",
+            "error_message": f"Failed to find free rooms: {str(e)}",
+        }
+
+
+def get_room_utilization(
+    start_time: str = "today", end_time: str = ""
+) -> Dict[str, Any]:
+    """Reports how much of a time window each room is booked.
+
+    Args:
+        start_time (str, optional): Start of the window (ISO format or relative like
+            "today at 9am"). Defaults to the start of today.
+        end_time (str, optional): End of the window. Defaults to the end of the day.
+            The window must fall within today.
+
+    Returns:
+        dict: Status and per-room utilization between 0 and 1, or error message.
+    """
+    try:
+        start, end = _parse_window(start_time, end_time)
+
+        error = _outside_cached_day(start, end) or _load_calendars()
+        if error:
+            return error
+
+        matrix = get_occupancy_matrix(start.date())
+        with matrix.lock:
+            utilization = matrix.utilization(start, end)
+            room_ids = list(matrix.room_ids)
+            rooms = [
+                {
+                    "id": room_id,
+                    "name": matrix.room_at(row).name,
+                    "utilization": round(float(value), 3),
+                }
+                for row, (room_id, value) in enumerate(zip(room_ids, utilization))
+            ]
+        rooms.sort(key=lambda room: room["utilization"], reverse=True)
+
+        return {
+            "status": "success",
+            "rooms": rooms,
+            "average_utilization": (
+                round(float(utilization.mean()), 3) if len(rooms) else 0.0
+            ),
+            "window": {"start": start.isoformat(), "end": end.isoformat()},
+            "data_age_seconds": _data_age(room_ids),
+        }
+
+    except Exception as e:
+        logger.error("Error calculating room utilization: %s", e)
+        return {
+            "status": "error",
+            "error_message": f"Failed to calculate room utilization: {str(e)}",
+        }
@@ -0,0 +1,328 @@
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from .records import Event, Room
+from .tenants import current_tenant
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Optional on-disk tier under the in-memory room caches, shared by every agent
+# process on the machine (WAL mode lets readers run while one process writes).
+# Each tenant has its own database (Tenant.cache_db_path); set
+# EXCHANGE_CACHE_DB to the default tenant's database path to enable it.
+
+# Entries older than the TTL are ignored; entries older than the refresh age
+# are still served but refreshed in the background
+DIRECTORY_TTL = int(os.environ.get("EXCHANGE_CACHE_DIRECTORY_TTL", str(24 * 3600)))
+DIRECTORY_REFRESH_AGE = int(
+    os.environ.get("EXCHANGE_CACHE_DIRECTORY_REFRESH_AGE", "3600")
+)
+CALENDAR_TTL = int(os.environ.get("EXCHANGE_CACHE_CALENDAR_TTL", "3600"))
+CALENDAR_REFRESH_AGE = int(os.environ.get("EXCHANGE_CACHE_CALENDAR_REFRESH_AGE", "60"))
+
+# Bump when the tables change; older databases are rebuilt
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE rooms (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    capacity INTEGER NOT NULL,
+    building TEXT NOT NULL,
+    floor TEXT NOT NULL,
+    location TEXT NOT NULL,
+    equipment TEXT NOT NULL,
+    -- Order in the room directory, NULL for rooms no longer listed
+    position INTEGER
+);
+CREATE TABLE directory (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE calendars (
+    room_id TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE events (
+    room_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    organizer TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL
+);
+CREATE INDEX events_by_room ON events (room_id, start);
+CREATE INDEX events_by_time ON events (start, end);
+"""
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return bool(current_tenant().cache_db_path)
+
+
+def _connection() -> sqlite3.Connection:
+    """Get this thread's connection to the tenant's database, creating it on first use."""
+    path = current_tenant().cache_db_path
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    connection = connections.get(path)
+    if connection is not None:
+        return connection
+
+    connection = sqlite3.connect(path, timeout=5)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+
+    with _schema_lock:
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            with connection:
+                for table in ("events", "calendars", "directory", "rooms"):
+                    connection.execute(f"DROP TABLE IF EXISTS {table}")
+                connection.executescript(_SCHEMA)
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    connections[path] = connection
+    return connection
+
+
+def _from_timestamp(value: float) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(value).astimezone()
+
+
+def _room_from_row(row: Tuple[Any, ...]) -> Room:
+    room_id, name, email, capacity, building, floor, location, equipment = row
+    return Room(
+        room_id,
+        name,
+        email,
+        capacity,
+        building,
+        json.loads(floor),
+        location,
+        tuple(json.loads(equipment)),
+    )
+
+
+def _room_row(room: Room) -> Tuple[Any, ...]:
+    return (
+        room.id,
+        room.name,
+        room.email,
+        room.capacity,
+        room.building,
+        json.dumps(room.floor),
+        room.location,
+        json.dumps(list(room.equipment)),
+    )
+
+
+def load_rooms() -> Optional[Tuple[List[Room], float]]:
+    """Load the room directory if it was saved within DIRECTORY_TTL.
+
+    Returns:
+        tuple: The rooms and their age in seconds, or None on a miss.
+    """
+    if not is_enabled():
+        return None
+
+    try:
+        connection = _connection()
+        row = connection.execute("SELECT fetched_at FROM directory").fetchone()
+        if row is None:
+            return None
+        age = time.time() - row[0]
+        if age > DIRECTORY_TTL:
+            return None
+
+        rooms = [
+            _room_from_row(row)
+            for row in connection.execute(
+                "SELECT id, name, email, capacity, building, floor, location, "
+                "equipment FROM rooms WHERE position IS NOT NULL ORDER BY position"
+            )
+        ]
+        return (rooms, age) if rooms else None
+    except sqlite3.Error as e:
+        logger.error("Error reading room directory from disk cache: %s", e)
+        return None
+
+
+def save_rooms(rooms: List[Room]):
+    """Replace the saved room directory."""
+    if not is_enabled():
+        return
+
+    try:
+        connection = _connection()
+        with connection:
+            # Keep the equipment saved with each room's calendar
+            connection.execute("UPDATE rooms SET position = NULL")
+            connection.executemany(
+                "INSERT INTO rooms VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET name = excluded.name, "
+                "email = excluded.email, capacity = excluded.capacity, "
+                "building = excluded.building, floor = excluded.floor, "
+                "location = excluded.location, position = excluded.position",
+                (_room_row(room) + (position,) for position, room in enumerate(rooms)),
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO directory (id, fetched_at) VALUES (1, ?)",
+                (time.time(),),
+            )
+    except sqlite3.Error as e:
+        logger.error("Error writing room directory to disk cache: %s", e)
+
+
+def load_room(room_id: str) -> Optional[Tuple[Room, float]]:
+    """Load a room with its calendar if the calendar was saved within CALENDAR_TTL.
+
+    Returns:
+        tuple: The room and the age of its calendar in seconds, or None on a miss.
+    """
+    if not is_enabled():
+        return None
+
+    try:
+        connection = _connection()
+        row = connection.execute(
+            "SELECT fetched_at FROM calendars WHERE room_id = ?", (room_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        age = time.time() - row[0]
+        if age > CALENDAR_TTL:
+            return None
+
+        room_row = connection.execute(
+            "SELECT id, name, email, capacity, building, floor, location, "
+            "equipment FROM rooms WHERE id = ?",
+            (room_id,),
+        ).fetchone()
+        if room_row is None:
+            return None
+
+        room = _room_from_row(room_row)
+        room.availability = tuple(
+            Event(
+                event_id,
+                subject,
+                organizer,
+                _from_timestamp(start),
+                _from_timestamp(end),
+            )
+            for event_id, subject, organizer, start, end in connection.execute(
+                "SELECT id, subject, organizer, start, end FROM events "
+                "WHERE room_id = ? ORDER BY start",
+                (room_id,),
+            )
+        )
+        return room, age
+    except sqlite3.Error as e:
+        logger.error("Error reading room %s from disk cache: %s", room_id, e)
+        return None
+
+
+def save_room(room: Room):
+    """Save a room's equipment and replace its saved calendar.
+
+    The directory fields (name, capacity, building, ...) are left to
+    save_rooms: the room detail response doesn't carry all of them. They're
+    only taken from the detail for rooms missing from the saved directory.
+    """
+    if not is_enabled() or room.availability is None:
+        return
+
+    try:
+        connection = _connection()
+        with connection:
+            connection.execute(
+                "INSERT INTO rooms VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL) "
+                "ON CONFLICT (id) DO NOTHING",
+                _room_row(room),
+            )
+            connection.execute(
+                "UPDATE rooms SET equipment = ? WHERE id = ?",
+                (json.dumps(list(room.equipment)), room.id),
+            )
+            connection.execute("DELETE FROM events WHERE room_id = ?", (room.id,))
+            connection.executemany(
+                "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        room.id,
+                        event.id,
+                        event.subject,
+                        event.organizer,
+                        event.start.timestamp(),
+                        event.end.timestamp(),
+                    )
+                    for event in room.availability
+                ),
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO calendars (room_id, fetched_at) VALUES (?, ?)",
+                (room.id, time.time()),
+            )
+    except sqlite3.Error as e:
+        logger.error("Error writing room %s to disk cache: %s", room.id, e)
+
+
+def invalidate_room(room_id: str):
+    """Forget a room's saved calendar, e.g. after it was booked."""
+    if not is_enabled():
+        return
+
+    try:
+        connection = _connection()
+        with connection:
+            connection.execute("DELETE FROM calendars WHERE room_id = ?", (room_id,))
+            connection.execute("DELETE FROM events WHERE room_id = ?", (room_id,))
+    except sqlite3.Error as e:
+        logger.error("Error invalidating room %s in disk cache: %s", room_id, e)
+
+
+def load_events(
+    start: datetime.datetime, end: datetime.datetime
+) -> Dict[str, List[Event]]:
+    """Load the saved events overlapping [start, end) from fresh calendars.
+
+    Returns:
+        dict: Events per room ID, sorted by start time.
+    """
+    if not is_enabled():
+        return {}
+
+    events: Dict[str, List[Event]] = {}
+    try:
+        rows = _connection().execute(
+            "SELECT e.room_id, e.id, e.subject, e.organizer, e.start, e.end "
+            "FROM events e JOIN calendars c ON c.room_id = e.room_id "
+            "WHERE e.start < ? AND e.end > ? AND c.fetched_at >= ? "
+            "ORDER BY e.start",
+            (end.timestamp(), start.timestamp(), time.time() - CALENDAR_TTL),
+        )
+        for room_id, event_id, subject, organizer, event_start, event_end in rows:
+            events.setdefault(room_id, []).append(
+                Event(
+                    event_id,
+                    subject,
+                    organizer,
+                    _from_timestamp(event_start),
+                    _from_timestamp(event_end),
+                )
+            )
+    except sqlite3.Error as e:
+        logger.error("Error reading events from disk cache: %s", e)
+    return events
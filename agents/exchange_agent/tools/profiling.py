@@ -0,0 +1,288 @@
+import cProfile
+import datetime
+import functools
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Tools to profile: a comma-separated list of tool names, or "all". Leave
+# empty to start with profiling off; it can also be enabled at runtime.
+PROFILE_TOOLS = os.environ.get("EXCHANGE_PROFILE", "")
+
+# Fraction of calls captured regardless of how long they took
+PROFILE_SAMPLE_RATE = float(os.environ.get("EXCHANGE_PROFILE_SAMPLE_RATE", "0"))
+
+# Calls taking longer than this are captured (0 disables the threshold)
+PROFILE_THRESHOLD_MS = float(os.environ.get("EXCHANGE_PROFILE_THRESHOLD_MS", "1000"))
+
+PROFILE_DIR = Path(
+    os.path.expanduser(os.environ.get("EXCHANGE_PROFILE_DIR", "~/.exchange_profiles"))
+)
+
+# Number of captures kept; older ones are deleted
+PROFILE_KEEP = int(os.environ.get("EXCHANGE_PROFILE_KEEP", "50"))
+
+# Stack depth recorded for each allocation
+TRACEMALLOC_FRAMES = 10
+
+_config: Dict[str, Any] = {
+    "tools": set(),
+    "all": False,
+    "sample_rate": PROFILE_SAMPLE_RATE,
+    "threshold_ms": PROFILE_THRESHOLD_MS,
+}
+_config_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+# cProfile can only run one profiler per thread, so nested tool calls
+# are covered by the outermost capture
+_local = threading.local()
+
+_UNSAFE_NAME_CHARS = re.compile(r"[^0-9A-Za-z_-]+")
+
+
+def enable_profiling(
+    tools: Optional[Iterable[str]] = None,
+    sample_rate: Optional[float] = None,
+    threshold_ms: Optional[float] = None,
+):
+    """Start profiling tool calls.
+
+    Args:
+        tools: Names of the tools to profile (None for all wrapped tools)
+        sample_rate: Fraction of calls to capture regardless of latency
+        threshold_ms: Capture calls slower than this (0 to disable)
+    """
+    with _config_lock:
+        _config["all"] = tools is None
+        _config["tools"] = set(tools or ())
+        if sample_rate is not None:
+            _config["sample_rate"] = sample_rate
+        if threshold_ms is not None:
+            _config["threshold_ms"] = threshold_ms
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+
+
+def disable_profiling():
+    """Stop profiling tool calls and allocation tracing."""
+    with _config_lock:
+        _config["all"] = False
+        _config["tools"] = set()
+
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_profiling(tool_name: str) -> bool:
+    return _config["all"] or tool_name in _config["tools"]
+
+
+def _capture_name(tool_name: str, duration_ms: float) -> str:
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    return f"{timestamp}-{_UNSAFE_NAME_CHARS.sub('_', tool_name)}-{int(duration_ms)}ms"
+
+
+def _rotate():
+    """Delete the oldest captures beyond PROFILE_KEEP."""
+    captures = sorted(PROFILE_DIR.glob("*.prof"))
+    for profile_path in captures[: max(0, len(captures) - PROFILE_KEEP)]:
+        for path in (
+            profile_path,
+            profile_path.with_suffix(".alloc"),
+            profile_path.with_suffix(".json"),
+        ):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _write_capture(
+    tool_name: str,
+    reason: str,
+    duration_ms: float,
+    profiler: cProfile.Profile,
+    snapshot: Optional[tracemalloc.Snapshot],
+    peak_kib: Optional[float],
+):
+    try:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        base = PROFILE_DIR / _capture_name(tool_name, duration_ms)
+        profiler.dump_stats(str(base.with_suffix(".prof")))
+        if snapshot is not None:
+            snapshot.dump(str(base.with_suffix(".alloc")))
+        with open(base.with_suffix(".json"), "w") as f:
+            json.dump(
+                {
+                    "tool": tool_name,
+                    "reason": reason,
+                    "duration_ms": round(duration_ms, 1),
+                    "peak_memory_kib": peak_kib,
+                    "captured_at": datetime.datetime.now().isoformat(),
+                },
+                f,
+            )
+        with _write_lock:
+            _rotate()
+    except Exception as e:
+        logger.warning("Error writing profile for %s: %s", tool_name, e)
+
+
+def _call_profiled(tool_name: str, func: Callable, args, kwargs):
+    sampled = random.random() < _config["sample_rate"]
+    threshold_ms = _config["threshold_ms"]
+    if not sampled and not threshold_ms:
+        return func(*args, **kwargs)
+
+    tracing = tracemalloc.is_tracing()
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows only one active profiler per process
+        return func(*args, **kwargs)
+
+    _local.active = True
+    if tracing:
+        # The peak is process-wide, so it includes concurrent calls
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+    finally:
+        _local.active = False
+        duration_ms = (time.perf_counter() - start) * 1000
+        slow = bool(threshold_ms) and duration_ms >= threshold_ms
+        if sampled or slow:
+            # Snapshots cover everything still allocated once the call returns,
+            # such as what it added to the caches
+            snapshot = None
+            peak_kib = None
+            if tracing and tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                peak_kib = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            _write_capture(
+                tool_name,
+                "slow" if slow else "sampled",
+                duration_ms,
+                profiler,
+                snapshot,
+                peak_kib,
+            )
+
+
+def profiled(func: Callable) -> Callable:
+    """Wrap a tool so its calls can be profiled.
+
+    The wrapper keeps the tool's name, signature and docstring, and costs a
+    dictionary lookup per call while the tool isn't being profiled.
+    """
+    tool_name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not is_profiling(tool_name) or getattr(_local, "active", False):
+            return func(*args, **kwargs)
+        return _call_profiled(tool_name, func, args, kwargs)
+
+    return wrapper
+
+
+def summarize_profiles(
+    directory: Optional[Path] = None,
+    tool_name: str = "",
+    top: int = 20,
+    latest: int = 0,
+) -> str:
+    """Summarize the captured profiles in a directory.
+
+    Args:
+        directory: Directory with the captures (defaults to PROFILE_DIR)
+        tool_name: Only include captures of this tool
+        top: Number of functions and allocation sites listed
+        latest: Only include the most recent captures (0 for all)
+
+    Returns:
+        The report, as text
+    """
+    directory = Path(directory or PROFILE_DIR)
+    captures: List[Dict[str, Any]] = []
+    for meta_path in sorted(directory.glob("*.json")):
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if tool_name and meta.get("tool") != tool_name:
+            continue
+        meta["base"] = meta_path.with_suffix("")
+        captures.append(meta)
+    if latest:
+        captures = captures[-latest:]
+
+    if not captures:
+        return f"No profiles found in {directory}"
+
+    out = io.StringIO()
+    out.write(f"{len(captures)} capture(s) in {directory}\n\n")
+    for meta in captures:
+        out.write(
+            f"  {meta['captured_at']}  {meta['tool']:<28} "
+            f"{meta['duration_ms']:>9.1f} ms  "
+            f"peak {meta.get('peak_memory_kib') or 0:>9.1f} KiB  ({meta['reason']})\n"
+        )
+
+    profile_paths = [
+        str(meta["base"].with_suffix(".prof"))
+        for meta in captures
+        if meta["base"].with_suffix(".prof").exists()
+    ]
+    if profile_paths:
+        out.write(f"\nTop {top} functions by cumulative time:\n")
+        stats = pstats.Stats(*profile_paths, stream=out)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(top)
+
+    allocations: Dict[str, List[int]] = {}
+    for meta in captures:
+        alloc_path = meta["base"].with_suffix(".alloc")
+        if not alloc_path.exists():
+            continue
+        snapshot = tracemalloc.Snapshot.load(str(alloc_path))
+        for stat in snapshot.statistics("lineno"):
+            frame = stat.traceback[0]
+            totals = allocations.setdefault(f"{frame.filename}:{frame.lineno}", [0, 0])
+            totals[0] += stat.size
+            totals[1] += stat.count
+    if allocations:
+        out.write(f"Top {top} live allocation sites (summed over captures):\n")
+        ranked = sorted(allocations.items(), key=lambda item: item[1][0], reverse=True)
+        for site, (size, count) in ranked[:top]:
+            out.write(f"  {size / 1024:>10.1f} KiB  {count:>8} blocks  {site}\n")
+
+    return out.getvalue()
+
+
+# Apply the environment configuration on import
+if PROFILE_TOOLS:
+    enable_profiling(
+        None
+        if PROFILE_TOOLS.strip().lower() == "all"
+        else [name.strip() for name in PROFILE_TOOLS.split(",") if name.strip()]
+    )
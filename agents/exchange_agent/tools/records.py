@@ -0,0 +1,234 @@
+import datetime
+import re
+from typing import Dict, Any, Optional, Tuple
+
+# Graph returns 7 fractional digits, datetime.fromisoformat only accepts 6
+# on older Python versions
+_EXTRA_FRACTION_DIGITS = re.compile(r"(\.\d{6})\d+")
+
+
+def parse_timestamp(value: Any) -> Optional[datetime.datetime]:
+    """Parse an event timestamp into a timezone-aware datetime.
+
+    Accepts ISO strings (with or without a "Z" suffix) and Graph-style
+    ``{"dateTime": ..., "timeZone": ...}`` objects. Naive values are read as
+    UTC when Graph says so and as local time otherwise.
+
+    Args:
+        value: The raw timestamp from the API response.
+
+    Returns:
+        datetime.datetime: Aware datetime, or None if the value can't be parsed.
+    """
+    time_zone = None
+    if isinstance(value, dict):
+        time_zone = value.get("timeZone")
+        value = value.get("dateTime")
+    if not value or not isinstance(value, str):
+        return None
+
+    text = value.replace("Z", "+00:00")
+    try:
+        parsed = datetime.datetime.fromisoformat(text)
+    except ValueError:
+        try:
+            parsed = datetime.datetime.fromisoformat(
+                _EXTRA_FRACTION_DIGITS.sub(r"\1", text)
+            )
+        except ValueError:
+            return None
+
+    if parsed.tzinfo is None:
+        if time_zone == "UTC":
+            return parsed.replace(tzinfo=datetime.timezone.utc)
+        return parsed.astimezone()
+    return parsed
+
+
+class Event:
+    """A calendar event occupying a room."""
+
+    __slots__ = ("id", "subject", "organizer", "start", "end")
+
+    def __init__(
+        self,
+        id: str,
+        subject: str,
+        organizer: str,
+        start: datetime.datetime,
+        end: datetime.datetime,
+    ):
+        self.id = id
+        self.subject = subject
+        self.organizer = organizer
+        self.start = start
+        self.end = end
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "subject": self.subject,
+            "organizer": self.organizer,
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+        }
+
+
+class Room:
+    """A meeting room with its directory metadata and, once fetched, its events."""
+
+    __slots__ = (
+        "id",
+        "name",
+        "email",
+        "capacity",
+        "building",
+        "floor",
+        "location",
+        "equipment",
+        "availability",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        name: str = "",
+        email: str = "",
+        capacity: int = 0,
+        building: str = "",
+        floor: Any = "",
+        location: str = "Unknown Location",
+        equipment: Tuple[Any, ...] = (),
+        availability: Optional[Tuple[Event, ...]] = None,
+    ):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.capacity = capacity
+        self.building = building
+        self.floor = floor
+        self.location = location
+        self.equipment = equipment
+        self.availability = availability
+
+    def is_free(self, start: datetime.datetime, end: datetime.datetime) -> bool:
+        """Whether none of the room's events overlap the period [start, end)."""
+        for event in self.availability or ():
+            if event.start < end and start < event.end:
+                return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the room for a tool response.
+
+        Directory entries (no events fetched yet) omit the availability and
+        equipment keys, matching what ``get_all_rooms`` has always returned.
+        """
+        data = {
+            "id": self.id,
+            "name": self.name,
+            "email": self.email,
+            "capacity": self.capacity,
+            "building": self.building,
+            "floor": self.floor,
+            "location": self.location,
+        }
+        if self.availability is not None:
+            data["availability"] = [event.to_dict() for event in self.availability]
+            data["equipment"] = list(self.equipment)
+        return data
+
+
+def _capacity(value: Any) -> int:
+    # The server reports "Unknown" when Graph doesn't know the capacity
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _organizer(value: Any) -> str:
+    if isinstance(value, dict):
+        email = value.get("emailAddress") or {}
+        return email.get("name") or email.get("address") or ""
+    return value or ""
+
+
+def normalize_event(raw: Dict[str, Any]) -> Optional[Event]:
+    """Map an event from the server or Graph JSON to an Event.
+
+    Args:
+        raw (dict): The event as returned by the API.
+
+    Returns:
+        Event: The normalized event, or None if it has no usable start/end.
+    """
+    start = parse_timestamp(raw.get("start") or raw.get("startTime"))
+    end = parse_timestamp(raw.get("end") or raw.get("endTime"))
+    if start is None or end is None:
+        return None
+
+    subject = raw.get("subject")
+    if subject is None:
+        subject = raw.get("title", "")
+
+    return Event(
+        raw.get("id", ""),
+        subject,
+        _organizer(raw.get("organizer")),
+        start,
+        end,
+    )
+
+
+def normalize_room(
+    raw: Dict[str, Any], room_id: str = "", with_details: bool = False
+) -> Room:
+    """Map a room from the server or Graph JSON to a Room.
+
+    Args:
+        raw (dict): The room as returned by the API.
+        room_id (str, optional): ID to fall back on when the payload has none.
+        with_details (bool, optional): Also normalize the room's events and
+            equipment. Defaults to False (directory entry only).
+
+    Returns:
+        Room: The normalized room.
+    """
+    get = raw.get
+
+    name = get("displayName")
+    if name is None:
+        name = get("name", "")
+    email = get("email")
+    if email is None:
+        email = get("emailAddress", "")
+    floor = get("floorNumber")
+    if floor is None:
+        floor = get("floor", "")
+
+    availability = None
+    equipment = ()
+    if with_details:
+        events = []
+        for raw_event in get("availability") or ():
+            event = normalize_event(raw_event)
+            if event is not None:
+                events.append(event)
+        events.sort(key=lambda event: event.start)
+        availability = tuple(events)
+        equipment = tuple(get("equipment") or ())
+
+    return Room(
+        get("id") or room_id,
+        name,
+        email,
+        _capacity(get("capacity", 0)),
+        get("building", ""),
+        floor,
+        get("location", "Unknown Location"),
+        equipment,
+        availability,
+    )
@@ -0,0 +1,193 @@
+import contextvars
+import datetime
+import os
+import threading
+import time
+from typing import Dict, Any
+
+from . import deadlines, request_scheduler
+from .hotness import room_hotness
+from .room_tools import AVAILABILITY_MAX_AGE, _fetch_room, _max_age_for
+from .tenants import current_tenant
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds between refresh rounds
+REFRESH_INTERVAL = float(os.environ.get("EXCHANGE_REFRESH_INTERVAL", "20"))
+
+# Most rooms kept fresh per tenant, hottest first
+REFRESH_HOT_ROOMS = int(os.environ.get("EXCHANGE_REFRESH_HOT_ROOMS", "10"))
+
+# Rooms accessed less than this (after decay, see hotness.py) are cold and
+# only refreshed when a tool needs them
+REFRESH_MIN_HOTNESS = float(os.environ.get("EXCHANGE_REFRESH_MIN_HOTNESS", "2"))
+
+# Background refreshes per minute, shared by all tenants
+REFRESH_BUDGET = float(os.environ.get("EXCHANGE_REFRESH_BUDGET", "60"))
+
+# Refresh tokens that can be saved up: one round's worth
+_BUDGET_BURST = max(1.0, REFRESH_BUDGET * REFRESH_INTERVAL / 60)
+
+_budget_lock = threading.Lock()
+_budget = {"tokens": _BUDGET_BURST, "updated_at": time.monotonic()}
+
+_refresher_lock = threading.Lock()
+
+
+def _take_budget() -> bool:
+    """Spend one refresh from the global budget, False when it's used up."""
+    with _budget_lock:
+        now = time.monotonic()
+        _budget["tokens"] = min(
+            _BUDGET_BURST,
+            _budget["tokens"] + (now - _budget["updated_at"]) * REFRESH_BUDGET / 60,
+        )
+        _budget["updated_at"] = now
+        if _budget["tokens"] < 1:
+            return False
+        _budget["tokens"] -= 1
+        return True
+
+
+def _new_refresher() -> Dict[str, Any]:
+    return {
+        "thread": None,
+        "stop": threading.Event(),
+        "stats": {
+            "rounds": 0,
+            "refreshed": 0,
+            "failed": 0,
+            "over_budget": 0,
+            "last_round_at": None,
+        },
+    }
+
+
+def _refresher() -> Dict[str, Any]:
+    """The current tenant's refresher thread and counters."""
+    return current_tenant().state("refresher", _new_refresher)
+
+
+def _needs_refresh(room_id: str, now: float) -> bool:
+    """Whether a room's cached calendar would be stale before the next round."""
+    tenant = current_tenant()
+    if room_id not in tenant.room_info_cache:
+        return True
+    fetched_at = tenant.room_fetched_at.get(room_id, 0.0)
+    bound = _max_age_for(fetched_at, AVAILABILITY_MAX_AGE)
+    return now - fetched_at + REFRESH_INTERVAL > bound
+
+
+def refresh_hot_rooms(limit: int = REFRESH_HOT_ROOMS) -> Dict[str, int]:
+    """Refetch the hottest rooms whose cached calendar is about to go stale.
+
+    Stops early once the global refresh budget is used up; the rooms left
+    over are the first ones tried in the next round, as they're hotter.
+
+    Args:
+        limit: Most rooms considered
+
+    Returns:
+        dict: How many rooms were refreshed, failed and skipped for budget.
+    """
+    stats = _refresher()["stats"]
+    counts = {"refreshed": 0, "failed": 0, "over_budget": 0}
+    now = time.time()
+    due = [
+        room_id
+        for room_id, _ in room_hotness().hottest(limit, REFRESH_MIN_HOTNESS, now)
+        if _needs_refresh(room_id, now)
+    ]
+
+    for position, room_id in enumerate(due):
+        if not _take_budget():
+            counts["over_budget"] = len(due) - position
+            break
+        try:
+            room = _fetch_room(room_id)
+        except request_scheduler.RequestShedError:
+            # Interactive requests come first; try again next round
+            room = None
+        counts["refreshed" if room is not None else "failed"] += 1
+
+    with _refresher_lock:
+        stats["rounds"] += 1
+        stats["last_round_at"] = datetime.datetime.now().isoformat()
+        for key, count in counts.items():
+            stats[key] += count
+    if counts["over_budget"]:
+        logger.debug(
+            "Refresh budget used up, %s hot rooms left stale", counts["over_budget"]
+        )
+    return counts
+
+
+def _run_refresher(stop: threading.Event):
+    with deadlines.detached(), request_scheduler.priority(request_scheduler.BACKGROUND):
+        while not stop.wait(REFRESH_INTERVAL):
+            try:
+                refresh_hot_rooms()
+            except Exception as e:
+                logger.warning("Error refreshing hot rooms: %s", e)
+
+
+def start_refresher() -> bool:
+    """Starts keeping the most frequently queried rooms' availability fresh in the background.
+
+    Every EXCHANGE_REFRESH_INTERVAL seconds the hottest rooms whose cached
+    calendar would otherwise go stale are refetched, within the global
+    EXCHANGE_REFRESH_BUDGET, so tools mostly answer them from the cache.
+    Rooms nobody asks about are left to be fetched on demand.
+
+    Returns:
+        bool: True if the refresher was started, False if it's already running.
+    """
+    refresher = _refresher()
+
+    with _refresher_lock:
+        thread = refresher["thread"]
+        if thread is not None and thread.is_alive():
+            return False
+
+        refresher["stop"] = threading.Event()
+        # Runs in a copy of the caller's context, so for the same tenant
+        refresher["thread"] = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(_run_refresher, refresher["stop"]),
+            name="exchange-refresher",
+            daemon=True,
+        )
+        refresher["thread"].start()
+        return True
+
+
+def stop_refresher():
+    """Stops the background refresher; rooms are then only refreshed on demand."""
+    refresher = _refresher()
+    with _refresher_lock:
+        refresher["stop"].set()
+        refresher["thread"] = None
+
+
+def get_refresher_status() -> Dict[str, Any]:
+    """Reports the refresher's counters and the hottest rooms of the current tenant.
+
+    Returns:
+        dict: Status, whether the refresher is running, its counters and the
+            hottest rooms with their decayed access counts.
+    """
+    refresher = _refresher()
+    with _refresher_lock:
+        thread = refresher["thread"]
+        stats = dict(refresher["stats"])
+
+    return {
+        "status": "success",
+        "running": thread is not None and thread.is_alive(),
+        "refresher": stats,
+        "hot_rooms": [
+            {"room_id": room_id, "hotness": round(score, 2)}
+            for room_id, score in room_hotness().hottest(REFRESH_HOT_ROOMS)
+        ],
+    }
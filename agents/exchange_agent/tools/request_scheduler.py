@@ -0,0 +1,248 @@
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import requests
+
+from . import cassette, deadlines
+from .tenants import current_tenant
+
+# Priority classes, most urgent first
+INTERACTIVE_WRITE = 0
+INTERACTIVE_READ = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    INTERACTIVE_WRITE: "interactive_write",
+    INTERACTIVE_READ: "interactive_read",
+    BACKGROUND: "background",
+}
+
+# Maximum number of requests in flight per backend and tenant
+BACKEND_LIMITS = {
+    "local": int(os.environ.get("EXCHANGE_LOCAL_CONCURRENCY", "8")),
+    "graph": int(os.environ.get("EXCHANGE_GRAPH_CONCURRENCY", "4")),
+}
+
+# Slots per backend that background work never takes, so an interactive
+# request doesn't have to wait for a background one to finish
+INTERACTIVE_RESERVE = 1
+
+# Background requests are shed rather than queued once this many requests
+# are already waiting for the backend
+BACKGROUND_QUEUE_LIMIT = int(os.environ.get("EXCHANGE_BACKGROUND_QUEUE_LIMIT", "16"))
+
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Priority of the requests made in the current context, None to go by method
+_priority: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "exchange_request_priority", default=None
+)
+
+
+class RequestShedError(Exception):
+    """Raised instead of queueing background work on an overloaded backend."""
+
+
+class _Backend:
+    """Concurrency slots of one backend, handed out in priority order."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.background_limit = max(1, self.limit - INTERACTIVE_RESERVE)
+        self.active = 0
+        self.background_active = 0
+        # Heap of (priority, sequence) tickets; FIFO within a priority
+        self._waiting: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self.completed = {priority: 0 for priority in PRIORITY_NAMES}
+        self.shed = 0
+
+    def _can_start(self, ticket: Tuple[int, int]) -> bool:
+        if self._waiting[0] is not ticket or self.active >= self.limit:
+            return False
+        return ticket[0] != BACKGROUND or self.background_active < self.background_limit
+
+    def acquire(self, priority: int, timeout: Optional[float] = None):
+        with self._condition:
+            if priority == BACKGROUND and len(self._waiting) >= BACKGROUND_QUEUE_LIMIT:
+                self.shed += 1
+                raise RequestShedError(
+                    f"Too many requests waiting for the {self.name} backend; "
+                    "background request dropped"
+                )
+
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            give_up_at = None if timeout is None else time.monotonic() + timeout
+            try:
+                while not self._can_start(ticket):
+                    if give_up_at is None:
+                        self._condition.wait()
+                        continue
+                    left = give_up_at - time.monotonic()
+                    if left <= 0:
+                        raise deadlines.DeadlineExceeded(
+                            f"Timed out waiting for the {self.name} backend"
+                        )
+                    self._condition.wait(left)
+            except BaseException:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+                raise
+
+            heapq.heappop(self._waiting)
+            self.active += 1
+            if priority == BACKGROUND:
+                self.background_active += 1
+            # The next ticket may be able to start as well
+            self._condition.notify_all()
+
+    def release(self, priority: int):
+        with self._condition:
+            self.active -= 1
+            if priority == BACKGROUND:
+                self.background_active -= 1
+            self.completed[priority] += 1
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "waiting": len(self._waiting),
+                "completed": {
+                    PRIORITY_NAMES[priority]: count
+                    for priority, count in self.completed.items()
+                },
+                "shed": self.shed,
+            }
+
+
+# Backends by (tenant, backend name): each tenant has its own servers and
+# Graph throttling, so one tenant's load never takes another's slots
+_backends: Dict[Tuple[str, str], _Backend] = {}
+_backends_lock = threading.Lock()
+
+
+def _get_backend(name: str) -> _Backend:
+    key = (current_tenant().name, name)
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            backend = _Backend(name, BACKEND_LIMITS.get(name, 4))
+            _backends[key] = backend
+        return backend
+
+
+def background_limit(backend: str) -> int:
+    """Background requests the current tenant's backend runs at once; more wait or are shed."""
+    return _get_backend(backend).background_limit
+
+
+@contextlib.contextmanager
+def priority(level: int) -> Iterator[None]:
+    """Run the requests made inside the block with the given priority class.
+
+    Worker threads don't inherit the priority; submit their work with
+    ``contextvars.copy_context().run`` to carry it over.
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority(method: str = "GET") -> int:
+    """Priority class of a request made now: the context's, else by method."""
+    level = _priority.get()
+    if level is not None:
+        return level
+    return INTERACTIVE_WRITE if method.upper() in _WRITE_METHODS else INTERACTIVE_READ
+
+
+@contextlib.contextmanager
+def slot(backend: str, level: int, timeout: Optional[float] = None) -> Iterator[None]:
+    """Hold one of the backend's concurrency slots for the duration of the block.
+
+    Args:
+        backend: The backend's name
+        level: Priority class of the request
+        timeout: Longest time to wait for a slot, in seconds (None to wait)
+
+    Raises:
+        RequestShedError: If the request is background work and the backend's
+            queue is too deep to take it.
+        DeadlineExceeded: If no slot came free within the timeout.
+    """
+    scheduled = _get_backend(backend)
+    scheduled.acquire(level, timeout)
+    try:
+        yield
+    finally:
+        scheduled.release(level)
+
+
+def request(
+    backend: str, method: str, url: str, share: Optional[float] = None, **kwargs
+) -> requests.Response:
+    """Send an HTTP request once the backend has a slot free for its priority.
+
+    The request goes through the current tenant's connection pool and
+    counts against that tenant's slots. Waiting for a slot and the request
+    itself are bounded by the current tool's deadline (see deadlines.py).
+
+    Args:
+        backend: "local" for the local Exchange API, "graph" for Microsoft Graph
+        method: HTTP method
+        url: Full URL
+        share: Share of the remaining deadline the request may use (defaults
+            to deadlines.READ_SHARE for reads and WRITE_SHARE for writes)
+        **kwargs: Passed on to requests.request
+
+    Returns:
+        The response, recorded or replayed when a cassette is in use (see
+        cassette.py). For streamed responses the slot is released once the
+        headers have arrived.
+
+    Raises:
+        RequestShedError: If background work was dropped to protect interactive calls.
+        requests.Timeout: If the request timed out, or the deadline passed
+            before it could be sent (DeadlineExceeded).
+    """
+    if share is None:
+        write = method.upper() in _WRITE_METHODS
+        share = deadlines.WRITE_SHARE if write else deadlines.READ_SHARE
+    # Fails fast once the budget is used up
+    deadlines.request_timeout(share)
+
+    try:
+        with slot(backend, current_priority(method), deadlines.remaining()):
+            # Time spent queued for the slot comes out of the budget
+            kwargs.setdefault("timeout", deadlines.request_timeout(share))
+            return cassette.send(method, url, current_tenant().session, **kwargs)
+    except requests.Timeout:
+        deadlines.note_timeout()
+        raise
+
+
+def get_scheduler_stats() -> Dict[str, Any]:
+    """Slots in use, queue depth, completed and shed requests per backend of the current tenant."""
+    tenant_name = current_tenant().name
+    with _backends_lock:
+        backends = [
+            backend
+            for (tenant, _), backend in _backends.items()
+            if tenant == tenant_name
+        ]
+    return {backend.name: backend.stats() for backend in backends}
@@ -0,0 +1,211 @@
+import contextvars
+import os
+import threading
+import time
+from typing import Dict, Any
+
+import socketio
+
+from .records import normalize_event
+from .room_tools import (
+    _invalidate_room,
+    _note_room_change,
+    _replace_room_events,
+    _set_push_subscription,
+)
+from .tenants import DEFAULT_TENANT, Tenant, current_tenant, use_tenant
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Socket.IO endpoint of the default tenant's Exchange API server; other
+# tenants (and the default, if unset) use the host of their API URL
+ROOM_EVENTS_URL = os.environ.get("EXCHANGE_ROOM_EVENTS_URL", "")
+
+# Longest wait between attempts to reach the server before the first connection
+MAX_CONNECT_BACKOFF = 60
+
+_client_lock = threading.Lock()
+
+
+def _new_listener() -> Dict[str, Any]:
+    return {
+        "client": None,
+        "stop": threading.Event(),
+        "stats": {
+            "connected": False,
+            "subscribed_since": None,
+            "received": 0,
+            "patched": 0,
+            "invalidated": 0,
+        },
+    }
+
+
+def _listener() -> Dict[str, Any]:
+    """The current tenant's Socket.IO client and counters."""
+    return current_tenant().state("room_events", _new_listener)
+
+
+def _events_url(tenant: Tenant) -> str:
+    if ROOM_EVENTS_URL and tenant.name == DEFAULT_TENANT:
+        return ROOM_EVENTS_URL
+    return tenant.api_url.rsplit("/exchange", 1)[0]
+
+
+def apply_room_change(change: Dict[str, Any]) -> str:
+    """Bring the current tenant's cached calendar of a room in line with a pushed change.
+
+    New and cancelled bookings are patched into a cached calendar; anything
+    that can't be patched (room updates, rooms not cached in memory) drops
+    the room from the caches so its next read fetches it.
+
+    Args:
+        change: The roomChanged event: type, roomId and the meeting or meetingId
+
+    Returns:
+        str: "patched", "invalidated" or "ignored"
+    """
+    room_id = change.get("roomId")
+    if not room_id:
+        return "ignored"
+    stats = _listener()["stats"]
+    stats["received"] += 1
+    _note_room_change(room_id)
+
+    change_type = change.get("type")
+    room = current_tenant().room_info_cache.get(room_id)
+    patched = False
+    if room is not None and room.availability is not None:
+        if change_type == "bookingCreated" and change.get("meeting"):
+            event = normalize_event(change["meeting"])
+            if event is not None:
+                events = [e for e in room.availability if e.id != event.id]
+                patched = _replace_room_events(room_id, events + [event])
+        elif change_type == "bookingCancelled" and change.get("meetingId"):
+            patched = _replace_room_events(
+                room_id,
+                [e for e in room.availability if e.id != change["meetingId"]],
+            )
+
+    if patched:
+        stats["patched"] += 1
+        logger.debug(
+            "Patched cached calendar after %s", change_type, extra={"room_id": room_id}
+        )
+        return "patched"
+
+    _invalidate_room(room_id)
+    stats["invalidated"] += 1
+    logger.debug(
+        "Invalidated cached calendar after %s", change_type, extra={"room_id": room_id}
+    )
+    return "invalidated"
+
+
+def _create_client(tenant: Tenant, listener: Dict[str, Any], url: str):
+    client = socketio.Client(reconnection=True, reconnection_delay_max=30)
+    stats = listener["stats"]
+
+    # Handlers run on the client's threads, so they enter the tenant themselves
+    def on_subscribed(reply=None):
+        if isinstance(reply, dict) and reply.get("status") != "success":
+            logger.warning("Subscribing to room changes failed: %s", reply)
+            return
+        # Changes may have been missed before now, so cached calendars only
+        # get the longer lifetime once they're fetched again
+        since = time.time()
+        stats["subscribed_since"] = since
+        with use_tenant(tenant):
+            _set_push_subscription(since)
+            logger.info("Subscribed to room changes at %s", url)
+
+    @client.event
+    def connect():
+        stats["connected"] = True
+        client.emit("subscribeRoomChanges", {}, callback=on_subscribed)
+
+    @client.event
+    def disconnect(*args):
+        stats["connected"] = False
+        stats["subscribed_since"] = None
+        with use_tenant(tenant):
+            _set_push_subscription(None)
+            if not listener["stop"].is_set():
+                logger.warning("Lost the connection for room changes")
+
+    @client.on("roomChanged")
+    def on_room_changed(change):
+        if isinstance(change, dict):
+            with use_tenant(tenant):
+                apply_room_change(change)
+
+    return client
+
+
+def _connect(client: socketio.Client, url: str, stop: threading.Event):
+    # The client only reconnects by itself once it has been connected
+    backoff = 1
+    while not stop.is_set():
+        try:
+            client.connect(url, wait_timeout=10)
+            return
+        except socketio.exceptions.ConnectionError as e:
+            logger.warning(
+                "Couldn't connect for room changes, retrying in %ss: %s", backoff, e
+            )
+            stop.wait(backoff)
+            backoff = min(backoff * 2, MAX_CONNECT_BACKOFF)
+
+
+def start_room_events(url: str = "") -> bool:
+    """Start listening for room changes pushed by the current tenant's Exchange API server.
+
+    While subscribed, cached calendars are patched or invalidated as bookings
+    are made and cancelled, and may be kept up to
+    PUSHED_AVAILABILITY_MAX_AGE seconds instead of being polled.
+
+    Args:
+        url: The server's Socket.IO endpoint (defaults to the host of the
+            tenant's API URL)
+
+    Returns:
+        bool: True if the listener was started, False if it's already running.
+    """
+    tenant = current_tenant()
+    listener = _listener()
+    url = url or _events_url(tenant)
+
+    with _client_lock:
+        if listener["client"] is not None:
+            return False
+        listener["stop"].clear()
+        client = _create_client(tenant, listener, url)
+        listener["client"] = client
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(_connect, client, url, listener["stop"]),
+            name=f"exchange-room-events-{tenant.name}",
+            daemon=True,
+        ).start()
+        return True
+
+
+def stop_room_events():
+    """Stop listening for the current tenant's room changes; its calendars age normally again."""
+    listener = _listener()
+
+    with _client_lock:
+        client = listener["client"]
+        if client is None:
+            return
+        listener["stop"].set()
+        client.disconnect()
+        listener["client"] = None
+    listener["stats"].update(connected=False, subscribed_since=None)
+    _set_push_subscription(None)
+
+
+def get_room_events_status() -> Dict[str, Any]:
+    """Whether the current tenant's room changes are being received, and how many were applied."""
+    return dict(_listener()["stats"])
@@ -0,0 +1,278 @@
+import heapq
+import threading
+from collections import Counter
+from itertools import chain
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from .records import Room
+from .room_tools import _get_rooms
+from .text import PREFIX_MATCH_WEIGHT, tokenize
+from .tenants import current_tenant
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Length of the character n-grams used for fuzzy matching
+NGRAM_SIZE = 3
+
+# How much a query token matching each field counts towards the token score
+FIELD_WEIGHTS = {"name": 1.0, "email": 0.8, "building": 0.6, "location": 0.5}
+
+DEFAULT_RESOLVE_LIMIT = 5
+
+# Rooms scored per query: the ones sharing the most n-grams with it, plus
+# those matching a query token that isn't this common
+MAX_CANDIDATES = 50
+
+
+def _ngrams(text: str) -> Set[str]:
+    """Character n-grams of the normalized text, padded so short words still match."""
+    padded = f" {' '.join(tokenize(text))} "
+    if len(padded) <= NGRAM_SIZE:
+        return {padded}
+    return {padded[i : i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+def _email_text(email: str) -> str:
+    # Only the mailbox part tells rooms apart
+    return email.split("@", 1)[0]
+
+
+class _Entry:
+    __slots__ = ("room", "signature", "name", "fields", "grams")
+
+    def __init__(self, room: Room):
+        self.room = room
+        self.signature = _signature(room)
+        # Compared with the query words, so without stopwords either
+        self.name = " ".join(tokenize(room.name))
+        self.fields: Dict[str, Set[str]] = {
+            "name": set(tokenize(room.name)),
+            "email": set(tokenize(_email_text(room.email))),
+            "building": set(tokenize(room.building)),
+            "location": set(tokenize(room.location)),
+        }
+        self.grams = _ngrams(room.name)
+
+
+def _signature(room: Room) -> Tuple[str, str, str, str]:
+    return room.name, room.email, room.building, room.location
+
+
+class RoomIndex:
+    """Inverted index over room names, emails and locations for fuzzy lookups.
+
+    Tokens map to the rooms whose fields contain them and character n-grams
+    of the room names map to the rooms that have them, so a query only
+    scores the rooms it shares something with.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._token_postings: Dict[str, Set[str]] = {}
+        self._gram_postings: Dict[str, Set[str]] = {}
+        # The directory list the index was last synced with
+        self._source: Optional[List[Room]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add(self, entry: _Entry):
+        room_id = entry.room.id
+        self._entries[room_id] = entry
+        for tokens in entry.fields.values():
+            for token in tokens:
+                self._token_postings.setdefault(token, set()).add(room_id)
+        for gram in entry.grams:
+            self._gram_postings.setdefault(gram, set()).add(room_id)
+
+    def _remove(self, room_id: str):
+        entry = self._entries.pop(room_id, None)
+        if entry is None:
+            return
+        for postings, keys in [(self._gram_postings, entry.grams)] + [
+            (self._token_postings, tokens) for tokens in entry.fields.values()
+        ]:
+            for key in keys:
+                room_ids = postings.get(key)
+                if room_ids is not None:
+                    room_ids.discard(room_id)
+                    if not room_ids:
+                        del postings[key]
+
+    def sync(self, rooms: List[Room]):
+        """Bring the index in line with the room directory.
+
+        Only rooms that were added, removed or renamed/moved are re-indexed.
+        """
+        with self._lock:
+            if rooms is self._source:
+                return
+
+            seen = set()
+            for room in rooms:
+                seen.add(room.id)
+                entry = self._entries.get(room.id)
+                if entry is not None and entry.signature == _signature(room):
+                    # Keep the latest record for capacity and other details
+                    entry.room = room
+                    continue
+                self._remove(room.id)
+                self._add(_Entry(room))
+
+            for room_id in [
+                room_id for room_id in self._entries if room_id not in seen
+            ]:
+                self._remove(room_id)
+
+            self._source = rooms
+
+    def named_in(self, text: str) -> List[Room]:
+        """The rooms whose whole name appears among the words of a text.
+
+        "standup in conference room a" names "Conference Room A", but not
+        "Conference Room B" or "Conference Room A2".
+        """
+        words = set(tokenize(text))
+        with self._lock:
+            candidates = set(
+                chain.from_iterable(
+                    self._token_postings.get(word, ()) for word in words
+                )
+            )
+            named = []
+            for room_id in candidates:
+                entry = self._entries[room_id]
+                if entry.fields["name"] and entry.fields["name"] <= words:
+                    named.append(entry.room)
+        return named
+
+    def search(
+        self, query: str, limit: int = DEFAULT_RESOLVE_LIMIT
+    ) -> List[Tuple[Room, float]]:
+        """Find the rooms that best match a free-text room reference.
+
+        The score combines how many query tokens match a room's fields (exactly
+        or as a prefix) with the n-gram overlap between the query and the room
+        name, and is 1.0 for an exact name match.
+
+        Returns:
+            list: (room, score) pairs, best first, with scores between 0 and 1.
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+        query_name = " ".join(query_tokens)
+        query_grams = _ngrams(query)
+
+        with self._lock:
+            # Rooms sharing an n-gram with the query, with the overlap size
+            overlap = Counter(
+                chain.from_iterable(
+                    self._gram_postings.get(gram, ()) for gram in query_grams
+                )
+            )
+            candidates = set(
+                heapq.nlargest(MAX_CANDIDATES, overlap, key=overlap.__getitem__)
+            )
+            for token in query_tokens:
+                room_ids = self._token_postings.get(token, ())
+                if len(room_ids) <= MAX_CANDIDATES:
+                    candidates.update(room_ids)
+
+            scored = []
+            for room_id in candidates:
+                entry = self._entries[room_id]
+                if entry.name == query_name:
+                    scored.append((entry.room, 1.0))
+                    continue
+
+                token_score = sum(
+                    _token_match(token, entry) for token in query_tokens
+                ) / len(query_tokens)
+                gram_score = (
+                    2 * overlap.get(room_id, 0) / (len(query_grams) + len(entry.grams))
+                )
+                score = 0.6 * token_score + 0.4 * gram_score
+                if score > 0:
+                    scored.append((entry.room, min(score, 0.99)))
+
+        scored.sort(key=lambda match: (-match[1], match[0].name))
+        return scored[:limit]
+
+
+def _token_match(token: str, entry: _Entry) -> float:
+    """Best weighted match of one query token against the fields of a room."""
+    best = 0.0
+    for field, tokens in entry.fields.items():
+        weight = FIELD_WEIGHTS[field]
+        if weight <= best:
+            continue
+        if token in tokens:
+            best = weight
+        elif any(candidate.startswith(token) for candidate in tokens):
+            best = max(best, weight * PREFIX_MATCH_WEIGHT)
+    return best
+
+
+def get_room_index() -> Optional[RoomIndex]:
+    """Get the current tenant's room index, synced with its cached room directory.
+
+    Returns:
+        RoomIndex: The index, or None if the room directory couldn't be loaded.
+    """
+    rooms = _get_rooms()
+    if rooms is None:
+        return None
+    index = current_tenant().state("room_index", RoomIndex)
+    index.sync(rooms)
+    return index
+
+
+def resolve_room(name: str, limit: int = DEFAULT_RESOLVE_LIMIT) -> Dict[str, Any]:
+    """Finds the rooms matching a name, email or location the user mentioned.
+
+    Use this to turn a reference like "the board room" or "conf A" into a room ID.
+
+    Args:
+        name (str): The room as the user referred to it.
+        limit (int, optional): Maximum number of matches to return. Defaults to 5.
+
+    Returns:
+        dict: Status and the best matching rooms with scores between 0 and 1
+            (1 is an exact name match), or error message.
+    """
+    try:
+        index = get_room_index()
+        if index is None:
+            return {
+                "status": "error",
+                "error_message": "Failed to fetch rooms. Please check authentication and try again.",
+            }
+
+        matches = index.search(name, limit)
+        return {
+            "status": "success",
+            "query": name,
+            "matches": [
+                {
+                    "id": room.id,
+                    "name": room.name,
+                    "email": room.email,
+                    "building": room.building,
+                    "location": room.location,
+                    "capacity": room.capacity,
+                    "score": round(score, 3),
+                }
+                for room, score in matches
+            ],
+            "count": len(matches),
+        }
+
+    except Exception as e:
+        logger.error("Error resolving room: %s", e)
+        return {
+            "status": "error",
+            "error_message": f"Failed to resolve room: {str(e)}",
+        }
@@ -1,9 +1,13 @@
 import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable, Iterable, Iterator, Tuple
 import os
 import asyncio
+import codecs
+import contextvars
 import json
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from azure.identity import ClientSecretCredential
 from azure.identity.aio import ClientSecretCredential as AsyncClientSecretCredential
 from msgraph_core import BaseGraphRequestAdapter
@@ -17,19 +21,42 @@ from kiota_abstractions.serialization import (
     SerializationWriterFactoryRegistry,
 )
 from .auth_tools import _load_token_cache, check_auth_status
+from .tenants import current_tenant
+from .records import Event, Room, normalize_room
+from .hotness import record_access
+from . import deadlines, hedging, persistent_cache, request_scheduler
+from .log import get_logger
 
-# Configuration settings - in real implementation, load from config
-EXCHANGE_TENANT_ID = os.environ.get("EXCHANGE_TENANT_ID", "")
-EXCHANGE_CLIENT_ID = os.environ.get("EXCHANGE_CLIENT_ID", "")
-EXCHANGE_CLIENT_SECRET = os.environ.get("EXCHANGE_CLIENT_SECRET", "")
+logger = get_logger(__name__)
 
-# Configuration setting
-LOCAL_EXCHANGE_API_URL = "http://localhost:8080/exchange"
+# Size of the chunks read from streamed responses such as the room directory
+STREAM_CHUNK_SIZE = 64 * 1024
 
-# Cache for rooms data to minimize API calls
-_rooms_cache = None
-_room_info_cache = {}
-_adapter = None
+_JSON_WHITESPACE = " \t\r\n"
+_JSON_NUMBER_CHARS = "0123456789.eE+-"
+
+GRAPH_API_URL = "https://graph.microsoft.com/v1.0"
+GRAPH_BETA_API_URL = "https://graph.microsoft.com/beta"
+
+# Meetings are booked in slots of this many minutes
+MEETING_GRANULARITY_MINUTES = 15
+
+# Default freshness bound for availability reads, in seconds. A minute of
+# staleness is small next to a 15-minute slot, and lets repeated checks of
+# the same room within a conversation turn share a single fetch.
+AVAILABILITY_MAX_AGE = int(os.environ.get("EXCHANGE_AVAILABILITY_MAX_AGE", "60"))
+
+# How old a cached calendar may get while pushed room changes keep it current
+# (see room_events.py)
+PUSHED_AVAILABILITY_MAX_AGE = int(
+    os.environ.get("EXCHANGE_PUSHED_AVAILABILITY_MAX_AGE", "900")
+)
+
+# The room directory, calendars and Graph adapter are cached per tenant (see
+# tenants.py): rooms_cache and room_directory (the directory as a list and by
+# ID), room_info_cache, room_fetched_at (time.time() of
+# each calendar fetch), room_changed_at (last pushed change per room),
+# push_subscribed_since and the keys with a background refresh in flight
 
 
 def _get_graph_adapter():
@@ -39,10 +66,9 @@ def _get_graph_adapter():
     Returns:
         BaseGraphRequestAdapter: The authenticated Microsoft Graph adapter
     """
-    global _adapter
-
-    if _adapter is not None:
-        return _adapter
+    tenant = current_tenant()
+    if tenant.adapter is not None:
+        return tenant.adapter
 
     try:
         # Check auth status and refresh token if needed
@@ -79,34 +105,54 @@ def _get_graph_adapter():
         adapter.base_url = "graph.microsoft.com"
         adapter.base_url_template = "https://{+baseurl}/v1.0{+path}"
 
-        _adapter = adapter
-        print("Successfully created graph adapter with base URL:", adapter.base_url)
+        tenant.adapter = adapter
+        logger.info(
+            "Successfully created graph adapter with base URL: %s", adapter.base_url
+        )
         return adapter
     except Exception as e:
-        print(f"Error creating graph adapter: {e}")
+        logger.error("Error creating graph adapter: %s", e)
         raise
 
 
 def _make_request(endpoint: str, method: str = "GET", params=None, json_data=None):
     """Helper function to make API requests to the local Exchange API server"""
     try:
-        url = f"{LOCAL_EXCHANGE_API_URL}/{endpoint.lstrip('/')}"
+        url = f"{current_tenant().api_url}/{endpoint.lstrip('/')}"
+
+        # Out of time: don't start a request that can't finish
+        if deadlines.expired():
+            logger.debug("Skipping request to %s: deadline passed", endpoint)
+            return None
 
         # Check if we're authenticated
         auth_status = check_auth_status()
         if not auth_status["authenticated"]:
-            print("Not authenticated with Exchange service. Please authenticate first.")
+            if deadlines.timed_out():
+                logger.warning("Timed out checking authentication")
+            else:
+                logger.warning(
+                    "Not authenticated with Exchange service. Please authenticate first."
+                )
             return None
 
-        # Make the request
+        # Make the request; reads are idempotent, so slow ones may be hedged
         if method.upper() == "GET":
-            response = requests.get(url, params=params)
+            response = hedging.get(
+                "local", url, hedging.route_of(endpoint), params=params
+            )
         elif method.upper() == "POST":
-            response = requests.post(url, params=params, json=json_data)
+            response = request_scheduler.request(
+                "local", "POST", url, params=params, json=json_data
+            )
         elif method.upper() == "DELETE":
-            response = requests.delete(url, params=params, json=json_data)
+            response = request_scheduler.request(
+                "local", "DELETE", url, params=params, json=json_data
+            )
         elif method.upper() == "PATCH":
-            response = requests.patch(url, params=params, json=json_data)
+            response = request_scheduler.request(
+                "local", "PATCH", url, params=params, json=json_data
+            )
         else:
             raise ValueError(f"Unsupported HTTP method: {method}")
 
@@ -117,63 +163,532 @@ def _make_request(endpoint: str, method: str = "GET", params=None, json_data=Non
             except:
                 return {"success": True}
         else:
-            print(f"API request failed: {response.status_code} {response.text}")
+            logger.warning(
+                "API request failed: %s %s", response.status_code, response.text
+            )
             return None
 
     except Exception as e:
-        print(f"Error making request to {endpoint}: {e}")
+        logger.error("Error making request to %s: %s", endpoint, e)
         return None
 
 
-def get_all_rooms() -> Dict[str, Any]:
-    """Retrieves all available meeting rooms from Microsoft Exchange.
+def _iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Incrementally decode the elements of a top-level JSON array.
+
+    Only the current element and the unparsed tail of the last chunk are held
+    in memory, so arbitrarily long arrays can be consumed in constant space.
+
+    Args:
+        chunks: Raw UTF-8 chunks of the response body.
+
+    Yields:
+        Each decoded element of the array, in order.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+    pos = 0
+    exhausted = False
+    in_array = False
+    # After "[" or ",", an element must come next; after an element, "," or "]"
+    expect_value = True
+    first = True
+
+    def read_more() -> bool:
+        nonlocal buffer, pos, exhausted
+        for chunk in chunks:
+            text = utf8.decode(chunk)
+            if text:
+                buffer = buffer[pos:] + text
+                pos = 0
+                return True
+        tail = utf8.decode(b"", final=True)
+        buffer = buffer[pos:] + tail
+        pos = 0
+        exhausted = True
+        return bool(tail)
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _JSON_WHITESPACE:
+            pos += 1
+        if pos == len(buffer):
+            if exhausted or not read_more():
+                raise ValueError("Unexpected end of JSON array")
+            continue
+
+        if not in_array:
+            if buffer[pos] != "[":
+                raise ValueError("Response is not a JSON array")
+            in_array = True
+            pos += 1
+            continue
+
+        if buffer[pos] == "]":
+            if expect_value and not first:
+                raise ValueError("Trailing comma in JSON array")
+            return
+        if buffer[pos] == ",":
+            if expect_value:
+                raise ValueError("Missing element in JSON array")
+            expect_value = True
+            pos += 1
+            continue
+        if not expect_value:
+            raise ValueError("Missing comma in JSON array")
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if exhausted or not read_more():
+                raise
+            continue
+
+        # The element is only complete once a separator follows it: a number
+        # or literal at the end of the buffer may continue in the next chunk
+        following = end
+        while following < len(buffer) and buffer[following] in _JSON_WHITESPACE:
+            following += 1
+        if following == len(buffer):
+            if exhausted:
+                raise ValueError("Unexpected end of JSON array")
+            read_more()
+            continue
+        if buffer[following] not in ",]":
+            # "1." of "1.5", with the rest still to come
+            truncated = following == end and not buffer[end:].strip(_JSON_NUMBER_CHARS)
+            if truncated and not exhausted:
+                read_more()
+                continue
+            raise ValueError("Malformed JSON array")
+
+        pos = end
+        expect_value = False
+        first = False
+        yield value
+
+
+def _stream_request(endpoint: str, params=None) -> Optional[Iterator[Any]]:
+    """Stream the elements of a JSON array from the local Exchange API server.
 
     Returns:
-        dict: Status and list of rooms or error message.
+        An iterator over the decoded elements, or None if the request failed.
+        Errors while reading the body (a dropped connection, malformed JSON,
+        the deadline passing) are raised by the iterator.
+    """
+    try:
+        url = f"{current_tenant().api_url}/{endpoint.lstrip('/')}"
+
+        # Check if we're authenticated
+        auth_status = check_auth_status()
+        if not auth_status["authenticated"]:
+            logger.warning(
+                "Not authenticated with Exchange service. Please authenticate first."
+            )
+            return None
+
+        response = request_scheduler.request(
+            "local", "GET", url, params=params, stream=True
+        )
+    except Exception as e:
+        logger.error("Error making request to %s: %s", endpoint, e)
+        return None
+
+    if response.status_code != 200:
+        logger.warning("API request failed: %s %s", response.status_code, response.text)
+        response.close()
+        return None
+
+    def elements():
+        try:
+            yield from _iter_json_array(
+                deadlines.bounded(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+            )
+        finally:
+            response.close()
+
+    return elements()
+
+
+def _room_matches(room: Room, building: str = "", min_capacity: int = 0) -> bool:
+    """Whether a room passes the building and minimum capacity filters."""
+    if building and room.building.lower() != building.lower():
+        return False
+    return room.capacity >= min_capacity
+
+
+def iter_rooms(building: str = "", min_capacity: int = 0) -> Iterator[Room]:
+    """Stream the room directory from the local API as normalized rooms.
+
+    The filters are passed on to the server, which pushes them down to Graph
+    as a $filter, and are applied again here for servers that ignore them.
+
+    Args:
+        building: Only rooms in this building (case-insensitive)
+        min_capacity: Only rooms with at least this capacity
+
+    Raises:
+        ValueError: If the rooms couldn't be fetched or the response is malformed.
+    """
+    params = {}
+    if building:
+        params["building"] = building
+    if min_capacity:
+        params["minCapacity"] = min_capacity
+
+    raw_rooms = _stream_request("rooms", params=params or None)
+    if raw_rooms is None:
+        raise ValueError(
+            "Failed to fetch rooms. Please check authentication and try again."
+        )
+
+    for raw_room in raw_rooms:
+        room = normalize_room(raw_room)
+        if _room_matches(room, building, min_capacity):
+            yield room
+
+
+def _revalidate_in_background(key: str, refresh: Callable[[], Any]):
+    """Run a cache refresh on a background thread, at most one per key at a time.
+
+    The refresh runs in a copy of the caller's context, so for the same
+    tenant, but without the caller's deadline.
+    """
+    tenant = current_tenant()
+    with tenant.revalidating_lock:
+        if key in tenant.revalidating:
+            return
+        tenant.revalidating.add(key)
+
+    def run():
+        try:
+            with deadlines.detached(), request_scheduler.priority(
+                request_scheduler.BACKGROUND
+            ):
+                refresh()
+        except Exception as e:
+            logger.warning(
+                "Error refreshing %s in the background: %s",
+                key,
+                e,
+                extra={"sample_rate": 0.1},
+            )
+        finally:
+            with tenant.revalidating_lock:
+                tenant.revalidating.discard(key)
+
+    threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(run,),
+        name=f"revalidate-{key}",
+        daemon=True,
+    ).start()
+
+
+def _fetch_rooms() -> Optional[List[Room]]:
+    """Fetch the room directory from the local API and cache it."""
+    # Stream the rooms from the local API straight into the cache, so the
+    # raw response is never held in memory all at once
+    try:
+        rooms = list(iter_rooms())
+    except Exception as e:
+        logger.error("Error fetching rooms: %s", e)
+        return None
+    if not rooms:
+        return None
+
+    _set_rooms(rooms)
+    persistent_cache.save_rooms(rooms)
+    return rooms
+
+
+def _set_rooms(rooms: List[Room]):
+    """Cache the room directory, and each room's metadata by ID."""
+    tenant = current_tenant()
+    # A new mapping rather than an update, so readers never see a mix
+    tenant.room_directory = {room.id: room for room in rooms}
+    tenant.rooms_cache = rooms
+
+
+def _get_rooms() -> Optional[List[Room]]:
+    """Get the room directory, from the cache once it has been loaded.
+
+    Returns:
+        list: The rooms, or None if the directory couldn't be fetched.
     """
-    global _rooms_cache
+    tenant = current_tenant()
 
     # Return cached data if available
-    if _rooms_cache:
-        return {"status": "success", "rooms": _rooms_cache}
+    if tenant.rooms_cache:
+        return tenant.rooms_cache
+
+    # Then try the disk cache, refreshing it in the background if it's old
+    cached = persistent_cache.load_rooms()
+    if cached is not None:
+        rooms, age = cached
+        _set_rooms(rooms)
+        if age > persistent_cache.DIRECTORY_REFRESH_AGE:
+            _revalidate_in_background("rooms", _fetch_rooms)
+        return rooms
+
+    return _fetch_rooms()
+
 
+def _room_metadata(room_id: str) -> Tuple[Optional[Room], Optional[Dict[str, Any]]]:
+    """A room's directory metadata (name, email, capacity, ...) without its calendar.
+
+    Comes from the room directory, loaded in bulk once, so checking that a
+    room exists or looking up its name never costs a per-room request. A
+    room missing from the directory is looked up by ID before it's reported
+    as unknown.
+
+    Returns:
+        tuple: The room (possibly with its calendar), or None and an error
+        result saying the room doesn't exist or the directory couldn't be loaded.
+    """
+    tenant = current_tenant()
+    directory_failed = False
+    if not tenant.rooms_cache:
+        try:
+            directory_failed = _get_rooms() is None
+        except Exception as e:
+            logger.error("Error fetching rooms: %s", e)
+            directory_failed = True
+
+    room = tenant.room_directory.get(room_id)
+    if room is not None:
+        return room, None
+
+    # The directory may be behind, or missing a room only reachable by ID
     try:
-        # Get all rooms from the local API
-        rooms_response = _make_request("rooms")
+        room = _get_room(room_id)
+    except Exception as e:
+        logger.error("Error fetching room: %s", e, extra={"room_id": room_id})
+    if room is not None:
+        return room, None
+
+    if directory_failed:
+        return None, {
+            "status": "error",
+            "error_message": "Failed to fetch rooms. Please check authentication and try again.",
+        }
+    return None, {
+        "status": "error",
+        "error_message": f"Failed to fetch room with ID {room_id}. Please check if room exists.",
+    }
+
+
+def get_all_rooms(building: str = "", min_capacity: int = 0) -> Dict[str, Any]:
+    """Retrieves all available meeting rooms from Microsoft Exchange.
+
+    Args:
+        building (str, optional): Only return rooms in this building. Defaults to all.
+        min_capacity (int, optional): Only return rooms with at least this capacity.
+            Defaults to 0.
 
-        if not rooms_response:
+    Returns:
+        dict: Status and list of rooms or error message.
+    """
+    try:
+        filtered = bool(building or min_capacity)
+        if filtered and not current_tenant().rooms_cache:
+            # Let the server filter rather than download the whole directory;
+            # the partial list isn't cached as the directory
+            try:
+                rooms = list(iter_rooms(building, min_capacity))
+            except Exception as e:
+                logger.error("Error fetching rooms: %s", e)
+                rooms = None
+        else:
+            rooms = _get_rooms()
+            if rooms is not None and filtered:
+                rooms = [
+                    room
+                    for room in rooms
+                    if _room_matches(room, building, min_capacity)
+                ]
+
+        if rooms is None:
             return {
                 "status": "error",
                 "error_message": "Failed to fetch rooms. Please check authentication and try again.",
             }
 
-        # Process the room data
-        rooms = []
-        for room in rooms_response:
-            room_data = {
-                "id": room.get("id", ""),
-                "name": room.get("displayName", room.get("name", "")),
-                "email": room.get("email", room.get("emailAddress", "")),
-                "capacity": room.get("capacity", 0),
-                "building": room.get("building", ""),
-                "floor": room.get("floorNumber", room.get("floor", "")),
-                "location": room.get("location", "Unknown Location"),
-            }
-            rooms.append(room_data)
-
-        # Cache the results
-        _rooms_cache = rooms
-
-        return {"status": "success", "rooms": rooms}
+        return {"status": "success", "rooms": [room.to_dict() for room in rooms]}
 
     except Exception as e:
-        print(f"Error fetching rooms: {e}")
+        logger.error("Error fetching rooms: %s", e)
         return {
             "status": "error",
             "error_message": f"Failed to fetch rooms: {str(e)}",
         }
 
 
+def _fetch_room(room_id: str) -> Optional[Room]:
+    """Fetch a room with its events from the local API and cache it."""
+    fetched_at = time.time()
+    room_response = _make_request(f"rooms/{room_id}")
+    if not room_response:
+        return None
+
+    room = normalize_room(room_response, room_id, with_details=True)
+    tenant = current_tenant()
+
+    # A change pushed while the request was in flight may be missing from the
+    # response, so let the next read fetch the room again
+    if tenant.room_changed_at.get(room_id, 0.0) >= fetched_at:
+        fetched_at = 0.0
+
+    # Cache the results; the least recently used calendars beyond the
+    # tenant's limit are dropped
+    tenant.room_fetched_at[room_id] = fetched_at
+    tenant.room_info_cache[room_id] = room
+    persistent_cache.save_room(room)
+    return room
+
+
+def _room_age(room_id: str) -> Optional[float]:
+    """Seconds since the cached calendar of a room was fetched, None if not cached."""
+    tenant = current_tenant()
+    fetched_at = tenant.room_fetched_at.get(room_id)
+    if fetched_at is None or room_id not in tenant.room_info_cache:
+        return None
+    return time.time() - fetched_at
+
+
+def _data_age(room_ids: Iterable[str]) -> Optional[float]:
+    """Age in seconds of the oldest cached calendar among the rooms, rounded."""
+    ages = [age for age in map(_room_age, room_ids) if age is not None]
+    return round(max(ages), 1) if ages else None
+
+
+def _invalidate_room(room_id: str):
+    """Forget a room's cached calendar, e.g. after it was booked."""
+    tenant = current_tenant()
+    tenant.room_info_cache.pop(room_id, None)
+    tenant.room_fetched_at.pop(room_id, None)
+    persistent_cache.invalidate_room(room_id)
+
+
+def _set_push_subscription(since: Optional[float]):
+    """Record when the subscription to pushed room changes started (None when lost)."""
+    current_tenant().push_subscribed_since = since
+
+
+def _note_room_change(room_id: str):
+    """Record that a pushed change touched a room's calendar."""
+    current_tenant().room_changed_at[room_id] = time.time()
+
+
+def _max_age_for(fetched_at: float, max_age: Optional[float]) -> Optional[float]:
+    """The age bound for a cached calendar fetched at the given time.
+
+    Calendars fetched while subscribed to pushed room changes are patched or
+    invalidated as they change, so they may be kept longer.
+    """
+    since = current_tenant().push_subscribed_since
+    if max_age is None or since is None or fetched_at < since:
+        return max_age
+    return max(max_age, PUSHED_AVAILABILITY_MAX_AGE)
+
+
+def _replace_room_events(room_id: str, events: Iterable[Event]) -> bool:
+    """Replace the events of a cached calendar in place, keeping its fetch time.
+
+    Returns:
+        bool: False if the room's calendar isn't cached in memory.
+    """
+    cache = current_tenant().room_info_cache
+    room = cache.get(room_id)
+    if room is None or room.availability is None:
+        return False
+
+    # A new record, so readers holding the old one (and the occupancy
+    # matrix) see a consistent calendar
+    cache[room_id] = Room(
+        room.id,
+        room.name,
+        room.email,
+        room.capacity,
+        room.building,
+        room.floor,
+        room.location,
+        room.equipment,
+        tuple(sorted(events, key=lambda event: event.start)),
+    )
+    # The saved calendar is now behind the one in memory
+    persistent_cache.invalidate_room(room_id)
+    return True
+
+
+def _cached_room(room_id: str) -> Optional[Room]:
+    """A room's cached calendar, however old, from memory or disk."""
+    room = current_tenant().room_info_cache.get(room_id)
+    if room is not None:
+        return room
+    cached = persistent_cache.load_room(room_id)
+    return cached[0] if cached is not None else None
+
+
+def _refetch_room(room_id: str) -> Optional[Room]:
+    """Fetch a room, falling back to its cached calendar if the deadline ran out.
+
+    The tool's result is then marked as timed out (see deadlines.py) and its
+    data_age_seconds shows how old the calendar is.
+    """
+    room = _fetch_room(room_id)
+    if room is None and deadlines.timed_out():
+        return _cached_room(room_id)
+    return room
+
+
+def _get_room(
+    room_id: str, force_refresh: bool = False, max_age: Optional[float] = None
+) -> Optional[Room]:
+    """Get a room with its events, from the cache unless a refresh is forced.
+
+    Args:
+        room_id: The ID of the room
+        force_refresh: Always fetch the room from the API
+        max_age: Fetch the room if the cached calendar is older than this many
+            seconds (None accepts any cached calendar)
+
+    Returns:
+        Room: The room, or None if it couldn't be fetched. When the tool's
+        deadline runs out, an older cached calendar is returned if there is one.
+    """
+    if force_refresh or (max_age is not None and max_age <= 0):
+        return _refetch_room(room_id)
+
+    tenant = current_tenant()
+
+    # Return cached data if available and fresh enough
+    room = tenant.room_info_cache.get(room_id)
+    if room is not None:
+        fetched_at = tenant.room_fetched_at.get(room_id, 0.0)
+        bound = _max_age_for(fetched_at, max_age)
+        if bound is None or time.time() - fetched_at <= bound:
+            return room
+        return _refetch_room(room_id)
+
+    # Then try the disk cache, refreshing it in the background if it's old
+    cached = persistent_cache.load_room(room_id)
+    if cached is not None:
+        room, age = cached
+        bound = _max_age_for(time.time() - age, max_age)
+        if bound is None or age <= bound:
+            tenant.room_fetched_at[room_id] = time.time() - age
+            tenant.room_info_cache[room_id] = room
+            if age > persistent_cache.CALENDAR_REFRESH_AGE:
+                _revalidate_in_background(
+                    f"room-{room_id}", lambda: _fetch_room(room_id)
+                )
+            return room
+
+    return _refetch_room(room_id)
+
+
 def get_room_info(room_id: str, force_refresh: bool = False) -> Dict[str, Any]:
     """Retrieves detailed information about a specific meeting room.
 
@@ -184,137 +699,135 @@ def get_room_info(room_id: str, force_refresh: bool = False) -> Dict[str, Any]:
     Returns:
         dict: Status and room details or error message.
     """
-    global _room_info_cache
-
-    # Return cached data unless force refresh is requested
-    if room_id in _room_info_cache and not force_refresh:
-        return {"status": "success", "room": _room_info_cache[room_id]}
-
     try:
-        # Get room details from the local API
-        room_response = _make_request(f"rooms/{room_id}")
+        room = _get_room(room_id, force_refresh)
 
-        if not room_response:
+        if room is None:
             return {
                 "status": "error",
                 "error_message": f"Failed to fetch room with ID {room_id}. Please check if room exists.",
             }
+        # Only rooms that exist count towards keeping them fresh
+        record_access(room_id)
 
-        # Process the room data
-        room_data = {
-            "id": room_response.get("id", room_id),
-            "name": room_response.get("displayName", room_response.get("name", "")),
-            "email": room_response.get("email", room_response.get("emailAddress", "")),
-            "capacity": room_response.get("capacity", 0),
-            "building": room_response.get("building", ""),
-            "floor": room_response.get("floorNumber", room_response.get("floor", "")),
-            "location": room_response.get("location", "Unknown Location"),
-            "availability": room_response.get("availability", []),
-            "equipment": room_response.get("equipment", []),
+        return {
+            "status": "success",
+            "room": room.to_dict(),
+            "data_age_seconds": _data_age([room_id]),
         }
 
-        # Cache the results
-        _room_info_cache[room_id] = room_data
-
-        return {"status": "success", "room": room_data}
-
     except Exception as e:
-        print(f"Error fetching room info: {e}")
+        logger.error("Error fetching room info: %s", e, extra={"room_id": room_id})
         return {
             "status": "error",
             "error_message": f"Failed to fetch room info: {str(e)}",
         }
 
 
-def get_room_availability(room_id: str) -> Dict[str, Any]:
+def get_room_availability(
+    room_id: str, max_age: int = AVAILABILITY_MAX_AGE
+) -> Dict[str, Any]:
     """Gets the availability of a meeting room for the current day.
 
     Args:
         room_id (str): The ID of the room to check availability for.
+        max_age (int, optional): Maximum age in seconds of cached availability;
+            older data is refetched. Use 0 to always fetch. Defaults to 60.
 
     Returns:
-        dict: Status and room availability information or error message.
+        dict: Status, room availability information and the age of the data used,
+            or error message.
     """
     try:
         # First get the room info to ensure the room exists
-        room_info_result = get_room_info(room_id, force_refresh=True)
-
-        if room_info_result["status"] == "error":
-            return room_info_result
+        room = _get_room(room_id, max_age=max_age)
 
-        room = room_info_result["room"]
+        if room is None:
+            return {
+                "status": "error",
+                "error_message": f"Failed to fetch room with ID {room_id}. Please check if room exists.",
+            }
+        record_access(room_id)
 
         # The availability is included in the room info from the local API
-        availability = room.get("availability", [])
-
         return {
             "status": "success",
             "room_id": room_id,
-            "room_name": room["name"],
-            "availability": availability,
+            "room_name": room.name,
+            "availability": [event.to_dict() for event in room.availability],
+            "data_age_seconds": _data_age([room_id]),
         }
 
     except Exception as e:
-        print(f"Error fetching room availability: {e}")
+        logger.error(
+            "Error fetching room availability: %s", e, extra={"room_id": room_id}
+        )
         return {
             "status": "error",
             "error_message": f"Failed to fetch room availability: {str(e)}",
         }
 
 
-def list_available_rooms() -> Dict[str, Any]:
+def list_available_rooms(max_age: int = AVAILABILITY_MAX_AGE) -> Dict[str, Any]:
     """Lists all meeting rooms that are currently available.
 
+    Args:
+        max_age (int, optional): Maximum age in seconds of cached availability;
+            older data is refetched. Use 0 to always fetch. Defaults to 60.
+
     Returns:
-        dict: Status and list of available rooms or error message.
+        dict: Status, list of available rooms and the age of the oldest data used,
+            or error message. If time runs out, the remaining rooms are judged
+            from cached data and rooms without any are counted as unchecked.
     """
     try:
         # Get all rooms
-        rooms_result = get_all_rooms()
+        rooms = _get_rooms()
 
-        if rooms_result["status"] == "error":
-            return rooms_result
-
-        rooms = rooms_result["rooms"]
+        if rooms is None:
+            return {
+                "status": "error",
+                "error_message": "Failed to fetch rooms. Please check authentication and try again.",
+            }
 
         # Filter for available rooms
         available_rooms = []
-        now = datetime.datetime.now()
+        unchecked = 0
+        now = datetime.datetime.now().astimezone()
 
-        for room in rooms:
-            # Get room availability
-            availability_result = get_room_availability(room["id"])
+        for directory_room in rooms:
+            # Get room availability; once out of time, from whatever is cached
+            if deadlines.expired():
+                room = _cached_room(directory_room.id)
+            else:
+                room = _get_room(directory_room.id, max_age=max_age)
 
-            if availability_result["status"] == "error":
+            if room is None:
+                unchecked += deadlines.timed_out()
                 continue
 
-            availability = availability_result["availability"]
-
             # Check if the room is currently available
             is_available = True
-            for event in availability:
-                start_time = datetime.datetime.fromisoformat(
-                    event["start"].replace("Z", "+00:00")
-                )
-                end_time = datetime.datetime.fromisoformat(
-                    event["end"].replace("Z", "+00:00")
-                )
-
-                if start_time <= now <= end_time:
+            for event in room.availability:
+                if event.start <= now <= event.end:
                     is_available = False
                     break
 
             if is_available:
-                available_rooms.append(room)
+                available_rooms.append(directory_room.to_dict())
 
-        return {
+        result = {
             "status": "success",
             "available_rooms": available_rooms,
             "count": len(available_rooms),
+            "data_age_seconds": _data_age(room.id for room in rooms),
         }
+        if unchecked:
+            result["unchecked_rooms"] = unchecked
+        return result
 
     except Exception as e:
-        print(f"Error listing available rooms: {e}")
+        logger.error("Error listing available rooms: %s", e)
         return {
             "status": "error",
             "error_message": f"Failed to list available rooms: {str(e)}",
@@ -363,12 +876,13 @@ def _get_beta_graph_adapter():
         adapter.base_url = "graph.microsoft.com"
         adapter.base_url_template = "https://{+baseurl}/beta{+path}"
 
-        print(
-            "Successfully created beta graph adapter with base URL:", adapter.base_url
+        logger.info(
+            "Successfully created beta graph adapter with base URL: %s",
+            adapter.base_url,
         )
         return adapter
     except Exception as e:
-        print(f"Error creating beta graph adapter: {e}")
+        logger.error("Error creating beta graph adapter: %s", e)
         raise
 
 
@@ -424,12 +938,13 @@ def _make_beta_request(method: str, endpoint: str, params=None, json_data=None):
             return response
         except Exception as sdk_error:
             # If the SDK fails, fall back to direct request
-            print(
-                f"Graph Beta SDK error: {sdk_error}. Falling back to direct beta request."
+            logger.warning(
+                "Graph Beta SDK error: %s. Falling back to direct beta request.",
+                sdk_error,
             )
             return direct_beta_request(method, endpoint, params=params, data=json_data)
     except Exception as e:
-        print(f"Error making beta request to {endpoint}: {e}")
+        logger.error("Error making beta request to %s: %s", endpoint, e)
         raise
 
 
@@ -437,11 +952,15 @@ def test_graph_connection():
     """Test the Microsoft Graph connection and print detailed diagnostic information"""
     try:
         print("\n=== Microsoft Graph Connection Test ===")
+        tenant = current_tenant()
+        tenant_id = tenant.tenant_id
+        client_id = tenant.client_id
+        print(f"Tenant: {tenant.name}")
         print(
-            f"Tenant ID: {EXCHANGE_TENANT_ID[:5]}...{EXCHANGE_TENANT_ID[-5:] if len(EXCHANGE_TENANT_ID) > 10 else ''}"
+            f"Tenant ID: {tenant_id[:5]}...{tenant_id[-5:] if len(tenant_id) > 10 else ''}"
         )
         print(
-            f"Client ID: {EXCHANGE_CLIENT_ID[:5]}...{EXCHANGE_CLIENT_ID[-5:] if len(EXCHANGE_CLIENT_ID) > 10 else ''}"
+            f"Client ID: {client_id[:5]}...{client_id[-5:] if len(client_id) > 10 else ''}"
         )
         print(f"Client Secret: {'*' * 10}")
 
@@ -474,21 +993,51 @@ def test_graph_connection():
         return False
 
 
-def direct_request(method: str, endpoint: str, params=None, data=None, headers=None):
+def _graph_params(
+    params=None,
+    select: Optional[List[str]] = None,
+    filter_expr: Optional[str] = None,
+):
+    """Add $select and $filter query options to Graph query parameters."""
+    if not select and not filter_expr:
+        return params
+
+    params = dict(params or {})
+    if select:
+        params["$select"] = ",".join(select)
+    if filter_expr:
+        params["$filter"] = filter_expr
+    return params
+
+
+def direct_request(
+    method: str,
+    endpoint: str,
+    params=None,
+    data=None,
+    headers=None,
+    select: Optional[List[str]] = None,
+    filter_expr: Optional[str] = None,
+):
     """
     Make a direct request to the Microsoft Graph API using the requests library.
     This is a fallback method if the Graph SDK is having issues.
 
+    Responses are requested gzip-compressed (the requests default).
+
     Args:
         method: HTTP method (GET, POST, DELETE, etc.)
         endpoint: API endpoint (without the base URL)
         params: Query parameters
         data: Request body for POST/PATCH
         headers: Additional headers
+        select: Properties to return, sent as $select
+        filter_expr: OData filter expression, sent as $filter
 
     Returns:
         The JSON response from the API
     """
+    params = _graph_params(params, select, filter_expr)
     try:
         # Check auth status and refresh token if needed
         auth_status = check_auth_status()
@@ -506,7 +1055,7 @@ def direct_request(method: str, endpoint: str, params=None, data=None, headers=N
             endpoint = "/" + endpoint
 
         # Construct the full URL
-        url = f"https://graph.microsoft.com/v1.0{endpoint}"
+        url = f"{GRAPH_API_URL}{endpoint}"
 
         # Set default headers
         if headers is None:
@@ -519,15 +1068,25 @@ def direct_request(method: str, endpoint: str, params=None, data=None, headers=N
         # Make the request
         response = None
         if method.upper() == "GET":
-            response = requests.get(url, params=params, headers=headers)
+            response = request_scheduler.request(
+                "graph", "GET", url, params=params, headers=headers
+            )
         elif method.upper() == "POST":
-            response = requests.post(url, params=params, json=data, headers=headers)
+            response = request_scheduler.request(
+                "graph", "POST", url, params=params, json=data, headers=headers
+            )
         elif method.upper() == "DELETE":
-            response = requests.delete(url, params=params, headers=headers)
+            response = request_scheduler.request(
+                "graph", "DELETE", url, params=params, headers=headers
+            )
         elif method.upper() == "PATCH":
-            response = requests.patch(url, params=params, json=data, headers=headers)
+            response = request_scheduler.request(
+                "graph", "PATCH", url, params=params, json=data, headers=headers
+            )
         elif method.upper() == "PUT":
-            response = requests.put(url, params=params, json=data, headers=headers)
+            response = request_scheduler.request(
+                "graph", "PUT", url, params=params, json=data, headers=headers
+            )
         else:
             raise ValueError(f"Unsupported HTTP method: {method}")
 
@@ -541,12 +1100,18 @@ def direct_request(method: str, endpoint: str, params=None, data=None, headers=N
             return {}
 
     except Exception as e:
-        print(f"Error making direct request to {endpoint}: {e}")
+        logger.error("Error making direct request to %s: %s", endpoint, e)
         raise
 
 
 def direct_beta_request(
-    method: str, endpoint: str, params=None, data=None, headers=None
+    method: str,
+    endpoint: str,
+    params=None,
+    data=None,
+    headers=None,
+    select: Optional[List[str]] = None,
+    filter_expr: Optional[str] = None,
 ):
     """
     Make a direct request to the Microsoft Graph Beta API using the requests library.
@@ -557,10 +1122,13 @@ def direct_beta_request(
         params: Query parameters
         data: Request body for POST/PATCH
         headers: Additional headers
+        select: Properties to return, sent as $select
+        filter_expr: OData filter expression, sent as $filter
 
     Returns:
         The JSON response from the API
     """
+    params = _graph_params(params, select, filter_expr)
     try:
         # Check auth status and refresh token if needed
         auth_status = check_auth_status()
@@ -578,7 +1146,7 @@ def direct_beta_request(
             endpoint = "/" + endpoint
 
         # Construct the full URL with the beta endpoint
-        url = f"https://graph.microsoft.com/beta{endpoint}"
+        url = f"{GRAPH_BETA_API_URL}{endpoint}"
 
         # Set default headers
         if headers is None:
@@ -591,15 +1159,25 @@ def direct_beta_request(
         # Make the request
         response = None
         if method.upper() == "GET":
-            response = requests.get(url, params=params, headers=headers)
+            response = request_scheduler.request(
+                "graph", "GET", url, params=params, headers=headers
+            )
         elif method.upper() == "POST":
-            response = requests.post(url, params=params, json=data, headers=headers)
+            response = request_scheduler.request(
+                "graph", "POST", url, params=params, json=data, headers=headers
+            )
         elif method.upper() == "DELETE":
-            response = requests.delete(url, params=params, headers=headers)
+            response = request_scheduler.request(
+                "graph", "DELETE", url, params=params, headers=headers
+            )
         elif method.upper() == "PATCH":
-            response = requests.patch(url, params=params, json=data, headers=headers)
+            response = request_scheduler.request(
+                "graph", "PATCH", url, params=params, json=data, headers=headers
+            )
         elif method.upper() == "PUT":
-            response = requests.put(url, params=params, json=data, headers=headers)
+            response = request_scheduler.request(
+                "graph", "PUT", url, params=params, json=data, headers=headers
+            )
         else:
             raise ValueError(f"Unsupported HTTP method: {method}")
 
@@ -613,5 +1191,129 @@ def direct_beta_request(
             return {}
 
     except Exception as e:
-        print(f"Error making direct beta request to {endpoint}: {e}")
+        logger.error("Error making direct beta request to %s: %s", endpoint, e)
         raise
+
+
+def _graph_get_page(url: str, params, access_token: str) -> Dict[str, Any]:
+    """Fetch a single page of a Graph collection."""
+    response = request_scheduler.request(
+        "graph",
+        "GET",
+        url,
+        params=params,
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+        },
+    )
+    response.raise_for_status()
+    return response.json() if response.content else {}
+
+
+def iter_graph_pages(
+    endpoint: str,
+    params=None,
+    page_size: Optional[int] = None,
+    beta: bool = False,
+    select: Optional[List[str]] = None,
+    filter_expr: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over every page of a Microsoft Graph collection.
+
+    Pages are requested lazily by following @odata.nextLink, and the next page
+    is fetched in the background while the caller processes the current one.
+
+    Args:
+        endpoint: API endpoint (without the base URL)
+        params: Query parameters for the first page
+        page_size: Page size requested with $top (None for the Graph default)
+        beta: Use the beta endpoint instead of v1.0
+        select: Properties to return, sent as $select
+        filter_expr: OData filter expression, sent as $filter
+
+    Yields:
+        The JSON body of each page, in order
+    """
+    # Check auth status and refresh token if needed
+    auth_status = check_auth_status()
+    if not auth_status["authenticated"]:
+        raise Exception(
+            "Not authenticated with Microsoft Graph. Please authenticate first."
+        )
+    access_token = _load_token_cache()["access_token"]
+
+    # Ensure endpoint starts with a slash
+    if not endpoint.startswith("/"):
+        endpoint = "/" + endpoint
+
+    params = dict(_graph_params(params, select, filter_expr) or {})
+    if page_size:
+        params["$top"] = page_size
+
+    base_url = GRAPH_BETA_API_URL if beta else GRAPH_API_URL
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        # Prefetches run with the caller's request priority
+        future = executor.submit(
+            contextvars.copy_context().run,
+            _graph_get_page,
+            f"{base_url}{endpoint}",
+            params,
+            access_token,
+        )
+        while future is not None:
+            page = future.result()
+
+            # The next link already carries the query parameters
+            next_link = page.get("@odata.nextLink")
+            future = (
+                executor.submit(
+                    contextvars.copy_context().run,
+                    _graph_get_page,
+                    next_link,
+                    None,
+                    access_token,
+                )
+                if next_link
+                else None
+            )
+            yield page
+    finally:
+        # Don't wait on a prefetch the caller no longer wants
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_graph_collection(
+    endpoint: str,
+    params=None,
+    page_size: Optional[int] = None,
+    beta: bool = False,
+    select: Optional[List[str]] = None,
+    filter_expr: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over every item of a Microsoft Graph collection across all pages.
+
+    Args:
+        endpoint: API endpoint (without the base URL)
+        params: Query parameters
+        page_size: Page size requested with $top (None for the Graph default)
+        beta: Use the beta endpoint instead of v1.0
+        select: Properties to return, sent as $select
+        filter_expr: OData filter expression, sent as $filter
+
+    Yields:
+        Each item of the collection's "value" arrays, in order
+    """
+    pages = iter_graph_pages(
+        endpoint,
+        params,
+        page_size=page_size,
+        beta=beta,
+        select=select,
+        filter_expr=filter_expr,
+    )
+    for page in pages:
+        yield from page.get("value", ())
@@ -0,0 +1,331 @@
+import contextvars
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from . import deadlines, request_scheduler
+from .records import Room, parse_timestamp
+from .room_tools import AVAILABILITY_MAX_AGE, _get_room, _get_rooms, direct_request
+from .booking_tools import _parse_datetime
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+Interval = Tuple[datetime.datetime, datetime.datetime]
+
+# Working hours used when the window is just a day ("today", "tomorrow")
+WORKDAY_START = datetime.time(9, 0)
+WORKDAY_END = datetime.time(18, 0)
+
+# getSchedule accepts at most 20 mailboxes per request
+SCHEDULE_BATCH_SIZE = 20
+
+# Free/busy statuses that block a meeting
+BUSY_STATUSES = {"busy", "tentative", "oof", "workingElsewhere"}
+
+MAX_CANDIDATES = 10
+
+
+def _merge_intervals(intervals: List[Interval]) -> List[Interval]:
+    """Sort intervals and merge the ones that overlap or touch."""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _free_intervals(window: Interval, busy: List[Interval]) -> List[Interval]:
+    """Subtract merged, sorted busy intervals from the window."""
+    free = []
+    cursor, window_end = window
+    for start, end in busy:
+        if end <= cursor:
+            continue
+        if start >= window_end:
+            break
+        if start > cursor:
+            free.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < window_end:
+        free.append((cursor, window_end))
+    return free
+
+
+def _intersect_intervals(left: List[Interval], right: List[Interval]) -> List[Interval]:
+    """Intersect two sorted lists of disjoint intervals."""
+    result = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        start = max(left[i][0], right[j][0])
+        end = min(left[i][1], right[j][1])
+        if start < end:
+            result.append((start, end))
+        if left[i][1] < right[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def _parse_window(window: str) -> Optional[Interval]:
+    """Parse "today", "tomorrow" or "<start> to <end>" into an aware interval.
+
+    Returns:
+        tuple: The interval, or None if a time in it couldn't be parsed.
+    """
+    text = (window or "today").strip()
+    now = datetime.datetime.now().astimezone()
+
+    if " to " in text:
+        start_text, end_text = text.split(" to ", 1)
+        start = _parse_datetime(start_text.strip())
+        end = _parse_datetime(end_text.strip())
+        if start is None or end is None:
+            return None
+        return max(start.astimezone(), now), end.astimezone()
+
+    day = now.date()
+    if text.lower() == "tomorrow":
+        day += datetime.timedelta(days=1)
+    elif text.lower() != "today":
+        when = _parse_datetime(text)
+        if when is None:
+            return None
+        day = when.date()
+
+    start = datetime.datetime.combine(day, WORKDAY_START).astimezone()
+    end = datetime.datetime.combine(day, WORKDAY_END).astimezone()
+    return max(start, now), end
+
+
+def _fetch_schedule_batch(
+    emails: List[str], window: Interval
+) -> Dict[str, List[Interval]]:
+    # getSchedule is a POST but only reads, so it doesn't jump the write queue
+    with request_scheduler.priority(request_scheduler.current_priority("GET")):
+        return _request_schedule_batch(emails, window)
+
+
+def _request_schedule_batch(
+    emails: List[str], window: Interval
+) -> Dict[str, List[Interval]]:
+    response = direct_request(
+        "POST",
+        "/me/calendar/getSchedule",
+        data={
+            "schedules": emails,
+            "startTime": {
+                "dateTime": window[0]
+                .astimezone(datetime.timezone.utc)
+                .replace(tzinfo=None)
+                .isoformat(),
+                "timeZone": "UTC",
+            },
+            "endTime": {
+                "dateTime": window[1]
+                .astimezone(datetime.timezone.utc)
+                .replace(tzinfo=None)
+                .isoformat(),
+                "timeZone": "UTC",
+            },
+        },
+        headers={"Prefer": 'outlook.timezone="UTC"'},
+    )
+
+    schedules = {}
+    for schedule in response.get("value", []):
+        if "error" in schedule:
+            # e.g. a mailbox that doesn't exist or whose free/busy is hidden;
+            # left out, so the attendee is reported as unchecked
+            logger.warning(
+                "No free/busy for %s: %s", schedule.get("scheduleId"), schedule["error"]
+            )
+            continue
+        busy = []
+        for item in schedule.get("scheduleItems", []):
+            if item.get("status") not in BUSY_STATUSES:
+                continue
+            start = parse_timestamp(item.get("start"))
+            end = parse_timestamp(item.get("end"))
+            if start is not None and end is not None:
+                busy.append((start, end))
+        schedules[schedule.get("scheduleId", "").lower()] = _merge_intervals(busy)
+    return schedules
+
+
+def _fetch_schedules(emails: List[str], window: Interval) -> Dict[str, List[Interval]]:
+    """Fetch merged busy intervals for many mailboxes with getSchedule.
+
+    Returns:
+        dict: Busy intervals keyed by lower-cased email address; mailboxes
+        whose free/busy couldn't be read are missing.
+    """
+    batches = [
+        emails[i : i + SCHEDULE_BATCH_SIZE]
+        for i in range(0, len(emails), SCHEDULE_BATCH_SIZE)
+    ]
+    schedules: Dict[str, List[Interval]] = {}
+    with ThreadPoolExecutor(max_workers=min(4, len(batches) or 1)) as executor:
+        for result in executor.map(
+            lambda batch, context: context.run(_fetch_schedule_batch, batch, window),
+            batches,
+            [contextvars.copy_context() for _ in batches],
+        ):
+            schedules.update(result)
+    return schedules
+
+
+def _room_busy_intervals(
+    rooms: List[Room], window: Interval, max_age: int = AVAILABILITY_MAX_AGE
+) -> Dict[str, List[Interval]]:
+    """Busy intervals per room ID, from the cached calendars where they cover the window.
+
+    Cached calendars older than max_age seconds are refetched. The local API
+    only returns today's events, so other days come from getSchedule.
+    """
+    today = datetime.date.today()
+    if window[0].date() == today and window[1].date() == today:
+        # Rooms still unchecked when the deadline passes are left out
+        busy = {}
+        for room in rooms:
+            if deadlines.expired():
+                break
+            detailed = _get_room(room.id, max_age=max_age)
+            if detailed is not None:
+                busy[room.id] = _merge_intervals(
+                    [(event.start, event.end) for event in detailed.availability]
+                )
+        return busy
+
+    schedules = _fetch_schedules([room.email for room in rooms if room.email], window)
+    return {
+        room.id: schedules[room.email.lower()]
+        for room in rooms
+        if room.email and room.email.lower() in schedules
+    }
+
+
+def find_meeting_time(
+    attendees: List[str],
+    duration: int = 30,
+    window: str = "today",
+    min_capacity: int = 0,
+    max_age: int = AVAILABILITY_MAX_AGE,
+) -> Dict[str, Any]:
+    """Finds times when all attendees and a suitable room are free, in one call.
+
+    Args:
+        attendees (List[str]): Email addresses of the people who need to attend.
+        duration (int, optional): Meeting length in minutes. Defaults to 30.
+        window (str, optional): When to search: "today", "tomorrow", a date, or
+            "<start> to <end>" (e.g. "today at 1pm to today at 5pm"). Days are
+            searched within working hours. Defaults to "today".
+        min_capacity (int, optional): Minimum room capacity. Defaults to the
+            number of attendees.
+        max_age (int, optional): Maximum age in seconds of cached room
+            availability; older data is refetched. Use 0 to always fetch.
+            Defaults to 60.
+
+    Returns:
+        dict: Status and ranked candidate (room, time slot) pairs, or error
+            message. Attendees whose free/busy couldn't be read are listed in
+            unchecked_attendees; the candidates may clash with their calendars.
+    """
+    try:
+        search_window = _parse_window(window)
+        if search_window is None:
+            return {
+                "status": "error",
+                "error_message": f"Couldn't understand the time window '{window}'. "
+                'Use "today", "tomorrow", a date or "<start> to <end>".',
+            }
+        meeting_length = datetime.timedelta(minutes=duration)
+        if search_window[1] - search_window[0] < meeting_length:
+            return {
+                "status": "success",
+                "candidates": [],
+                "count": 0,
+                "message": "The time window is shorter than the meeting.",
+            }
+
+        rooms = _get_rooms()
+        if rooms is None:
+            return {
+                "status": "error",
+                "error_message": "Failed to fetch rooms. Please check authentication and try again.",
+            }
+
+        # Rooms without a known capacity (0) are kept, but ranked last
+        min_capacity = min_capacity or len(attendees)
+        rooms = [
+            room for room in rooms if room.capacity >= min_capacity or not room.capacity
+        ]
+        if not rooms:
+            return {
+                "status": "error",
+                "error_message": f"No rooms with a capacity of at least {min_capacity}.",
+            }
+
+        # Times when every attendee is free
+        attendee_busy = (
+            _fetch_schedules(list(attendees), search_window) if attendees else {}
+        )
+        busy = []
+        for intervals in attendee_busy.values():
+            busy.extend(intervals)
+        common_free = _free_intervals(search_window, _merge_intervals(busy))
+        # Attendees without free/busy can't be taken into account
+        unchecked_attendees = [
+            attendee for attendee in attendees if attendee.lower() not in attendee_busy
+        ]
+
+        candidates = []
+        room_busy = _room_busy_intervals(rooms, search_window, max_age)
+        for room in rooms:
+            if room.id not in room_busy:
+                continue
+            room_free = _free_intervals(search_window, room_busy[room.id])
+            for start, end in _intersect_intervals(common_free, room_free):
+                if end - start >= meeting_length:
+                    spare = (
+                        room.capacity - min_capacity if room.capacity else float("inf")
+                    )
+                    candidates.append((start, spare, room))
+
+        # Earliest first, then the room that fits the group best
+        candidates.sort(key=lambda candidate: (candidate[0], candidate[1]))
+
+        result = {
+            "status": "success",
+            "candidates": [
+                {
+                    "room_id": room.id,
+                    "room_name": room.name,
+                    "capacity": room.capacity,
+                    "location": room.location,
+                    "start": start.isoformat(),
+                    "end": (start + meeting_length).isoformat(),
+                }
+                for start, _, room in candidates[:MAX_CANDIDATES]
+            ],
+            "count": min(len(candidates), MAX_CANDIDATES),
+            "attendees_checked": len(attendee_busy),
+            "window": {
+                "start": search_window[0].isoformat(),
+                "end": search_window[1].isoformat(),
+            },
+        }
+        if unchecked_attendees:
+            result["unchecked_attendees"] = unchecked_attendees
+        return result
+
+    except Exception as e:
+        logger.error("Error finding meeting time: %s", e)
+        return {
+            "status": "error",
+            "error_message": f"Failed to find a meeting time: {str(e)}",
+        }
@@ -0,0 +1,263 @@
+import contextlib
+import contextvars
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterator, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .log import get_logger, log_context
+
+logger = get_logger(__name__)
+
+DEFAULT_TENANT = "default"
+
+# JSON file listing the tenants served by this process, e.g.
+# [{"name": "acme", "api_url": "http://acme-exchange:8080/exchange"}]
+TENANTS_FILE = os.environ.get("EXCHANGE_TENANTS_FILE", "")
+
+# The local Exchange API of the default tenant
+LOCAL_EXCHANGE_API_URL = os.environ.get(
+    "EXCHANGE_LOCAL_API_URL", "http://localhost:8080/exchange"
+)
+
+# Room calendars each tenant keeps in memory; the least recently used ones
+# are dropped beyond this (0 for no limit)
+TENANT_MAX_CACHED_ROOMS = int(
+    os.environ.get("EXCHANGE_TENANT_MAX_CACHED_ROOMS", "2000")
+)
+
+# Keep-alive connections each tenant holds per host
+TENANT_POOL_SIZE = int(os.environ.get("EXCHANGE_TENANT_POOL_SIZE", "8"))
+
+
+class BoundedCache:
+    """Thread-safe mapping that drops its least recently used entries past a limit."""
+
+    def __init__(
+        self, max_entries: int = 0, on_evict: Optional[Callable[[str], None]] = None
+    ):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._on_evict = on_evict
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            value = self._entries[key]
+            self._entries.move_to_end(key)
+            return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key: str, value: Any):
+        evicted = []
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while self.max_entries and len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self.evictions += 1
+        if self._on_evict is not None:
+            for evicted_key in evicted:
+                self._on_evict(evicted_key)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def items(self) -> List[Any]:
+        """A snapshot of the entries, safe to iterate while others write."""
+        with self._lock:
+            return list(self._entries.items())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class Tenant:
+    """One Exchange tenant or mailbox served by this process, with its own state.
+
+    Each tenant has its own local Exchange API, connection pool, token store,
+    room directory and availability caches, so tenants never see each
+    other's data or hold each other's connections.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        api_url: str = LOCAL_EXCHANGE_API_URL,
+        token_cache_file: Optional[str] = None,
+        cache_db_path: str = "",
+        tenant_id: str = "",
+        client_id: str = "",
+        client_secret: str = "",
+        max_cached_rooms: int = TENANT_MAX_CACHED_ROOMS,
+        pool_size: int = TENANT_POOL_SIZE,
+    ):
+        self.name = name
+        self.api_url = api_url.rstrip("/")
+        if token_cache_file is None:
+            suffix = "" if name == DEFAULT_TENANT else f".{name}"
+            token_cache_file = f"~/.exchange_token_cache{suffix}.json"
+        self.token_cache_file = Path(os.path.expanduser(token_cache_file))
+        self.cache_db_path = os.path.expanduser(cache_db_path) if cache_db_path else ""
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+
+        self.session = requests.Session()
+        pool = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", pool)
+        self.session.mount("https://", pool)
+
+        # Token store and Graph SDK adapter (see auth_tools and room_tools)
+        self.token_cache: Optional[Dict[str, Any]] = None
+        self.adapter = None
+
+        # Room directory and availability caches (see room_tools). The
+        # directory's static metadata (room_directory, by ID) is kept apart
+        # from the calendars, which change and are evicted
+        self.rooms_cache = None
+        self.room_directory: Dict[str, Any] = {}
+        self.room_fetched_at: Dict[str, float] = {}
+        self.room_info_cache = BoundedCache(max_cached_rooms, self._forget_room)
+        self.room_changed_at: Dict[str, float] = {}
+        self.push_subscribed_since: Optional[float] = None
+        self.revalidating = set()
+        self.revalidating_lock = threading.Lock()
+
+        # State other modules keep per tenant, see state()
+        self._state: Dict[str, Any] = {}
+        self._state_lock = threading.Lock()
+
+    def _forget_room(self, room_id: str):
+        self.room_fetched_at.pop(room_id, None)
+
+    def state(self, key: str, factory: Callable[[], Any]) -> Any:
+        """Get a module's per-tenant state, creating it with factory on first use."""
+        with self._state_lock:
+            if key not in self._state:
+                self._state[key] = factory()
+            return self._state[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "api_url": self.api_url,
+            "rooms": len(self.rooms_cache or ()),
+            "cached_calendars": len(self.room_info_cache),
+            "max_cached_calendars": self.room_info_cache.max_entries,
+            "evicted_calendars": self.room_info_cache.evictions,
+        }
+
+
+_tenants: Dict[str, Tenant] = {}
+_tenants_lock = threading.Lock()
+
+# The tenant the current tool call works for, None for the default tenant
+_current: contextvars.ContextVar[Optional[Tenant]] = contextvars.ContextVar(
+    "exchange_tenant", default=None
+)
+
+
+def register_tenant(name: str, **settings) -> Tenant:
+    """Add a tenant, or replace its settings (and drop its state) if it exists.
+
+    Args:
+        name: The tenant's name, as passed to use_tenant()
+        **settings: Tenant settings: api_url, token_cache_file, cache_db_path,
+            tenant_id, client_id, client_secret, max_cached_rooms, pool_size
+
+    Returns:
+        Tenant: The registered tenant.
+    """
+    tenant = Tenant(name, **settings)
+    with _tenants_lock:
+        previous = _tenants.get(name)
+        _tenants[name] = tenant
+    if previous is not None:
+        previous.session.close()
+    return tenant
+
+
+def get_tenant(name: str) -> Tenant:
+    """Get a registered tenant by name.
+
+    Raises:
+        ValueError: If no tenant has that name.
+    """
+    with _tenants_lock:
+        tenant = _tenants.get(name)
+    if tenant is None:
+        raise ValueError(f"Unknown tenant: {name}")
+    return tenant
+
+
+def list_tenants() -> List[str]:
+    with _tenants_lock:
+        return list(_tenants)
+
+
+def current_tenant() -> Tenant:
+    """The tenant of the current context, the default tenant outside use_tenant()."""
+    tenant = _current.get()
+    if tenant is None:
+        return get_tenant(DEFAULT_TENANT)
+    return tenant
+
+
+@contextlib.contextmanager
+def use_tenant(tenant: Union[str, Tenant]) -> Iterator[Tenant]:
+    """Run the tool calls made inside the block for the given tenant.
+
+    The tenant is carried by a context variable, so it reaches the tools
+    through the agent runner and any worker started with
+    ``contextvars.copy_context().run``.
+    """
+    if isinstance(tenant, str):
+        tenant = get_tenant(tenant)
+    token = _current.set(tenant)
+    try:
+        with log_context(tenant=tenant.name):
+            yield tenant
+    finally:
+        _current.reset(token)
+
+
+def load_tenants(path: str):
+    """Register the tenants listed in a JSON file (a list of tenant settings)."""
+    with open(path) as f:
+        entries = json.load(f)
+    for entry in entries:
+        settings = dict(entry)
+        register_tenant(settings.pop("name"), **settings)
+    logger.info("Loaded %s tenants from %s", len(entries), path)
+
+
+register_tenant(
+    DEFAULT_TENANT,
+    cache_db_path=os.environ.get("EXCHANGE_CACHE_DB", ""),
+    tenant_id=os.environ.get("EXCHANGE_TENANT_ID", ""),
+    client_id=os.environ.get("EXCHANGE_CLIENT_ID", ""),
+    client_secret=os.environ.get("EXCHANGE_CLIENT_SECRET", ""),
+)
+
+if TENANTS_FILE:
+    load_tenants(os.path.expanduser(TENANTS_FILE))
@@ -0,0 +1,23 @@
+import re
+import unicodedata
+from typing import List
+
+# Words that carry no meaning in a room or meeting reference ("the board room")
+STOPWORDS = {"the", "of", "in", "at", "on"}
+
+# A prefix match ("conf" for "conference") counts for this much of a full match
+PREFIX_MATCH_WEIGHT = 0.8
+
+_NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Lower-case, strip accents and collapse everything but letters and digits."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _NON_ALPHANUMERIC.sub(" ", text.lower()).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    """The normalized words of a text, without stopwords."""
+    return [token for token in normalize(text).split() if token not in STOPWORDS]
@@ -0,0 +1,149 @@
+import contextvars
+import datetime
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional
+
+from . import request_scheduler
+from .room_tools import get_all_rooms, _get_room
+from .tenants import current_tenant
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Maximum number of room calendars fetched in parallel during warm-up
+WARMUP_CONCURRENCY = int(os.environ.get("EXCHANGE_WARMUP_CONCURRENCY", "4"))
+
+_warmup_lock = threading.Lock()
+
+
+def _new_warmup_state() -> Dict[str, Any]:
+    return {
+        "thread": None,
+        "status": {
+            "state": "idle",
+            "rooms_total": 0,
+            "rooms_loaded": 0,
+            "rooms_failed": 0,
+            "started_at": None,
+            "finished_at": None,
+            "error_message": None,
+        },
+    }
+
+
+def _warmup_state() -> Dict[str, Any]:
+    """The current tenant's warm-up thread and status."""
+    return current_tenant().state("warmup", _new_warmup_state)
+
+
+def start_warmup(concurrency: int = WARMUP_CONCURRENCY) -> bool:
+    """Starts loading the room directory and today's availability in the background.
+
+    Tools keep answering while the warm-up runs; they simply find more of the
+    data already cached the further along it is.
+
+    Args:
+        concurrency (int, optional): Maximum number of room calendars fetched at once.
+
+    Returns:
+        bool: True if a warm-up was started, False if one is already running.
+    """
+    warmup = _warmup_state()
+
+    with _warmup_lock:
+        thread = warmup["thread"]
+        if thread is not None and thread.is_alive():
+            return False
+
+        warmup["status"].update(
+            state="running",
+            rooms_total=0,
+            rooms_loaded=0,
+            rooms_failed=0,
+            started_at=datetime.datetime.now().isoformat(),
+            finished_at=None,
+            error_message=None,
+        )
+        # Runs in a copy of the caller's context, so for the same tenant
+        warmup["thread"] = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(_run_warmup, max(1, concurrency), warmup["status"]),
+            name="exchange-warmup",
+            daemon=True,
+        )
+        warmup["thread"].start()
+        return True
+
+
+def _run_warmup(concurrency: int, status: Dict[str, Any]):
+    with request_scheduler.priority(request_scheduler.BACKGROUND):
+        _warm_caches(concurrency, status)
+
+
+def _warm_caches(concurrency: int, status: Dict[str, Any]):
+    try:
+        rooms_result = get_all_rooms()
+        if rooms_result["status"] == "error":
+            _finish_warmup(status, "error", rooms_result["error_message"])
+            return
+
+        room_ids = [room["id"] for room in rooms_result["rooms"]]
+        status["rooms_total"] = len(room_ids)
+
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="exchange-warmup"
+        ) as executor:
+            # Each fetch runs with the warm-up's background priority
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run, _get_room, room_id, True
+                )
+                for room_id in room_ids
+            ]
+            for future in as_completed(futures):
+                try:
+                    loaded = future.result() is not None
+                except Exception as e:
+                    logger.warning("Error warming up room: %s", e)
+                    loaded = False
+                with _warmup_lock:
+                    status["rooms_loaded" if loaded else "rooms_failed"] += 1
+
+        _finish_warmup(status, "ready")
+        logger.info(
+            "Warm-up finished: %s of %s rooms cached",
+            status["rooms_loaded"],
+            status["rooms_total"],
+        )
+    except Exception as e:
+        logger.error("Error during warm-up: %s", e)
+        _finish_warmup(status, "error", str(e))
+
+
+def _finish_warmup(
+    status: Dict[str, Any], state: str, error_message: Optional[str] = None
+):
+    with _warmup_lock:
+        status.update(
+            state=state,
+            finished_at=datetime.datetime.now().isoformat(),
+            error_message=error_message,
+        )
+
+
+def get_warmup_status() -> Dict[str, Any]:
+    """Reports the progress of the background cache warm-up.
+
+    Returns:
+        dict: Status, whether the caches are fully warm, and warm-up progress.
+    """
+    with _warmup_lock:
+        warmup = dict(_warmup_state()["status"])
+
+    return {
+        "status": "success",
+        "ready": warmup["state"] == "ready",
+        "warmup": warmup,
+    }
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Export room utilization reports computed from the rooms' calendar history"""
+
+import argparse
+import datetime
+import sys
+
+from tools.analytics import export_report, load_bookings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute room utilization over past bookings and export it as CSV or Parquet"
+    )
+    parser.add_argument(
+        "output", nargs="?", default="utilization", help="Output directory"
+    )
+    parser.add_argument(
+        "--days", type=int, default=30, help="Days of history (default: 30)"
+    )
+    parser.add_argument(
+        "--end",
+        default="",
+        help="End of the period as an ISO date or time (default: now)",
+    )
+    parser.add_argument("--building", default="", help="Only rooms in this building")
+    parser.add_argument(
+        "--min-capacity", type=int, default=0, help="Only rooms this large"
+    )
+    parser.add_argument(
+        "--format",
+        choices=("csv", "parquet"),
+        default="csv",
+        help="File format (default: csv; parquet needs pyarrow)",
+    )
+    parser.add_argument(
+        "--bookings", action="store_true", help="Also export every booking"
+    )
+    args = parser.parse_args()
+
+    try:
+        end = (
+            datetime.datetime.fromisoformat(args.end).astimezone()
+            if args.end
+            else datetime.datetime.now().astimezone()
+        )
+    except ValueError:
+        parser.error(f"--end must be an ISO date or time, not {args.end!r}")
+    start = end - datetime.timedelta(days=args.days)
+
+    store = load_bookings(start, end, args.building, args.min_capacity)
+    if store is None:
+        print("Failed to fetch rooms. Please check authentication and try again.")
+        sys.exit(1)
+
+    try:
+        paths = export_report(store, args.output, args.format, args.bookings)
+    except (ValueError, OSError) as e:
+        # e.g. Parquet without pyarrow, or an unwritable output directory
+        print(f"Failed to export the report: {e}")
+        sys.exit(1)
+    print(
+        f"{len(store)} bookings of {len(store.rooms)} rooms from "
+        f"{store.start:%Y-%m-%d %H:%M} to {store.end:%Y-%m-%d %H:%M} UTC"
+    )
+    if store.rooms_failed:
+        print(f"Calendar history of {len(store.rooms_failed)} rooms couldn't be read")
+    for name, path in paths.items():
+        print(f"  {name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
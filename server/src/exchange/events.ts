@@ -0,0 +1,59 @@
+import { Server } from 'socket.io';
+import { logger } from '@kadima-tech/micro-service-base';
+
+// Socket.IO room that clients join to receive room change events
+export const ROOM_CHANGES_CHANNEL = 'exchange-room-changes';
+
+export type RoomChangeType =
+  | 'bookingCreated'
+  | 'bookingCancelled'
+  | 'roomUpdated';
+
+export interface RoomChangeMeeting {
+  id: string;
+  subject: string;
+  start: { dateTime: string; timeZone?: string };
+  end: { dateTime: string; timeZone?: string };
+  organizer?: string;
+}
+
+export interface RoomChangeEvent {
+  type: RoomChangeType;
+  roomId: string;
+  // The booked meeting, for bookingCreated
+  meeting?: RoomChangeMeeting;
+  // The cancelled meeting, for bookingCancelled
+  meetingId?: string;
+  timestamp: string;
+}
+
+let io: Server | undefined;
+
+/**
+ * Set the Socket.IO server used to publish room change events
+ * @param socketIO - Socket.IO server instance
+ */
+export const setRoomEventsSocketIO = (socketIO: Server) => {
+  io = socketIO;
+};
+
+/**
+ * Publish a change to a room's calendar or details to the subscribed clients
+ * @param event - The change, without its timestamp
+ */
+export const publishRoomChange = (
+  event: Omit<RoomChangeEvent, 'timestamp'>
+) => {
+  if (!io) {
+    return;
+  }
+
+  try {
+    io.to(ROOM_CHANGES_CHANNEL).emit('roomChanged', {
+      ...event,
+      timestamp: new Date().toISOString(),
+    });
+  } catch (error) {
+    logger.error('Error publishing room change:', error);
+  }
+};
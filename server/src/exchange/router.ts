@@ -1,7 +1,7 @@
 import { FastifyInstance, FastifyPluginOptions } from 'fastify';
 import { logger } from '@kadima-tech/micro-service-base';
 import { ExchangeService } from './service';
-import { BookingRequestSchema } from './schema';
+import { BookingRequestSchema, RoomsQuery, RoomsQuerySchema } from './schema';
 import { config } from '../config';
 import { getRoomInfo } from './controller';
 
@@ -27,23 +27,33 @@ const exchangeRouter = async (
     }
   });
 
-  // Get all rooms
-  fastify.get('/rooms', async (request, reply) => {
-    try {
-      // Check if we have valid credentials
-      if (!(await exchangeService.hasValidCredentials())) {
-        // Redirect to authorization if no valid credentials
-        const authUrl = await exchangeService.getAuthorizationUrl();
-        return reply.redirect(authUrl);
-      }
+  // Get all rooms, optionally filtered by building and minimum capacity
+  fastify.get(
+    '/rooms',
+    {
+      schema: {
+        querystring: RoomsQuerySchema,
+      },
+    },
+    async (request, reply) => {
+      try {
+        // Check if we have valid credentials
+        if (!(await exchangeService.hasValidCredentials())) {
+          // Redirect to authorization if no valid credentials
+          const authUrl = await exchangeService.getAuthorizationUrl();
+          return reply.redirect(authUrl);
+        }
 
-      const rooms = await exchangeService.getAllRooms();
-      return reply.send(rooms);
-    } catch (error) {
-      logger.error('Error fetching rooms:', error);
-      return reply.status(500).send({ error: 'Failed to fetch rooms' });
+        const rooms = await exchangeService.getAllRooms(
+          request.query as RoomsQuery
+        );
+        return reply.send(rooms);
+      } catch (error) {
+        logger.error('Error fetching rooms:', error);
+        return reply.status(500).send({ error: 'Failed to fetch rooms' });
+      }
     }
-  });
+  );
 
   // Get room info
   fastify.get('/rooms/:roomId', getRoomInfo);
@@ -37,6 +37,14 @@ export const RoomInfoSchema = Type.Object({
 
 export type RoomInfo = Static<typeof RoomInfoSchema>;
 
+// Schema for the room list filters, pushed down to Graph as $filter
+export const RoomsQuerySchema = Type.Object({
+  building: Type.Optional(Type.String()),
+  minCapacity: Type.Optional(Type.Number()),
+});
+
+export type RoomsQuery = Static<typeof RoomsQuerySchema>;
+
 // Schema for Exchange API credentials
 export const ExchangeCredentialsSchema = Type.Object({
   accessToken: Type.String(),
@@ -3,12 +3,14 @@ import {
   ExchangeCredentials,
   BookingRequest,
   BookingResponse,
+  RoomsQuery,
 } from './schema';
 import { config } from '../config';
 import { logger } from '@kadima-tech/micro-service-base';
 import { Client } from '@microsoft/microsoft-graph-client';
 import { TokenCredentialAuthenticationProvider } from '@microsoft/microsoft-graph-client/authProviders/azureTokenCredentials';
 import { ClientSecretCredential } from '@azure/identity';
+import { publishRoomChange } from './events';
 
 // Re-export config for use in other modules
 export { config };
@@ -30,6 +32,51 @@ interface CalendarEvent {
   location?: { displayName?: string };
 }
 
+// Only the room fields we map, so Graph doesn't send full place resources
+const ROOM_SELECT_FIELDS =
+  'id,displayName,emailAddress,capacity,building,floorNumber,address';
+
+// Fields read from a single room's user or place resource in getRoomInfo
+const ROOM_USER_SELECT_FIELDS = 'id,displayName,mail,userPrincipalName';
+const ROOM_PLACE_SELECT_FIELDS = 'id,displayName,emailAddress';
+
+// Build the Graph $filter for the room list filters, if any
+function buildRoomFilter(filters: RoomsQuery): string | undefined {
+  const clauses: string[] = [];
+  if (filters.building) {
+    clauses.push(`building eq '${filters.building.replace(/'/g, "''")}'`);
+  }
+  if (filters.minCapacity) {
+    clauses.push(`capacity ge ${Math.floor(filters.minCapacity)}`);
+  }
+  return clauses.length > 0 ? clauses.join(' and ') : undefined;
+}
+
+// The same filters as buildRoomFilter, for room lists that can't be filtered
+// server-side. Rooms whose building or capacity is unknown don't match.
+function filterRooms(rooms: any[], filters: RoomsQuery): any[] {
+  const building = filters.building?.toLowerCase();
+  return rooms.filter(
+    (room) =>
+      (!building || (room.building || '').toLowerCase() === building) &&
+      (!filters.minCapacity ||
+        (typeof room.capacity === 'number' &&
+          room.capacity >= filters.minCapacity))
+  );
+}
+
+// Last seen calendar of each room, to notice changes made outside this service
+const calendarSignatures = new Map<string, string>();
+
+function calendarSignature(events: CalendarEvent[]): string {
+  return events
+    .map(
+      (event) => `${event.id}|${event.start.dateTime}|${event.end.dateTime}`
+    )
+    .sort()
+    .join(',');
+}
+
 // Add this interface for the optional parameters
 interface RoomInfoOptions {
   forceRefresh?: boolean;
@@ -120,7 +167,10 @@ export class ExchangeService {
 
       try {
         // First try to get room by ID from users endpoint
-        room = await graphClient.api(`/users/${roomId}`).get();
+        room = await graphClient
+          .api(`/users/${roomId}`)
+          .select(ROOM_USER_SELECT_FIELDS)
+          .get();
         roomEmail = room.mail || room.userPrincipalName;
         logger.info(
           `Found room details for ${room.displayName} with email ${roomEmail}`
@@ -130,7 +180,10 @@ export class ExchangeService {
 
         // Try the places endpoint as fallback
         try {
-          room = await graphClient.api(`/places/${roomId}`).get();
+          room = await graphClient
+            .api(`/places/${roomId}`)
+            .select(ROOM_PLACE_SELECT_FIELDS)
+            .get();
           roomEmail = room.emailAddress;
           logger.info(
             `Found room details from places API for ${room.displayName} with email ${roomEmail}`
@@ -780,6 +833,15 @@ export class ExchangeService {
         logger.warn('NO UPCOMING MEETINGS FOUND - THIS IS LIKELY THE ISSUE');
       }
 
+      // Tell subscribers when the calendar changed since it was last fetched,
+      // e.g. a meeting booked or moved in Outlook
+      const signature = calendarSignature(allEvents);
+      const previousSignature = calendarSignatures.get(roomId);
+      calendarSignatures.set(roomId, signature);
+      if (previousSignature !== undefined && previousSignature !== signature) {
+        publishRoomChange({ type: 'roomUpdated', roomId });
+      }
+
       const roomInfo: RoomInfo = {
         roomName: room.displayName,
         location: room.location?.displayName || 'Unknown',
@@ -980,6 +1042,18 @@ export class ExchangeService {
       // Don't force refresh room info here - let client refresh when ready
       logger.info(`Successfully booked room ${room.name}`);
 
+      publishRoomChange({
+        type: 'bookingCreated',
+        roomId,
+        meeting: {
+          id: eventResult.id,
+          subject: eventData.subject,
+          start: eventResult.start || eventData.start,
+          end: eventResult.end || eventData.end,
+          organizer: eventResult.organizer?.emailAddress?.name,
+        },
+      });
+
       return {
         success: true,
         meeting: {
@@ -1074,6 +1148,7 @@ export class ExchangeService {
         await graphClient.api(apiUrl).delete();
 
         logger.info(`Successfully cancelled meeting ${meetingId}`);
+        publishRoomChange({ type: 'bookingCancelled', roomId, meetingId });
         return { success: true };
       } catch (graphError: unknown) {
         logger.error(`Graph API error:`, graphError);
@@ -1339,7 +1414,7 @@ export class ExchangeService {
     return true;
   }
 
-  async getAllRooms(): Promise<any[]> {
+  async getAllRooms(filters: RoomsQuery = {}): Promise<any[]> {
     try {
       logger.info('Getting all rooms');
       const graphClient = this.getGraphClient();
@@ -1350,9 +1425,14 @@ export class ExchangeService {
         logger.info(
           'Fetching places/microsoft.graph.room using place collection API'
         );
-        const placeResponse = await graphClient
+        let placeRequest = graphClient
           .api('/places/microsoft.graph.room')
-          .get();
+          .select(ROOM_SELECT_FIELDS);
+        const placeFilter = buildRoomFilter(filters);
+        if (placeFilter) {
+          placeRequest = placeRequest.filter(placeFilter);
+        }
+        const placeResponse = await placeRequest.get();
 
         logger.info(
           `Retrieved ${placeResponse.value?.length || 0} rooms using place API`
@@ -1366,9 +1446,15 @@ export class ExchangeService {
             location: room.address?.city || 'Unknown Location',
             capacity: room.capacity || 'Unknown',
             email: room.emailAddress,
+            building: room.building || '',
+            floorNumber: room.floorNumber ?? '',
           }));
           return rooms;
         }
+        if (placeFilter) {
+          // The places list is complete, so no room matches the filters
+          return [];
+        }
       } catch (placeError) {
         logger.error('Error fetching rooms via place API:', placeError);
         logger.info('Falling back to findRooms endpoint');
@@ -1394,7 +1480,7 @@ export class ExchangeService {
             capacity: 'Unknown', // FindRooms doesn't provide capacity
             email: room.address,
           }));
-          return rooms;
+          return filterRooms(rooms, filters);
         }
       } catch (findRoomsError) {
         logger.error('Error fetching rooms via findRooms API:', findRoomsError);
@@ -1426,7 +1512,7 @@ export class ExchangeService {
         email: room.mail,
       }));
 
-      return rooms;
+      return filterRooms(rooms, filters);
     } catch (error) {
       logger.error('Error in getAllRooms:', error);
       if (error instanceof Error) {
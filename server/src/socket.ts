@@ -10,6 +10,10 @@ import {
 } from "./device/service";
 import { DeviceSocket } from "./device/types";
 import { updateCacheProgress } from "./caching/service";
+import {
+  ROOM_CHANGES_CHANNEL,
+  setRoomEventsSocketIO,
+} from "./exchange/events";
 
 // Map to store connected devices by their `deviceId`
 export const connectedDevices = new Map<string, DeviceSocket>();
@@ -21,6 +25,7 @@ export const connectedDevices = new Map<string, DeviceSocket>();
 export const initializeSocketIO = (io: Server) => {
   // Pass the io instance to deviceController
   setSocketIO(io);
+  setRoomEventsSocketIO(io);
 
   // Handle new connections
   io.on("connection", (socket: DeviceSocket) => {
@@ -78,6 +83,16 @@ export const initializeSocketIO = (io: Server) => {
       }
     });
 
+    // Let clients such as the booking agent receive room change events
+    socket.on("subscribeRoomChanges", (_data: any, callback) => {
+      socket.join(ROOM_CHANGES_CHANNEL);
+      logger.info(`Socket ${socket.id} subscribed to room changes`);
+
+      if (typeof callback === "function") {
+        callback({ status: "success", message: "Subscribed to room changes" });
+      }
+    });
+
     // Handle disconnection
     socket.on("disconnect", () => {
       if (socket.deviceId) {